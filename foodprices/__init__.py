@@ -0,0 +1,3 @@
+"""
+Shared analysis code for the cost and affordability of healthy diets project.
+"""
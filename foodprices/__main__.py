@@ -0,0 +1,3 @@
+from foodprices.cli import main
+
+main()
@@ -0,0 +1,147 @@
+"""
+Population-weighted rollups of the country indicators.
+
+healthy_diet_cost_by_income_group.csv is a plain mean over countries, so a
+small island state counts as much as India. rollup weights every country by
+its population instead. For every indicator and group it reports:
+
+- the number of countries and the population covered;
+- the population-weighted mean;
+- population-weighted quantiles, where the q-quantile is the smallest value
+  reached by a share q of the group's population (numpy's 'inverted_cdf'
+  method with weights);
+- for the 'Percent of the population who cannot afford' columns, the
+  headcount in millions. The workbook's own 'Millions of people who cannot
+  afford' columns are left out, since a population-weighted mean of
+  headcounts has no meaning.
+
+All indicators are handled in one sweep. The rows are sorted once by group
+and value for every column at the same time, and the cumulative population
+of that ordering answers every quantile of every group with a binary
+search. Means and headcounts are grouped sums. There is no groupby-apply
+and no loop over groups.
+
+Aggregates, which have no income group, are left out so no population is
+counted twice, as are rows without a population or a value.
+"""
+import numpy as np
+import pandas as pd
+
+# Weighted quantiles reported by default, with their column names
+QUANTILES = {'P10': 0.1, 'P25': 0.25, 'Median': 0.5, 'P75': 0.75, 'P90': 0.9}
+
+# Columns whose population share can be turned into a headcount
+HEADCOUNT_PREFIX = 'Percent of the population who cannot afford'
+
+# Columns that are already headcounts; their weighted mean means nothing, and the
+# 'Millions Who Cannot Afford' column of the matching percentage replaces them
+HEADCOUNT_COLUMNS_PREFIX = 'Millions of people who cannot afford'
+
+# Groupings rolled up by default
+GROUPINGS = ['Income Group', 'Region']
+
+
+def indicator_columns(merged_data):
+    """
+    Return the numeric indicator columns of `merged_data`, without the time,
+    population and headcount columns.
+    """
+    return [column for column in merged_data.select_dtypes('number').columns
+            if column not in ('Time', 'Population', 'Country Code')
+            and not str(column).startswith(HEADCOUNT_COLUMNS_PREFIX)]
+
+
+def _group_codes(merged_data, by):
+    """
+    Return integer group codes (-1 for no group) and the group labels for a
+    column name, an array of labels per row, or a {country name: group} mapping.
+    """
+    if isinstance(by, str):
+        labels = merged_data[by]
+    elif isinstance(by, dict):
+        labels = merged_data['Country Name'].map(by)
+    else:
+        labels = pd.Series(np.asarray(by, dtype=object), index=merged_data.index)
+    labels = labels.astype(object).where(merged_data['Income Group'].notna())
+    codes, groups = pd.factorize(labels, sort=True)
+    return codes, groups
+
+
+def rollup(merged_data, by='Income Group', columns=None, weights='Population', quantiles=QUANTILES):
+    """
+    Return the population-weighted rollup of `columns` (default: every
+    indicator) per group of `by`, indexed by (group, indicator).
+
+    `by` is a column name, an array of group labels per row, or a mapping
+    from country name to group for custom groupings.
+    """
+    columns = columns or indicator_columns(merged_data)
+    codes, groups = _group_codes(merged_data, by)
+    n_groups = len(groups)
+
+    # Arrays are laid out (indicator, row) so every per-indicator pass runs over contiguous memory
+    values = np.ascontiguousarray(merged_data[columns].to_numpy(dtype=np.float64).T)
+    weight = merged_data[weights].to_numpy(dtype=np.float64)
+    valid = np.isfinite(values) & (np.isfinite(weight) & (weight > 0))[None, :] & (codes >= 0)[None, :]
+    w = np.where(valid, weight[None, :], 0.0)
+    # Invalid rows go to a trailing dummy group; small integer codes let the group sort run as a radix sort
+    group = np.where(valid, codes[None, :], n_groups).astype(np.int16 if n_groups < 32767 else np.int64)
+
+    # Counts, population, means and headcounts are grouped sums over the valid rows
+    flat = group + (n_groups + 1) * np.arange(len(columns))[:, None]
+    size = (n_groups + 1) * len(columns)
+
+    def grouped_sum(x):
+        return np.bincount(flat.ravel(), weights=x.ravel(), minlength=size).reshape(len(columns), n_groups + 1)[:, :-1]
+
+    count = grouped_sum(valid.astype(np.float64))
+    population = grouped_sum(w)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = grouped_sum(w * np.where(valid, values, 0.0)) / population
+
+    # One sort of every indicator by (group, value) and one cumulative sum of the population;
+    # ties between equal values do not change any quantile, so only the group sort has to be stable
+    order = np.argsort(np.where(valid, values, np.inf), axis=1)
+    order = np.take_along_axis(order, np.argsort(np.take_along_axis(group, order, axis=1), axis=1, kind='stable'),
+                               axis=1)
+    sorted_values = np.take_along_axis(values, order, axis=1)
+    cumulative = np.cumsum(np.take_along_axis(w, order, axis=1), axis=1)
+    start = np.hstack([np.zeros((len(columns), 1), dtype=np.int64), np.cumsum(count, axis=1).astype(np.int64)])
+    before = np.where(start > 0, np.take_along_axis(cumulative, np.maximum(start - 1, 0), axis=1), 0.0)
+
+    qs = np.asarray(list(quantiles.values()), dtype=np.float64)
+    quantile_values = np.full((len(qs), len(columns), n_groups), np.nan)
+    for j in range(len(columns)):
+        # Smallest position whose cumulative population reaches the share q of its group
+        targets = before[j, :-1][None, :] + qs[:, None] * population[j][None, :]
+        positions = np.searchsorted(cumulative[j], targets, side='left')
+        positions = np.clip(positions, start[j, :-1][None, :], np.maximum(start[j, 1:] - 1, 0)[None, :])
+        quantile_values[:, j, :] = np.where(count[j][None, :] > 0, sorted_values[j, positions], np.nan)
+
+    # Tables are indexed group first, so transpose back to (group, indicator)
+    count, population, mean = count.T, population.T, mean.T
+    quantile_values = quantile_values.transpose(0, 2, 1)
+
+    headcount = np.full(mean.shape, np.nan)
+    percent = np.array([str(column).startswith(HEADCOUNT_PREFIX) for column in columns])
+    headcount[:, percent] = mean[:, percent] / 100 * population[:, percent] / 1e6
+
+    index = pd.MultiIndex.from_product([groups, columns], names=[by if isinstance(by, str) else 'Group', 'Indicator'])
+    table = pd.DataFrame({
+        'Countries': count.ravel().astype(np.int64),
+        'Population': population.ravel(),
+        'Weighted Mean': mean.ravel(),
+        **{name: quantile_values[i].ravel() for i, name in enumerate(quantiles)},
+        'Millions Who Cannot Afford': headcount.ravel(),
+    }, index=index)
+    return table
+
+
+def rollups(merged_data, groupings=GROUPINGS, columns=None, weights='Population', quantiles=QUANTILES):
+    """
+    Return the rollups of every grouping in `groupings`, stacked and indexed
+    by (grouping, group, indicator).
+    """
+    tables = {by: rollup(merged_data, by, columns, weights, quantiles).rename_axis(['Group', 'Indicator'])
+              for by in groupings}
+    return pd.concat(tables, names=['Grouping'])
@@ -0,0 +1,91 @@
+"""
+Sketch-based summary statistics for very large inputs.
+
+describe() sorts every column in memory to read its 25%, 50% and 75%
+quantiles, and the income-group tables sort every group again. On a full
+sub-national or multi-year panel those sorts take most of the run and a copy
+of every column. In sketch mode the tables are computed from mergeable
+statistics instead: count, mean, standard deviation, min and max stay exact,
+and the quartiles come from a quantile sketch with a configurable error:
+
+- 'kll': a KLLSketch whose rank error is about `error`, e.g. the estimated
+  median lies between the 49% and 51% quantiles for error=0.01;
+- 'ddsketch': a DDSketch whose quantiles are within `error` of the true
+  order statistics, relative to their value.
+
+The merged frame is added CHUNK_SIZE rows at a time, so no more than one
+chunk of a column is copied or sorted at once. The statistics of separate
+chunks merge, so the chunks can also be spread over worker processes. The
+tables have the layout of describe() and are written to the same CSV files
+by foodprices.incremental.write_summary_files.
+"""
+import argparse
+import functools
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from foodprices.incremental import TRACKED_COLUMNS
+from foodprices.sketch import SKETCHES
+from foodprices.streaming import StreamingSummary
+
+# Sketch used unless another is asked for
+SKETCH_METHOD = 'kll'
+
+# Error bound used unless another is asked for: a rank error for 'kll', a relative value error for 'ddsketch'
+SKETCH_ERROR = 0.01
+
+# Rows of the merged frame added to the statistics at a time
+CHUNK_SIZE = 100000
+
+
+def sketch_factory(method=SKETCH_METHOD, error=SKETCH_ERROR):
+    """
+    Return a function of no arguments creating an empty sketch of `method` with error bound `error`.
+    """
+    if method not in SKETCHES:
+        raise ValueError(f"Unknown sketch '{method}'. Available sketches: {', '.join(SKETCHES)}")
+    if not 0 < error < 1:
+        raise ValueError(f"The sketch error must be between 0 and 1, not {error}")
+    return functools.partial(SKETCHES[method].with_error, error)
+
+
+def _chunk_statistics(chunk, sketch, columns):
+    """
+    Return the statistics of one chunk of merged rows.
+    """
+    return StreamingSummary(columns=columns, sketch=sketch).update(chunk)
+
+
+def sketch_statistics(merged_data, method=SKETCH_METHOD, error=SKETCH_ERROR, columns=TRACKED_COLUMNS,
+                      chunk_size=CHUNK_SIZE, processes=1):
+    """
+    Return the StreamingSummary of the merged frame with quartiles estimated by sketches.
+
+    The cost ratios are derived per chunk. With `processes` above one the
+    chunks are summarised in that many worker processes and their
+    statistics merged in chunk order.
+    """
+    sketch = sketch_factory(method, error)
+    chunks = (merged_data.iloc[start:start + chunk_size] for start in range(0, len(merged_data), chunk_size))
+
+    statistics = StreamingSummary(columns=columns, sketch=sketch)
+    if processes == 1 or len(merged_data) <= chunk_size:
+        for chunk in chunks:
+            statistics.update(chunk)
+        return statistics
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for part in executor.map(_chunk_statistics, chunks, repeat(sketch), repeat(columns)):
+            statistics.merge(part)
+    return statistics
+
+
+def sketch_requested(argv):
+    """
+    Return the (method, error) asked for with --sketch METHOD [--sketch-error E], or None for exact statistics.
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--sketch', choices=list(SKETCHES))
+    parser.add_argument('--sketch-error', type=float, default=SKETCH_ERROR)
+    args, _ = parser.parse_known_args(argv)
+    return None if args.sketch is None else (args.sketch, args.sketch_error)
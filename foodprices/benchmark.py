@@ -0,0 +1,198 @@
+"""
+Benchmark suite for the analysis pipeline.
+
+Each benchmark times one step of the scripts on synthetic datasets from
+foodprices.synthetic, scaled from a few hundred rows up to a million: the
+read_excel load, the metadata merge, the describe() and groupby statistics,
+the correlations and the rendering of each figure. Every benchmark is run
+`repeat` times after one warm-up call and the minimum, median and mean
+times are recorded.
+
+Results are written as JSON together with the library versions and git
+commit, and compare_results flags benchmarks that became slower than a
+saved baseline, so regressions show up between versions.
+"""
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+# Numbers of 'Data' rows benchmarked by default
+SIZES = [200, 1000, 10000, 100000, 1000000]
+
+# Writing a workbook is far slower than reading one, so read_excel is only timed up to this size
+EXCEL_MAX_ROWS = 10000
+
+# Default directory for the JSON results
+RESULTS_DIR = './benchmarks'
+
+# A benchmark whose minimum time grows by more than this factor counts as a regression
+REGRESSION_THRESHOLD = 1.25
+
+BENCHMARKS = [
+    'read_excel', 'merge', 'describe', 'groupby', 'correlations',
+    'figure_boxplot', 'figure_affordability_bar_chart', 'figure_pie_chart',
+]
+
+
+def _time(func, repeat):
+    """
+    Call `func` once to warm up, then `repeat` more times, and return the times in seconds.
+    """
+    func()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _render(build):
+    """
+    Build a figure with `build`, draw it to an in-memory PNG and close it.
+    """
+    import matplotlib.pyplot as plt
+
+    fig = build()
+    fig.savefig(io.BytesIO(), format='png', bbox_inches='tight')
+    plt.close(fig)
+
+
+def benchmark_cases(main_data, country_metadata, workbook_path=None):
+    """
+    Return {benchmark name: zero-argument callable} for one dataset.
+
+    read_excel is only included when a workbook was written to `workbook_path`.
+    """
+    from foodprices import figures, summary
+    from foodprices.loader import merge_metadata, read_workbook
+
+    merged_data = merge_metadata(main_data, country_metadata)
+    cases = {
+        'merge': lambda: merge_metadata(main_data, country_metadata),
+        'describe': lambda: (summary.diet_cost_summary(merged_data), summary.affordability_summary(merged_data),
+                             summary.cost_ratio_summary(merged_data)),
+        'groupby': lambda: (summary.healthy_diet_cost_by_income_group(merged_data),
+                            summary.affordability_summary_by_income_group(merged_data)),
+        'correlations': lambda: summary.healthy_diet_correlations(merged_data),
+        'figure_boxplot': lambda: _render(lambda: figures.plot_cost_by_income_boxplot(merged_data)),
+        # The bar chart shows one year, so select the latest year as part of the benchmark
+        'figure_affordability_bar_chart': lambda: _render(lambda: figures.plot_affordability_bar_chart(
+            merged_data[merged_data['Time'] == merged_data['Time'].max()])),
+        'figure_pie_chart': lambda: _render(figures.plot_food_group_pie_chart),
+    }
+    if workbook_path is not None:
+        cases['read_excel'] = lambda: read_workbook(workbook_path)
+    return cases
+
+
+def environment():
+    """
+    Return the interpreter, library versions, git commit and time of the run.
+    """
+    import matplotlib
+    import numpy as np
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'matplotlib': matplotlib.__version__,
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+
+
+def run_benchmarks(sizes=SIZES, names=None, repeat=3, excel_max_rows=EXCEL_MAX_ROWS, seed=0):
+    """
+    Run the benchmarks `names` (default: all) on synthetic data of each size.
+
+    Returns a dict with the environment and one result per benchmark and
+    size, holding the minimum, median and mean time in seconds.
+    """
+    import numpy as np
+
+    from foodprices.render import use_headless
+    from foodprices.synthetic import MAX_ENTITIES, synthetic_data, synthetic_metadata, write_synthetic_workbook
+
+    use_headless()
+    names = BENCHMARKS if names is None else names
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for size in sizes:
+            main_data = synthetic_data(size, seed)
+            country_metadata = synthetic_metadata(min(size, MAX_ENTITIES), seed)
+            workbook_path = None
+            if 'read_excel' in names and size <= excel_max_rows:
+                workbook_path = write_synthetic_workbook(os.path.join(work_dir, f"data-{size}.xlsx"), size, seed)
+
+            cases = benchmark_cases(main_data, country_metadata, workbook_path)
+            for name in names:
+                if name not in cases:
+                    continue
+                times = _time(cases[name], repeat)
+                results.append({
+                    'benchmark': name,
+                    'rows': size,
+                    'repeat': repeat,
+                    'min': min(times),
+                    'median': float(np.median(times)),
+                    'mean': float(np.mean(times)),
+                })
+    return {'environment': environment(), 'results': results}
+
+
+def save_results(results, path):
+    """
+    Write benchmark results to `path` as JSON and return the path.
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    return path
+
+
+def load_results(path):
+    """
+    Read benchmark results written by save_results.
+    """
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def results_table(results):
+    """
+    Return the results as a DataFrame indexed by benchmark and number of rows.
+    """
+    import pandas as pd
+
+    return pd.DataFrame(results['results']).set_index(['benchmark', 'rows'])
+
+
+def compare_results(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare the minimum times of two runs.
+
+    Returns a DataFrame of the benchmarks present in both runs with the
+    baseline and current times, their ratio and whether the ratio exceeds
+    `threshold`.
+    """
+    import pandas as pd
+
+    table = pd.concat([results_table(baseline)['min'].rename('Baseline'),
+                       results_table(current)['min'].rename('Current')], axis=1, join='inner')
+    table['Ratio'] = table['Current'] / table['Baseline']
+    table['Regression'] = table['Ratio'] > threshold
+    return table
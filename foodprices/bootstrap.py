@@ -0,0 +1,161 @@
+"""
+Bootstrap confidence intervals and permutation tests for group means.
+
+Step 4 of the summary statistics script reports a bare mean of the cost of a
+healthy diet per income group. This module attaches uncertainty to those
+aggregates:
+
+- bootstrap_group_means draws the resamples of each group as one index
+  matrix (resamples x observations) and returns percentile confidence
+  intervals for the mean;
+- permutation_test_groups tests the difference in means between every pair
+  of groups, shuffling the pooled values as one permutation matrix.
+
+Resamples are drawn in fixed-size chunks, each from its own child of a
+seeded numpy SeedSequence. Results therefore depend only on the seed, not on
+whether the chunks run in this process or across worker processes. The
+chunks of every group, or of every pair of groups, are mapped through one
+pool of workers, so the pool is started once per call.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# Number of resamples drawn per chunk; bounds the size of each index matrix
+CHUNK_SIZE = 1000
+
+
+def _chunk_sizes(n_resamples, chunk_size=CHUNK_SIZE):
+    """
+    Return the number of resamples in each chunk.
+    """
+    sizes = [chunk_size] * (n_resamples // chunk_size)
+    if n_resamples % chunk_size:
+        sizes.append(n_resamples % chunk_size)
+    return sizes
+
+
+def _bootstrap_chunk(args):
+    """
+    Return the means of `size` bootstrap resamples of `values`.
+    """
+    values, size, seed_sequence = args
+    rng = np.random.default_rng(seed_sequence)
+    indices = rng.integers(0, len(values), size=(size, len(values)))
+    return values[indices].mean(axis=1)
+
+
+def _permutation_chunk(args):
+    """
+    Return the differences in means between the first `n_first` values and the
+    rest for `size` random permutations of `pooled`.
+    """
+    pooled, n_first, size, seed_sequence = args
+    rng = np.random.default_rng(seed_sequence)
+    permutations = rng.permuted(np.broadcast_to(pooled, (size, len(pooled))), axis=1)
+    return permutations[:, :n_first].mean(axis=1) - permutations[:, n_first:].mean(axis=1)
+
+
+def _run_chunks(func, chunk_args, processes):
+    """
+    Apply `func` to every chunk, in this process or across worker processes,
+    and concatenate the results in chunk order.
+    """
+    if processes is None or processes <= 1 or len(chunk_args) <= 1:
+        return np.concatenate([func(args) for args in chunk_args])
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        return np.concatenate(list(executor.map(func, chunk_args)))
+
+
+def _bootstrap_args(values, n_resamples, seed):
+    """
+    Return the chunk arguments drawing `n_resamples` bootstrap resamples of `values`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    sizes = _chunk_sizes(n_resamples)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return [(values, size, s) for size, s in zip(sizes, seed.spawn(len(sizes)))]
+
+
+def bootstrap_means(values, n_resamples=10000, seed=0, processes=None):
+    """
+    Return the means of `n_resamples` bootstrap resamples of `values`.
+
+    `seed` is an integer or a numpy SeedSequence.
+    """
+    return _run_chunks(_bootstrap_chunk, _bootstrap_args(values, n_resamples, seed), processes)
+
+
+def bootstrap_group_means(merged_data, value='Cost of a healthy diet', group='Income Group',
+                          n_resamples=10000, confidence=0.95, seed=0, processes=None):
+    """
+    Return the mean of `value` for each `group` with a percentile bootstrap
+    confidence interval.
+
+    The result has one row per group with the columns N, Mean, Std Error,
+    CI Lower and CI Upper. Missing values are dropped before resampling.
+    Each group gets its own child seed, so adding a group does not change
+    the intervals of the others.
+    """
+    data = merged_data[[group, value]].dropna()
+    alpha = (1 - confidence) / 2
+    groups = sorted(data[group].unique())
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+
+    group_values = [data.loc[data[group] == name, value].to_numpy(dtype=np.float64) for name in groups]
+    chunk_args = [args for values, group_seed in zip(group_values, seeds)
+                  for args in _bootstrap_args(values, n_resamples, group_seed)]
+    group_means = np.split(_run_chunks(_bootstrap_chunk, chunk_args, processes),
+                           np.arange(1, len(groups)) * n_resamples)
+
+    rows = []
+    for name, values, means in zip(groups, group_values, group_means):
+        rows.append({
+            group: name,
+            'N': len(values),
+            'Mean': values.mean(),
+            'Std Error': means.std(ddof=1),
+            'CI Lower': np.quantile(means, alpha),
+            'CI Upper': np.quantile(means, 1 - alpha),
+        })
+    return pd.DataFrame(rows).set_index(group)
+
+
+def permutation_test_groups(merged_data, value='Cost of a healthy diet', group='Income Group',
+                            n_permutations=10000, seed=0, processes=None):
+    """
+    Test the difference in mean `value` between every pair of groups.
+
+    Returns one row per pair with the observed difference (first group minus
+    second) and the two-sided permutation p-value, computed with the usual
+    +1 correction so it is never exactly zero.
+    """
+    data = merged_data[[group, value]].dropna()
+    groups = sorted(data[group].unique())
+    pairs = list(combinations(groups, 2))
+    pair_seeds = np.random.SeedSequence(seed).spawn(len(pairs))
+
+    group_values = {name: data.loc[data[group] == name, value].to_numpy(dtype=np.float64) for name in groups}
+    sizes = _chunk_sizes(n_permutations)
+    chunk_args = []
+    for (first, second), pair_seed in zip(pairs, pair_seeds):
+        pooled = np.concatenate([group_values[first], group_values[second]])
+        chunk_args += [(pooled, len(group_values[first]), size, s)
+                       for size, s in zip(sizes, pair_seed.spawn(len(sizes)))]
+    pair_differences = np.split(_run_chunks(_permutation_chunk, chunk_args, processes),
+                                np.arange(1, len(pairs)) * n_permutations)
+
+    rows = []
+    for (first, second), differences in zip(pairs, pair_differences):
+        observed = group_values[first].mean() - group_values[second].mean()
+        extreme = np.count_nonzero(np.abs(differences) >= abs(observed) - 1e-12)
+        rows.append({
+            'Group 1': first,
+            'Group 2': second,
+            'Difference': observed,
+            'P-value': (extreme + 1) / (n_permutations + 1),
+        })
+    return pd.DataFrame(rows)
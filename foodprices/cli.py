@@ -0,0 +1,311 @@
+"""
+Command-line interface for the analysis tooling.
+
+Usage:
+    python -m foodprices run [--stage NAME ...] [--force] [--export-format sqlite|parquet|csv] [--trace trace.json]
+                             [--profile-dir DIR]
+    python -m foodprices ingest [path/to/workbook.xlsx]
+    python -m foodprices validate [path/to/workbook.xlsx]
+    python -m foodprices render --by Region [--figure NAME ...] [--processes N]
+    python -m foodprices incremental [--data-path PATH] [--state-path PATH] [--changed-rows]
+    python -m foodprices stream [--data-path PATH] [--metadata-path PATH] [--chunk-size N]
+                                [--sketch kll|ddsketch] [--sketch-error E]
+    python -m foodprices panel [--vintage PATH ...]
+    python -m foodprices rollup [--by 'Income Group' ...] [--output PATH]
+    python -m foodprices cube [--output PATH]
+    python -m foodprices memory [--data-path PATH]
+    python -m foodprices serve [--host HOST] [--port PORT] [--processes N]
+    python -m foodprices bench [--sizes N ...] [--benchmark NAME ...] [--compare BASELINE.json]
+"""
+import argparse
+import os
+
+from foodprices.export import EXPORT_FORMAT, WRITERS
+from foodprices.loader import DATA_PATH
+
+
+def _run(args):
+    """
+    Run the pipeline and report which stages ran and which were skipped.
+    """
+    from foodprices.pipeline import Pipeline
+    from foodprices.render import use_headless
+
+    from foodprices.profiling import TRACER
+
+    # The pipeline only ever writes figures to files
+    use_headless()
+    if args.profile_dir:
+        TRACER.profile_dir = args.profile_dir
+    pipeline = Pipeline(data_path=args.data_path, results_dir=args.results_dir, figures_dir=args.figures_dir,
+                        export_format=args.export_format)
+    status = pipeline.run(only=args.stage, force=args.force)
+    for name, outcome in status.items():
+        print(f"{name}: {outcome}")
+
+    if args.trace:
+        print(TRACER.summary().to_string(index=False))
+        print(f"Trace saved to '{TRACER.write_chrome_trace(args.trace)}'")
+
+
+def _ingest(args):
+    """
+    Convert a workbook into the columnar store.
+    """
+    from foodprices.store import ingest
+
+    print(f"Store written to '{ingest(args.data_path)}'")
+
+
+def _validate(args):
+    """
+    Check the workbook against the schema and report every issue found.
+    """
+    from foodprices.validation import validate_workbook
+
+    issues = validate_workbook(args.data_path)
+    if issues.empty:
+        print(f"'{args.data_path}' passed every check")
+        return
+    for severity, message in zip(issues['Severity'], issues['Message']):
+        print(f"{severity}: {message}")
+    if (issues['Severity'] == 'error').any():
+        raise SystemExit(1)
+
+
+def _render(args):
+    """
+    Render one variant of each requested figure per value of a grouping column.
+    """
+    from foodprices.render import render_variants
+    from foodprices.store import load_store, upcast
+
+    merged_data = upcast(load_store(args.data_path))
+    paths = render_variants(merged_data, args.figure or ['boxplot', 'affordability_bar_chart'], args.by,
+                            args.output_dir, processes=args.processes)
+    print(f"{len(paths)} figures saved to '{args.output_dir}'")
+
+
+def _incremental(args):
+    """
+    Fold new and changed rows into the persisted statistics and rewrite the summary CSVs.
+    """
+    from foodprices.incremental import STATE_PATH, update_summary_files
+    from foodprices.store import load_store, upcast
+
+    counts = update_summary_files(upcast(load_store(args.data_path)), args.results_dir,
+                                  args.state_path or STATE_PATH, complete=not args.changed_rows)
+    print(f"{counts['added']} rows added, {counts['changed']} changed, {counts['removed']} removed")
+
+
+def _stream(args):
+    """
+    Compute the summary CSVs from the data sheet one chunk at a time.
+    """
+    from foodprices.incremental import write_summary_files
+    from foodprices.approximate import sketch_factory
+    from foodprices.streaming import stream_summary
+
+    sketch = sketch_factory(args.sketch, args.sketch_error) if args.sketch else None
+    statistics = stream_summary(args.data_path, args.metadata_path, args.chunk_size, sketch)
+    write_summary_files(statistics, args.results_dir)
+    print(f"{statistics.rows} rows summarised into '{args.results_dir}'")
+
+
+def _panel(args):
+    """
+    Write the year-over-year changes across the workbook vintages.
+    """
+    from foodprices.panel import Panel, write_panel_changes
+
+    panel = Panel(args.vintage or [DATA_PATH])
+    paths = write_panel_changes(panel, args.results_dir)
+    print(f"Changes over {panel.years()} saved to {paths}")
+
+
+def _rollup(args):
+    """
+    Write the population-weighted rollups of every indicator per grouping.
+    """
+    from foodprices.aggregation import rollups
+    from foodprices.loader import load_merged_data
+
+    table = rollups(load_merged_data(args.data_path), args.by or ['Income Group', 'Region'])
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    table.to_csv(args.output)
+    print(f"{len(table)} rollups saved to '{args.output}'")
+
+
+def _cube(args):
+    """
+    Write every cell of the aggregate cube, building it once per workbook version.
+    """
+    from foodprices.cube import load_cube
+
+    table = load_cube(args.data_path).table()
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    table.to_csv(args.output)
+    print(f"{len(table)} cube cells saved to '{args.output}'")
+
+
+def _memory(args):
+    """
+    Report the memory of the merged frame against the compact dataset.
+    """
+    from foodprices.compact import CompactDataset
+    from foodprices.loader import load_merged_data
+
+    merged_data = load_merged_data(args.data_path)
+    print(CompactDataset.from_merged_data(merged_data).memory_report(merged_data).to_string())
+
+
+def _serve(args):
+    """
+    Serve statistics and figures from the data held in memory.
+    """
+    from foodprices.server import serve
+
+    serve(args.data_path, args.host, args.port, args.processes)
+
+
+def _bench(args):
+    """
+    Run the benchmark suite, save the results as JSON and compare them with a baseline.
+    """
+    from foodprices import benchmark
+
+    results = benchmark.run_benchmarks(args.sizes, args.benchmark, args.repeat, args.excel_max_rows)
+    output = args.output or os.path.join(
+        benchmark.RESULTS_DIR, f"results-{results['environment']['commit'] or 'local'}.json")
+    benchmark.save_results(results, output)
+    print(benchmark.results_table(results)[['min', 'median', 'mean']].to_string())
+    print(f"Benchmark results saved to '{output}'")
+
+    if args.compare:
+        comparison = benchmark.compare_results(benchmark.load_results(args.compare), results, args.threshold)
+        print(comparison.to_string())
+        if comparison['Regression'].any():
+            raise SystemExit(f"{int(comparison['Regression'].sum())} benchmarks regressed against '{args.compare}'")
+
+
+def build_parser():
+    """
+    Return the argument parser for the command-line interface.
+    """
+    from foodprices.pipeline import FIGURES_DIR, RESULTS_DIR
+
+    parser = argparse.ArgumentParser(prog='python -m foodprices',
+                                     description='Cost and affordability of healthy diets analysis tooling.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Build every summary CSV and figure from one loaded frame')
+    run_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    run_parser.add_argument('--results-dir', default=RESULTS_DIR, help='Directory for the summary CSVs')
+    run_parser.add_argument('--figures-dir', default=FIGURES_DIR, help='Directory for the figures')
+    run_parser.add_argument('--stage', action='append', help='Only run this stage (can be repeated)')
+    run_parser.add_argument('--export-format', choices=list(WRITERS), default=EXPORT_FORMAT,
+                            help=f'Format of the single file every summary table is exported to (default: {EXPORT_FORMAT})')
+    run_parser.add_argument('--force', action='store_true', help='Rerun stages even when unchanged')
+    run_parser.add_argument('--trace', default=None, help='Write a Chrome trace of the stages that ran to this file')
+    run_parser.add_argument('--profile-dir', default=None, help='Write a cProfile dump per stage to this directory')
+    run_parser.set_defaults(handler=_run)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Convert the workbook into the columnar store')
+    ingest_parser.add_argument('data_path', nargs='?', default=DATA_PATH, help='Path to the workbook')
+    ingest_parser.set_defaults(handler=_ingest)
+
+    validate_parser = subparsers.add_parser('validate', help='Check the workbook against the schema')
+    validate_parser.add_argument('data_path', nargs='?', default=DATA_PATH, help='Path to the workbook')
+    validate_parser.set_defaults(handler=_validate)
+
+    render_parser = subparsers.add_parser('render', help='Render figure variants per group in a process pool')
+    render_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    render_parser.add_argument('--by', default='Region', help="Column to group by, e.g. 'Region', 'Income Group' or 'Time'")
+    render_parser.add_argument('--figure', action='append', choices=['boxplot', 'affordability_bar_chart', 'cost_affordability_density'],
+                               help='Figure to render (can be repeated; default: the boxplot and the bar chart)')
+    render_parser.add_argument('--output-dir', default=os.path.join(FIGURES_DIR, 'variants'),
+                               help='Directory for the rendered figures')
+    render_parser.add_argument('--processes', type=int, default=None,
+                               help='Number of worker processes (default: one per CPU)')
+    render_parser.set_defaults(handler=_render)
+
+    incremental_parser = subparsers.add_parser('incremental',
+                                               help='Update the summary CSVs from new and changed rows only')
+    incremental_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    incremental_parser.add_argument('--results-dir', default=RESULTS_DIR, help='Directory for the summary CSVs')
+    incremental_parser.add_argument('--state-path', default=None,
+                                    help='File holding the persisted statistics (default: .cache/incremental_state.pkl)')
+    incremental_parser.add_argument('--changed-rows', action='store_true',
+                                    help='The workbook holds only new or revised rows; remove nothing')
+    incremental_parser.set_defaults(handler=_incremental)
+
+    stream_parser = subparsers.add_parser('stream', help='Compute the summary CSVs in bounded memory, one chunk at a time')
+    stream_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook or a CSV export of its data sheet')
+    stream_parser.add_argument('--metadata-path', default=None,
+                               help='CSV export of the country metadata (default: the workbook itself)')
+    stream_parser.add_argument('--results-dir', default=RESULTS_DIR, help='Directory for the summary CSVs')
+    stream_parser.add_argument('--chunk-size', type=int, default=10000, help='Number of rows held in memory at a time')
+    stream_parser.add_argument('--sketch', choices=['kll', 'ddsketch'], default=None,
+                               help='Quantile sketch with error --sketch-error (default: KLL of size 200)')
+    stream_parser.add_argument('--sketch-error', type=float, default=0.01,
+                               help="Rank error of 'kll' or relative value error of 'ddsketch' (default: 0.01)")
+    stream_parser.set_defaults(handler=_stream)
+
+    panel_parser = subparsers.add_parser('panel', help='Compute year-over-year changes across workbook vintages')
+    panel_parser.add_argument('--vintage', action='append',
+                              help='Workbook vintage, oldest first (can be repeated; default: the workbook)')
+    panel_parser.add_argument('--results-dir', default=RESULTS_DIR, help='Directory for the change CSVs')
+    panel_parser.set_defaults(handler=_panel)
+
+    rollup_parser = subparsers.add_parser('rollup', help='Population-weighted means, quantiles and headcounts per group')
+    rollup_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    rollup_parser.add_argument('--by', action='append',
+                               help="Column to group by (can be repeated; default: 'Income Group' and 'Region')")
+    rollup_parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'population_weighted_rollups.csv'),
+                               help='CSV file for the rollups')
+    rollup_parser.set_defaults(handler=_rollup)
+
+    cube_parser = subparsers.add_parser('cube', help='Count, sum, min, max and quantiles per income group, region, diet and food group')
+    cube_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    cube_parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'aggregate_cube.csv'),
+                             help='CSV file for the cube cells')
+    cube_parser.set_defaults(handler=_cube)
+
+    memory_parser = subparsers.add_parser('memory', help='Compare the memory of the merged frame and the compact dataset')
+    memory_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    memory_parser.set_defaults(handler=_memory)
+
+    from foodprices.server import HOST, PORT
+
+    serve_parser = subparsers.add_parser('serve', help='Answer statistics and render requests over HTTP from memory')
+    serve_parser.add_argument('--data-path', default=DATA_PATH, help='Path to the workbook')
+    serve_parser.add_argument('--host', default=HOST, help='Address to listen on')
+    serve_parser.add_argument('--port', type=int, default=PORT, help='Port to listen on')
+    serve_parser.add_argument('--processes', type=int, default=None,
+                              help='Number of render worker processes (default: one per CPU)')
+    serve_parser.set_defaults(handler=_serve)
+
+    from foodprices.benchmark import BENCHMARKS, EXCEL_MAX_ROWS, REGRESSION_THRESHOLD, SIZES
+
+    bench_parser = subparsers.add_parser('bench', help='Time each pipeline step on synthetic data and save the results as JSON')
+    bench_parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Numbers of data rows to benchmark')
+    bench_parser.add_argument('--benchmark', action='append', choices=BENCHMARKS,
+                              help='Only run this benchmark (can be repeated)')
+    bench_parser.add_argument('--repeat', type=int, default=3, help='Timed runs per benchmark after one warm-up run')
+    bench_parser.add_argument('--excel-max-rows', type=int, default=EXCEL_MAX_ROWS,
+                              help='Largest size for which a workbook is written and read_excel is timed')
+    bench_parser.add_argument('--output', default=None, help='JSON file for the results (default: benchmarks/results-<commit>.json)')
+    bench_parser.add_argument('--compare', default=None, help='Baseline JSON results to check for regressions')
+    bench_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                              help='Slowdown factor counted as a regression')
+    bench_parser.set_defaults(handler=_bench)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Parse the command line and run the requested subcommand.
+    """
+    args = build_parser().parse_args(argv)
+    args.handler(args)
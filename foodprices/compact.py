@@ -0,0 +1,131 @@
+"""
+Compact in-memory representation of the merged dataset.
+
+load_merged_data returns every metadata column as strings next to the
+float64 indicators, with the country name repeated on every row. A service
+that keeps many workbook vintages resident pays for all of that per vintage.
+CompactDataset holds only the columns the analyses read:
+
+- the diet cost, affordability and food group cost indicators as float32,
+  one contiguous array per column;
+- 'Population' as float64, since float32 would lose its digits;
+- 'Time' as int16;
+- a uint16 country code per row into the names of a CountryIndex, and the
+  income group and region as its uint8 category codes.
+
+to_frame gives the existing scripts a pandas view. The indicator columns of
+the view share memory with the dataset, and the codes are decoded to
+categoricals. Like load_store, the indicators stay float32, so upcast them
+with store.upcast before accumulating statistics.
+"""
+import numpy as np
+import pandas as pd
+
+from foodprices.country_index import MISSING_CODE, CountryIndex
+from foodprices.food_groups import FOOD_GROUP_COLUMNS
+from foodprices.loader import DATA_PATH, load_merged_data
+from foodprices.summary import AFFORDABILITY_COLUMNS, DIET_COST_COLUMNS
+
+# Indicator columns kept as float32
+INDICATOR_COLUMNS = DIET_COST_COLUMNS + AFFORDABILITY_COLUMNS + list(FOOD_GROUP_COLUMNS)
+
+# Largest number of distinct country names a uint16 code can address
+MAX_COUNTRIES = np.iinfo(np.uint16).max + 1
+
+
+class CompactDataset:
+    """
+    The merged dataset reduced to float32 indicators and integer codes.
+    """
+
+    def __init__(self, index, country_codes, time, indicators, population, columns=INDICATOR_COLUMNS):
+        self.index = index
+        self.country_codes = np.asarray(country_codes, dtype=np.uint16)
+        self.time = np.asarray(time, dtype=np.int16)
+        # Laid out (column, row) so every column is one contiguous array
+        self.indicators = np.ascontiguousarray(indicators, dtype=np.float32)
+        self.population = np.asarray(population, dtype=np.float64)
+        self.columns = list(columns)
+        self.income_codes = index.income_codes[self.country_codes]
+        self.region_codes = index.region_codes[self.country_codes]
+
+    def __len__(self):
+        """
+        Return the number of rows.
+        """
+        return len(self.country_codes)
+
+    @classmethod
+    def from_merged_data(cls, merged_data, columns=INDICATOR_COLUMNS):
+        """
+        Build the compact dataset from a merged frame such as load_merged_data returns.
+
+        Raises ValueError when there are too many country names for uint16 codes.
+        """
+        index = CountryIndex.from_metadata(merged_data, key='Country Name', extra_aggregates=[])
+        if len(index) > MAX_COUNTRIES:
+            raise ValueError(f"{len(index)} country names do not fit uint16 codes (at most {MAX_COUNTRIES})")
+        indicators = merged_data[list(columns)].to_numpy(dtype=np.float32).T
+        return cls(index, index.codes(merged_data['Country Name']), merged_data['Time'].to_numpy(),
+                   indicators, merged_data['Population'].to_numpy(dtype=np.float64), columns)
+
+    @property
+    def nbytes(self):
+        """
+        Return the bytes held by the row arrays and the country index.
+        """
+        arrays = [self.country_codes, self.time, self.indicators, self.population, self.income_codes,
+                  self.region_codes, self.index.income_codes, self.index.region_codes, self.index.aggregate,
+                  self.index.names, self.index.income_categories, self.index.region_categories]
+        return sum(array.nbytes for array in arrays)
+
+    def column(self, name):
+        """
+        Return one float32 indicator column as a read-only view.
+        """
+        view = self.indicators[self.columns.index(name)]
+        view.flags.writeable = False
+        return view
+
+    def _categorical(self, codes, categories):
+        """
+        Return uint8 category codes as a Categorical, missing where the code is MISSING_CODE.
+        """
+        signed = codes.astype(np.int16)
+        signed[codes == MISSING_CODE] = -1
+        return pd.Categorical.from_codes(signed, categories=categories)
+
+    def to_frame(self):
+        """
+        Return the dataset as a DataFrame with the column names of the merged frame.
+
+        The indicator and population columns are views of the dataset's
+        arrays; country name, income group and region are categoricals.
+        """
+        data = {
+            'Country Name': pd.Categorical.from_codes(self.country_codes.astype(np.int32), categories=self.index.names),
+            'Time': self.time,
+        }
+        data.update({name: self.column(name) for name in self.columns})
+        data['Population'] = self.population
+        data['Income Group'] = self._categorical(self.income_codes, self.index.income_categories)
+        data['Region'] = self._categorical(self.region_codes, self.index.region_categories)
+        return pd.DataFrame(data, copy=False)
+
+    def memory_report(self, merged_data):
+        """
+        Return the memory used by `merged_data` and by this dataset, in bytes
+        and as a share of the merged frame.
+        """
+        merged_bytes = int(merged_data.memory_usage(deep=True).sum())
+        report = pd.DataFrame({'Bytes': [merged_bytes, self.nbytes]},
+                              index=pd.Index(['merged_data', 'CompactDataset'], name='Representation'))
+        report['Share of merged_data'] = report['Bytes'] / merged_bytes
+        return report
+
+
+def load_compact_dataset(data_path=DATA_PATH):
+    """
+    Return the compact dataset of a workbook, read through the cached loader.
+    """
+    return CompactDataset.from_merged_data(load_merged_data(data_path))
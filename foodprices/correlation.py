@@ -0,0 +1,227 @@
+"""
+Vectorised Pearson and Spearman correlation matrices with p-values.
+
+Step 3 of the summary statistics script used to call scipy.stats.pearsonr
+once per column pair after dropping every row with a missing value in any
+column. This module computes the whole matrix in a handful of NumPy matrix
+products, using pairwise-complete observations: each pair of columns uses
+every row where both of its columns are present.
+
+For a data matrix X with missingness mask M (1 where present), the pairwise
+counts, sums and cross-products are all matrix products:
+
+    N   = M'M        Sx  = X'M        Sxx = (X*X)'M        Sxy = X'X
+
+(with missing values set to zero), from which the pairwise covariances,
+variances and correlations follow elementwise.
+
+Spearman correlations are Pearson correlations of ranks, and with missing
+values each pair must be ranked over its own complete rows. Every column is
+sorted once. The ranks of a column over any subset of its rows then follow
+from a cumulative count of the subset along that sort order, with ties given
+their average rank, so no pair is sorted again. The matrix products above
+serve every pair whose complete rows are the present rows of both columns.
+Only the pairs where one column has values the other lacks are ranked over
+their common rows, column-wise and in batches of at most RANK_BATCH values.
+"""
+import numpy as np
+import pandas as pd
+
+# Prefixes of the cost and affordability indicator columns in the 'Data' sheet
+INDICATOR_PREFIXES = ('Cost of', 'Affordability of', 'Percent of the population who cannot afford')
+
+# Name of the correlation table written to summary_stats_results/
+CORRELATION_FILENAME = 'correlation_matrix.csv'
+
+# Largest number of values ranked at once when column pairs must be re-ranked over their common rows
+RANK_BATCH = 1 << 20
+
+
+def indicator_columns(merged_data):
+    """
+    Return the cost and affordability columns of the merged data, in sheet order.
+    """
+    return [column for column in merged_data.columns if str(column).startswith(INDICATOR_PREFIXES)]
+
+
+def _pairwise_pearson(values):
+    """
+    Return (r, n) matrices of pairwise-complete Pearson correlations and counts
+    for the columns of a 2-D float array with NaN for missing values.
+    """
+    present = ~np.isnan(values)
+    mask = present.astype(np.float64)
+
+    # Centre each column on its mean to keep the sums well conditioned
+    centred = np.where(present, values - np.nanmean(values, axis=0), 0.0)
+
+    n = mask.T @ mask
+    sum_x = centred.T @ mask  # sum_x[i, j]: sum of column i over rows where i and j are present
+    sum_xx = (centred * centred).T @ mask
+    sum_xy = centred.T @ centred
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        covariance = sum_xy - sum_x * sum_x.T / n
+        variance_x = sum_xx - sum_x ** 2 / n
+        variance_y = variance_x.T
+        r = covariance / np.sqrt(variance_x * variance_y)
+
+    r = np.clip(r, -1.0, 1.0)
+    r[n < 2] = np.nan
+    return r, n
+
+
+def _gather(rows, positions):
+    """
+    Return rows[k, positions[k]] for every row k of a 2-D array.
+
+    Indexing the flattened array is several times faster than take_along_axis.
+    """
+    offsets = np.arange(0, rows.shape[0] * rows.shape[1], rows.shape[1])[:, None]
+    return rows.ravel()[positions + offsets]
+
+
+def _sort_order(columns):
+    """
+    Return the sort order of each row of `columns`, one column of the data
+    per row with missing values sorted last, and the sorted position of each
+    value. Also return the first and last sorted position of
+    each position's group of tied values for the columns with ties, and a
+    mask of those columns.
+    """
+    order = np.argsort(columns, axis=1, kind='stable')
+    position_of = np.empty_like(order)
+    positions = np.broadcast_to(np.arange(columns.shape[1]), columns.shape)
+    np.put_along_axis(position_of, order, positions, axis=1)
+
+    ordered = _gather(columns, order)
+    starts_group = np.ones(columns.shape, dtype=bool)
+    starts_group[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    # Missing values compare unequal, so only present values can tie
+    tied = ~starts_group.all(axis=1)
+    starts_group, positions = starts_group[tied], positions[tied]
+    ends_group = np.ones(starts_group.shape, dtype=bool)
+    ends_group[:, :-1] = starts_group[:, 1:]
+    first = np.maximum.accumulate(np.where(starts_group, positions, 0), axis=1)
+    last = np.minimum.accumulate(np.where(ends_group, positions, columns.shape[1] - 1)[:, ::-1], axis=1)[:, ::-1]
+    return order, position_of, first, last, tied
+
+
+def _centred_ranks(order, position_of, first, last, tied, subset):
+    """
+    Return the average ranks of each column, one per row of `subset`, over
+    the values where `subset` is True, less their mean, and zero elsewhere,
+    given the columns' _sort_order.
+    """
+    subset = _gather(subset, order)
+    # counts[:, p]: values of the subset among the first p sorted positions
+    counts = np.zeros((len(subset), subset.shape[1] + 1), dtype=np.int32)
+    np.cumsum(subset, axis=1, out=counts[:, 1:])
+    # Without ties a value's rank is the count up to and including it; tied values share the mean rank of their group
+    ranks = counts[:, 1:].astype(np.float64)
+    if tied.any():
+        tied_counts = counts[tied]
+        ranks[tied] = (_gather(tied_counts, first) + _gather(tied_counts, last + 1) + 1) / 2
+    # The ranks 1..m of the subset average (m + 1) / 2 whatever the ties
+    ranks -= (counts[:, -1:] + 1) / 2
+    ranks[~subset] = 0.0
+    return _gather(ranks, position_of)
+
+
+def _pairwise_spearman(values):
+    """
+    Return (r, n) matrices of pairwise-complete Spearman correlations and
+    counts, ranking every pair of columns over the rows where both are present.
+    """
+    columns = np.ascontiguousarray(values.T)
+    present = ~np.isnan(columns)
+    mask = present.astype(np.float64)
+    n = mask @ mask.T
+    order, position_of, first, last, tied = _sort_order(columns)
+    # Row of `first` and `last` holding each tied column
+    tied_row = np.cumsum(tied) - 1
+
+    def ranks_over(i, subset):
+        return _centred_ranks(order[i], position_of[i], first[tied_row[i[tied[i]]]], last[tied_row[i[tied[i]]]],
+                              tied[i], subset)
+
+    # Ranks of each column over its own present rows serve every pair that shares exactly those rows
+    ranks = ranks_over(np.arange(len(columns)), present)
+    squares = np.einsum('ij,ij->i', ranks, ranks)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = ranks @ ranks.T / np.sqrt(np.outer(squares, squares))
+
+    # Re-rank only the pairs whose common rows are fewer than the present rows of either column
+    counts = n.diagonal()
+    left, right = np.nonzero(np.triu((n < counts[:, None]) | (n < counts[None, :]), k=1))
+    batch = max(1, RANK_BATCH // max(len(values), 1))
+    for start in range(0, len(left), batch):
+        i, j = left[start:start + batch], right[start:start + batch]
+        both = present[i] & present[j]
+        x, y = ranks_over(i, both), ranks_over(j, both)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            r[i, j] = r[j, i] = (np.einsum('ij,ij->i', x, y)
+                                 / np.sqrt(np.einsum('ij,ij->i', x, x) * np.einsum('ij,ij->i', y, y)))
+
+    r = np.clip(r, -1.0, 1.0)
+    r[n < 2] = np.nan
+    return r, n
+
+
+def _p_values(r, n):
+    """
+    Return two-sided p-values for correlations `r` estimated from `n` observations,
+    using the t distribution with n - 2 degrees of freedom.
+    """
+    from scipy.stats import t as t_distribution
+
+    degrees = n - 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        statistic = r * np.sqrt(degrees / (1.0 - r * r))
+        p_values = 2 * t_distribution.sf(np.abs(statistic), degrees)
+    p_values[np.abs(r) == 1.0] = 0.0
+    p_values[degrees < 1] = np.nan
+    return p_values
+
+
+def correlation_matrix(merged_data, columns=None, method='pearson'):
+    """
+    Return the correlation matrix of `columns` as a tuple of three DataFrames:
+    (correlations, p_values, counts).
+
+    `method` is 'pearson' or 'spearman'. Missing values are handled pairwise,
+    and for Spearman each pair is ranked over the rows where both columns are
+    present, as DataFrame.corr(method='spearman') does.
+    """
+    if method not in ('pearson', 'spearman'):
+        raise ValueError(f"Unknown correlation method '{method}'; use 'pearson' or 'spearman'")
+
+    columns = indicator_columns(merged_data) if columns is None else list(columns)
+    values = merged_data[columns].to_numpy(dtype=np.float64)
+    r, n = _pairwise_spearman(values) if method == 'spearman' else _pairwise_pearson(values)
+    p_values = _p_values(r, n)
+
+    def as_frame(matrix):
+        return pd.DataFrame(matrix, index=columns, columns=columns)
+
+    return as_frame(r), as_frame(p_values), as_frame(n.astype(np.int64))
+
+
+def correlation_table(merged_data, columns=None, methods=('pearson', 'spearman')):
+    """
+    Return every correlation method in long format, one row per ordered pair
+    of distinct columns, with the coefficient, p-value and observation count.
+    """
+    tables = []
+    for method in methods:
+        r, p_values, n = correlation_matrix(merged_data, columns, method)
+        rows, cols = np.nonzero(~np.eye(len(r), dtype=bool))
+        tables.append(pd.DataFrame({
+            'Variable 1': r.index[rows],
+            'Variable 2': r.columns[cols],
+            'Method': method,
+            'Correlation': r.to_numpy()[rows, cols],
+            'P-value': p_values.to_numpy()[rows, cols],
+            'N': n.to_numpy()[rows, cols],
+        }))
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,193 @@
+"""
+Persistent integer index of the countries and aggregates in the workbook.
+
+The scripts join every table to the country metadata with pd.merge on the
+free-text 'Country Name'/'Table Name' columns and filter aggregates with
+string comparisons. CountryIndex assigns each name an integer code once,
+stores the income group and region as uint8 category codes and flags the
+aggregate rows (regions, income groups and 'WORLD') explicitly. Joining a
+table then hashes its names once into codes; every metadata column, and
+every later filter, is an integer array lookup. loader.merge_metadata and
+the bar chart data of figures.affordability_chart_data select their rows
+this way.
+
+The index is built from the 'Country - Metadata' sheet and saved as an .npz
+file in the cache, keyed on the content hash of the workbook.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from foodprices.loader import CACHE_DIR, DATA_PATH, cache_key
+
+# Aggregate rows of the 'Data' sheet that have no row in the metadata sheet
+EXTRA_AGGREGATES = ['WORLD']
+
+# Code of a missing income group or region
+MISSING_CODE = 255
+
+
+def _category_codes(values):
+    """
+    Return (codes, categories) for an array of labels, with the categories in
+    lexical order and MISSING_CODE for missing labels.
+    """
+    categorical = pd.Categorical(values)
+    codes = categorical.codes.astype(np.uint8)
+    codes[categorical.codes < 0] = MISSING_CODE
+    return codes, np.asarray(categorical.categories, dtype=str)
+
+
+class CountryIndex:
+    """
+    Integer codes for country names with their income group, region and aggregate flag.
+
+    Code i refers to names[i]; names that are not in the index get code -1.
+    """
+
+    def __init__(self, names, income_codes, income_categories, region_codes, region_categories, aggregate):
+        self.names = np.asarray(names, dtype=str)
+        self.income_codes = np.asarray(income_codes, dtype=np.uint8)
+        self.income_categories = np.asarray(income_categories, dtype=str)
+        self.region_codes = np.asarray(region_codes, dtype=np.uint8)
+        self.region_categories = np.asarray(region_categories, dtype=str)
+        self.aggregate = np.asarray(aggregate, dtype=bool)
+        self._lookup = pd.Index(self.names)
+
+    def __len__(self):
+        """
+        Return the number of names in the index.
+        """
+        return len(self.names)
+
+    @classmethod
+    def from_metadata(cls, country_metadata, key='Table Name', extra_aggregates=EXTRA_AGGREGATES):
+        """
+        Build the index from the 'Country - Metadata' sheet.
+
+        Rows without an income group are the regional and income aggregates.
+        Names in `extra_aggregates` that are missing from the metadata, such
+        as 'WORLD', are added as aggregates without an income group or region.
+        """
+        metadata = country_metadata.drop_duplicates(subset=key, keep='first')
+        extra = [name for name in extra_aggregates if name not in set(metadata[key])]
+        names = np.concatenate([metadata[key].to_numpy(dtype=str), np.asarray(extra, dtype=str)])
+
+        missing = [np.nan] * len(extra)
+        income_codes, income_categories = _category_codes(list(metadata['Income Group']) + missing)
+        region_codes, region_categories = _category_codes(list(metadata['Region']) + missing)
+        aggregate = np.concatenate([metadata['Income Group'].isna().to_numpy(), np.ones(len(extra), dtype=bool)])
+        return cls(names, income_codes, income_categories, region_codes, region_categories, aggregate)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with save().
+        """
+        with np.load(path) as arrays:
+            return cls(**{name: arrays[name] for name in arrays.files})
+
+    def save(self, path):
+        """
+        Save the index to `path` as an .npz file.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez(temp_path, names=self.names, income_codes=self.income_codes,
+                 income_categories=self.income_categories, region_codes=self.region_codes,
+                 region_categories=self.region_categories, aggregate=self.aggregate)
+        os.replace(temp_path, path)
+
+    def codes(self, names):
+        """
+        Return the int32 codes of an array of names, with -1 for unknown names.
+        """
+        return self._lookup.get_indexer(pd.Index(np.asarray(names, dtype=object))).astype(np.int32)
+
+    def _take(self, codes, category_codes, categories):
+        """
+        Return a Categorical of the categories at `codes`, missing where the code is -1.
+        """
+        taken = category_codes[codes].astype(np.int16)
+        taken[(codes < 0) | (taken == MISSING_CODE)] = -1
+        return pd.Categorical.from_codes(taken, categories=categories)
+
+    def income_group(self, codes):
+        """
+        Return the income groups of the countries at `codes` as a Categorical.
+        """
+        return self._take(codes, self.income_codes, self.income_categories)
+
+    def region(self, codes):
+        """
+        Return the regions of the countries at `codes` as a Categorical.
+        """
+        return self._take(codes, self.region_codes, self.region_categories)
+
+    def is_aggregate(self, codes):
+        """
+        Return a boolean array marking the aggregate rows among `codes`; unknown names are not aggregates.
+        """
+        return np.where(codes >= 0, self.aggregate[codes], False)
+
+    def join(self, data, on='Country Name'):
+        """
+        Return a copy of `data` with the country code, income group, region
+        and aggregate flag joined on the `on` column.
+
+        Names missing from the index get code -1 and missing metadata, as in
+        a left merge.
+        """
+        codes = self.codes(data[on])
+        joined = data.copy()
+        joined['Country Code'] = codes
+        joined['Income Group'] = self.income_group(codes)
+        joined['Region'] = self.region(codes)
+        joined['Aggregate'] = self.is_aggregate(codes)
+        return joined
+
+    def rows(self, codes, names):
+        """
+        Return the positions in a table with country `codes` of the rows for
+        `names`, in the order given, with -1 for names that have no row.
+
+        This replaces filtering with isin and reordering with reindex.
+        """
+        wanted = self.codes(names)
+        row_of = np.full(len(self) + 1, -1, dtype=np.int64)
+        known = codes >= 0
+        row_of[codes[known]] = np.flatnonzero(known)
+        return row_of[np.where(wanted >= 0, wanted, len(self))]
+
+    def select(self, table, codes, names):
+        """
+        Return the rows of `table`, whose rows have country `codes`, for
+        `names` in the order given, with a RangeIndex.
+
+        Names without a row in `table` get a row of missing values, as with
+        reindex. Where a name has several rows, the last one is taken.
+        """
+        positions = self.rows(codes, names)
+        return table.reset_index(drop=True).reindex(positions).reset_index(drop=True)
+
+
+def index_path(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Return the path of the saved index for the current contents of the workbook.
+    """
+    return os.path.join(cache_dir, f"country-index-{cache_key(data_path)}.npz")
+
+
+def load_country_index(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Return the CountryIndex of a workbook, building and saving it on first use.
+    """
+    path = index_path(data_path, cache_dir)
+    if os.path.exists(path):
+        return CountryIndex.load(path)
+
+    country_metadata = pd.read_excel(data_path, sheet_name='Country - Metadata')
+    index = CountryIndex.from_metadata(country_metadata)
+    index.save(path)
+    return index
@@ -0,0 +1,207 @@
+"""
+Materialised aggregate cube of the diet and food group costs.
+
+The boxplot melts the merged frame into long format on every run, and the
+statistics script runs its own groupby and describe passes. AggregateCube
+computes the measures once for every cell of
+
+    Income Group x Region x (diet type, food group)
+
+where the diet costs use the food group 'All' and the six food group costs
+belong to the healthy diet. Every dimension also has an 'All' member, so
+each rollup (per income group, per region, or overall) is a cell of its own.
+A cell holds the count, sum, sum of squares, min and max of its values and
+a KLL quantile sketch. Any slice is then a few array lookups, with no
+pandas pass over the rows.
+
+Only countries are counted: aggregates have no income group. Every year of
+the data is pooled, like the boxplot and describe(). Countries without a
+region only appear in the cells whose region is 'All'.
+
+The cube of a workbook is cached in .cache/ keyed on its content hash, like
+the merged frame and the food group shares, so it is built once per dataset
+version.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from foodprices.food_groups import FOOD_GROUP_COLUMNS
+from foodprices.incremental import DESCRIBE_INDEX
+from foodprices.loader import CACHE_DIR, DATA_PATH, cache_key
+from foodprices.sketch import KLLSketch
+
+# Label of the member of every dimension that covers all the others
+ALL = 'All'
+
+# Diet cost columns and their diet type labels, as in the boxplot
+DIET_TYPES = {
+    'Cost of an energy sufficient diet': 'Energy sufficient diet',
+    'Cost of a nutrient adequate diet': 'Nutrient adequate diet',
+    'Cost of a healthy diet': 'Healthy diet',
+}
+
+# Columns measured by the cube, keyed by their (diet type, food group) member
+ITEMS = {(label, ALL): column for column, label in DIET_TYPES.items()}
+ITEMS.update({('Healthy diet', label): column for column, label in FOOD_GROUP_COLUMNS.items()})
+
+# Dimensions of the cube, in the order of its arrays and of table()
+DIMENSIONS = ['Income Group', 'Region', 'Diet Type', 'Food Group']
+
+
+class AggregateCube:
+    """
+    Count, sum, sum of squares, min, max and a quantile sketch for every
+    (income group, region, diet type, food group) cell, rollups included.
+    """
+
+    def __init__(self, income_groups, regions, count, total, sumsq, minimum, maximum, sketches):
+        self.income_groups = list(income_groups)
+        self.regions = list(regions)
+        self.items = list(ITEMS)
+        self.count = count
+        self.sum = total
+        self.sumsq = sumsq
+        self.min = minimum
+        self.max = maximum
+        self.sketches = sketches
+        self._income_position = {label: i for i, label in enumerate(self.income_groups)}
+        self._region_position = {label: i for i, label in enumerate(self.regions)}
+        self._item_position = {item: i for i, item in enumerate(self.items)}
+
+    @classmethod
+    def from_merged_data(cls, merged_data, k=200):
+        """
+        Build the cube of a merged frame in one pass over its rows.
+
+        `k` sets the size of the quantile sketches; cells with fewer values
+        than about `k` have exact quantiles.
+        """
+        countries = merged_data[merged_data['Income Group'].notna()]
+        income_codes, income_groups = pd.factorize(countries['Income Group'].astype(object), sort=True)
+        region_codes, regions = pd.factorize(countries['Region'].astype(object), sort=True)
+        # The 'All' member of each dimension comes last
+        shape = (len(income_groups) + 1, len(regions) + 1, len(ITEMS))
+        values = countries[list(ITEMS.values())].to_numpy(dtype=np.float64)
+
+        # Every row counts towards its own cell and the rollups over income group, region or both
+        region_members = [region_codes, np.full(len(countries), shape[1] - 1)]
+        cells, kept = [], []
+        for incomes in (income_codes, np.full(len(countries), shape[0] - 1)):
+            for region_member in region_members:
+                valid = ~np.isnan(values) & (region_member >= 0)[:, None]
+                rows, items = np.nonzero(valid)
+                cells.append(np.ravel_multi_index((incomes[rows], region_member[rows], items), shape))
+                kept.append(values[rows, items])
+        cells, kept = np.concatenate(cells), np.concatenate(kept)
+
+        size = int(np.prod(shape))
+        count = np.bincount(cells, minlength=size)
+        total = np.bincount(cells, weights=kept, minlength=size)
+        sumsq = np.bincount(cells, weights=kept * kept, minlength=size)
+        minimum = np.full(size, np.inf)
+        maximum = np.full(size, -np.inf)
+        np.minimum.at(minimum, cells, kept)
+        np.maximum.at(maximum, cells, kept)
+        minimum[count == 0] = maximum[count == 0] = np.nan
+
+        # One sort groups the values of each cell for its sketch
+        order = np.argsort(cells, kind='stable')
+        bounds = np.cumsum(count)
+        sketches = np.empty(size, dtype=object)
+        for cell, cell_values in enumerate(np.split(kept[order], bounds[:-1])):
+            sketches[cell] = KLLSketch(k).update(cell_values)
+
+        labels = (list(income_groups) + [ALL], list(regions) + [ALL])
+        return cls(*labels, count.reshape(shape), total.reshape(shape), sumsq.reshape(shape),
+                   minimum.reshape(shape), maximum.reshape(shape), sketches.reshape(shape))
+
+    def _position(self, income_group=ALL, region=ALL, diet_type='Healthy diet', food_group=ALL):
+        """
+        Return the array position of a cell, raising KeyError for unknown members.
+        """
+        try:
+            return (self._income_position[income_group], self._region_position[region],
+                    self._item_position[(diet_type, food_group)])
+        except KeyError:
+            raise KeyError(f"No cell for income group '{income_group}', region '{region}', "
+                           f"diet type '{diet_type}' and food group '{food_group}'") from None
+
+    def cell(self, income_group=ALL, region=ALL, diet_type='Healthy diet', food_group=ALL):
+        """
+        Return the count, sum, sum of squares, min, max, mean and standard
+        deviation of one cell as a dict.
+        """
+        position = self._position(income_group, region, diet_type, food_group)
+        count = int(self.count[position])
+        total, sumsq = float(self.sum[position]), float(self.sumsq[position])
+        mean = total / count if count else np.nan
+        # The sum of squares can undershoot the squared sum by rounding when the values are all equal
+        std = np.sqrt(max(sumsq - total * mean, 0.0) / (count - 1)) if count > 1 else np.nan
+        return {'count': count, 'sum': total, 'sumsq': sumsq, 'min': float(self.min[position]),
+                'max': float(self.max[position]), 'mean': mean, 'std': std}
+
+    def quantiles(self, qs, income_group=ALL, region=ALL, diet_type='Healthy diet', food_group=ALL):
+        """
+        Return the estimated quantiles `qs` of one cell, exact while its sketch has not compacted.
+        """
+        return self.sketches[self._position(income_group, region, diet_type, food_group)].quantiles(qs)
+
+    def describe(self, income_group=ALL, region=ALL, diet_type='Healthy diet', food_group=ALL):
+        """
+        Return the statistics of one cell as a Series with the same index as describe().
+        """
+        cell = self.cell(income_group, region, diet_type, food_group)
+        if not cell['count']:
+            return pd.Series([0.0] + [np.nan] * 7, index=DESCRIBE_INDEX)
+        quartiles = self.quantiles([0.25, 0.5, 0.75], income_group, region, diet_type, food_group)
+        return pd.Series([float(cell['count']), cell['mean'], cell['std'], cell['min'], *quartiles, cell['max']],
+                         index=DESCRIBE_INDEX)
+
+    def slice(self, by='Income Group', diet_type='Healthy diet', food_group=ALL):
+        """
+        Return the describe() statistics of one (diet type, food group) per
+        member of `by` ('Income Group' or 'Region'), one row per member
+        without the 'All' rollup.
+        """
+        members = {'Income Group': self.income_groups, 'Region': self.regions}[by][:-1]
+        rows = [self.describe(**{('income_group' if by == 'Income Group' else 'region'): member,
+                                 'diet_type': diet_type, 'food_group': food_group})
+                for member in members]
+        return pd.DataFrame(rows, index=pd.Index(members, name=by))
+
+    def table(self):
+        """
+        Return every non-empty cell as one row of a long-format DataFrame,
+        indexed by the four dimensions.
+        """
+        rows = []
+        for i, income_group in enumerate(self.income_groups):
+            for j, region in enumerate(self.regions):
+                for k, (diet_type, food_group) in enumerate(self.items):
+                    if self.count[i, j, k]:
+                        rows.append([income_group, region, diet_type, food_group,
+                                     *self.describe(income_group, region, diet_type, food_group)])
+        return pd.DataFrame(rows, columns=DIMENSIONS + DESCRIBE_INDEX).set_index(DIMENSIONS)
+
+
+def load_cube(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Return the cube of a workbook, building and caching it on first use.
+    """
+    path = os.path.join(cache_dir, f"aggregate-cube-{cache_key(data_path)}.pkl")
+    if os.path.exists(path):
+        with open(path, 'rb') as handle:
+            return pickle.load(handle)
+
+    from foodprices.loader import load_merged_data
+
+    cube = AggregateCube.from_merged_data(load_merged_data(data_path, cache_dir))
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        pickle.dump(cube, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return cube
@@ -0,0 +1,261 @@
+"""
+Bulk export of every summary table in one long-format file.
+
+The analysis writes each table to its own small CSV. One of them,
+affordability_summary_by_income_group.csv, has a two-row MultiIndex header.
+Loading the results into a warehouse therefore means opening many files with
+different layouts. The export stage stacks every table into one frame with a
+stable schema, EXPORT_COLUMNS, with one row per value:
+
+    table_name     name of the table, the stem of its CSV file
+    group_name     income group or comparison group, 'All' for every country
+    indicator      indicator the value describes
+    compared_with  second indicator of a correlation or second group of a
+                   test, otherwise empty
+    statistic      statistic of the value, e.g. 'mean', '25%' or 'P-value'
+    value          the value itself, as a float
+
+The frame is written in a single write by one of three writers:
+
+- 'sqlite': one SQLite file holding a `results` table, filled in a single
+  transaction;
+- 'parquet': a Parquet dataset partitioned by table_name, when pyarrow is
+  installed;
+- 'csv': one CSV file.
+
+Each writer first writes to a temporary path and then moves it into place, so
+readers never see a partial export. The per-table CSVs are still written by
+the scripts and the pipeline.
+"""
+import os
+import shutil
+
+# Columns of the long-format export
+EXPORT_COLUMNS = ['table_name', 'group_name', 'indicator', 'compared_with', 'statistic', 'value']
+
+# File or directory written by each export format, in the results directory
+EXPORT_FILENAMES = {'sqlite': 'results.sqlite', 'parquet': 'results.parquet', 'csv': 'results.csv'}
+
+# Format used unless another is asked for; SQLite needs nothing beyond the standard library
+EXPORT_FORMAT = 'sqlite'
+
+# Group of the statistics computed over every country
+ALL = 'All'
+
+# Indicator of the tables about the cost of a healthy diet only
+HEALTHY_DIET = 'Cost of a healthy diet'
+
+
+def _long(table_name, frame, **constants):
+    """
+    Return `frame`, already one row per value, with the constant columns set and the columns in export order.
+    """
+    frame = frame.assign(table_name=table_name, **constants)
+    for column in EXPORT_COLUMNS:
+        if column not in frame:
+            frame[column] = None
+    frame = frame[EXPORT_COLUMNS].astype({'value': 'float64'})
+    for column in EXPORT_COLUMNS[:-1]:
+        frame[column] = frame[column].astype(object).where(frame[column].notna(), None)
+    return frame
+
+
+def _describe_rows(table_name, table):
+    """
+    Stack a describe() table: statistics as rows and indicators as columns.
+    """
+    frame = table.rename_axis('statistic').reset_index().melt(id_vars='statistic', var_name='indicator')
+    return _long(table_name, frame, group_name=ALL)
+
+
+def _by_group(table_name, table, indicator=HEALTHY_DIET):
+    """
+    Stack a table with one row per income group and one column per statistic of `indicator`.
+    """
+    frame = table.rename_axis('group_name').reset_index().melt(id_vars='group_name', var_name='statistic')
+    return _long(table_name, frame, indicator=indicator)
+
+
+def _describe_by_group(table_name, table):
+    """
+    Stack a groupby describe() table, whose columns are (indicator, statistic) pairs.
+    """
+    frame = table.T.rename_axis(['indicator', 'statistic']).rename_axis(columns='group_name')
+    frame = frame.reset_index().melt(id_vars=['indicator', 'statistic'], var_name='group_name')
+    return _long(table_name, frame)
+
+
+def _healthy_diet_correlations(table_name, table):
+    """
+    Stack the correlations of each component with the cost of a healthy diet.
+    """
+    frame = table.rename_axis('compared_with').reset_index().melt(id_vars='compared_with', var_name='statistic')
+    return _long(table_name, frame, group_name=ALL, indicator=HEALTHY_DIET)
+
+
+def _correlation_matrix(table_name, table):
+    """
+    Stack the correlation table, naming each statistic after its method, e.g. 'Correlation (spearman)'.
+    """
+    frame = table.rename(columns={'Variable 1': 'indicator', 'Variable 2': 'compared_with'})
+    frame = frame.melt(id_vars=['indicator', 'compared_with', 'Method'], var_name='statistic')
+    frame['statistic'] = frame['statistic'] + ' (' + frame.pop('Method') + ')'
+    return _long(table_name, frame, group_name=ALL)
+
+
+def _group_differences(table_name, table):
+    """
+    Stack the pairwise tests of the difference in mean cost between income groups.
+    """
+    frame = table.rename(columns={'Group 1': 'group_name', 'Group 2': 'compared_with'})
+    frame = frame.melt(id_vars=['group_name', 'compared_with'], var_name='statistic')
+    return _long(table_name, frame, indicator=HEALTHY_DIET)
+
+
+# Every exported table, in export order, with the function stacking it
+RESULT_TABLES = {
+    'diet_cost_summary': _describe_rows,
+    'affordability_summary': _describe_rows,
+    'cost_ratios_summary': _describe_rows,
+    'healthy_diet_correlations': _healthy_diet_correlations,
+    'correlation_matrix': _correlation_matrix,
+    'healthy_diet_cost_by_income_group': _by_group,
+    'affordability_summary_by_income_group': _describe_by_group,
+    'healthy_diet_cost_by_income_group_bootstrap': _by_group,
+    'healthy_diet_cost_income_group_differences': _group_differences,
+}
+
+
+def result_tables(merged_data):
+    """
+    Compute every table of RESULT_TABLES from the merged frame.
+    """
+    from foodprices import bootstrap, correlation, summary
+
+    return {
+        'diet_cost_summary': summary.diet_cost_summary(merged_data),
+        'affordability_summary': summary.affordability_summary(merged_data),
+        'cost_ratios_summary': summary.cost_ratio_summary(merged_data),
+        'healthy_diet_correlations': summary.healthy_diet_correlations(merged_data),
+        'correlation_matrix': correlation.correlation_table(merged_data),
+        'healthy_diet_cost_by_income_group': summary.healthy_diet_cost_by_income_group(merged_data),
+        'affordability_summary_by_income_group': summary.affordability_summary_by_income_group(merged_data),
+        'healthy_diet_cost_by_income_group_bootstrap': bootstrap.bootstrap_group_means(merged_data),
+        'healthy_diet_cost_income_group_differences': bootstrap.permutation_test_groups(merged_data),
+    }
+
+
+def long_format(tables):
+    """
+    Return the tables given by name as one long-format frame with EXPORT_COLUMNS.
+
+    Tables are stacked in RESULT_TABLES order; a Series is treated as a
+    one-column table of means. Unknown table names raise ValueError.
+    """
+    import pandas as pd
+
+    unknown = sorted(set(tables) - set(RESULT_TABLES))
+    if unknown:
+        raise ValueError(f"Unknown tables {unknown}. Available tables: {', '.join(RESULT_TABLES)}")
+
+    frames = []
+    for table_name in sorted(tables, key=list(RESULT_TABLES).index):
+        table = tables[table_name]
+        if isinstance(table, pd.Series):
+            table = table.to_frame('mean')
+        frames.append(RESULT_TABLES[table_name](table_name, table))
+    if not frames:
+        return pd.DataFrame(columns=EXPORT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_sqlite(long, path):
+    """
+    Write the long-format frame to the `results` table of a new SQLite file in one transaction.
+    """
+    import sqlite3
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    connection = sqlite3.connect(temp_path)
+    try:
+        with connection:
+            connection.execute('CREATE TABLE results (table_name TEXT NOT NULL, group_name TEXT, indicator TEXT, '
+                               'compared_with TEXT, statistic TEXT NOT NULL, value REAL)')
+            values = long['value'].astype(object).where(long['value'].notna(), None)
+            connection.executemany('INSERT INTO results VALUES (?, ?, ?, ?, ?, ?)',
+                                   zip(*(long[column] for column in EXPORT_COLUMNS[:-1]), values))
+            connection.execute('CREATE INDEX results_by_table ON results (table_name)')
+    except BaseException:
+        # The transaction was rolled back; leave no partial file behind
+        connection.close()
+        os.remove(temp_path)
+        raise
+    connection.close()
+    os.replace(temp_path, path)
+
+
+def write_parquet(long, path):
+    """
+    Write the long-format frame as a Parquet dataset partitioned by table_name.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("The 'parquet' export needs pyarrow; install it or use the 'sqlite' or 'csv' export")
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    pq.write_to_dataset(pa.Table.from_pandas(long, preserve_index=False), temp_path, partition_cols=['table_name'])
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(temp_path, path)
+
+
+def write_csv(long, path):
+    """
+    Write the long-format frame to one CSV file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    long.to_csv(temp_path, index=False)
+    os.replace(temp_path, path)
+
+
+# Writer of each export format
+WRITERS = {'sqlite': write_sqlite, 'parquet': write_parquet, 'csv': write_csv}
+
+
+def export_results(tables, results_dir, export_format=EXPORT_FORMAT):
+    """
+    Write the tables given by name to the export file of `export_format` in
+    `results_dir` and return its path.
+    """
+    if export_format not in WRITERS:
+        raise ValueError(f"Unknown export format '{export_format}'. Available formats: {', '.join(WRITERS)}")
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, EXPORT_FILENAMES[export_format])
+    WRITERS[export_format](long_format(tables), path)
+    return path
+
+
+def read_export(path):
+    """
+    Read an export of any format back into a long-format frame.
+    """
+    import pandas as pd
+
+    if path.endswith('.sqlite'):
+        import sqlite3
+
+        connection = sqlite3.connect(path)
+        try:
+            return pd.read_sql_query('SELECT * FROM results', connection)
+        finally:
+            connection.close()
+    if path.endswith('.parquet'):
+        long = pd.read_parquet(path)
+        # The partition column comes back as a categorical after the others
+        long['table_name'] = long['table_name'].astype(str)
+        return long[EXPORT_COLUMNS]
+    return pd.read_csv(path)
@@ -0,0 +1,266 @@
+"""
+On-disk cache of rendered figures.
+
+Rendering the bar chart and the boxplot takes most of a run once the data is
+loaded. Each figure is therefore cached under a key built from:
+
+- a hash of the exact data slice it plots (boxplot_data for the boxplot,
+  affordability_chart_data for the bar chart, density_data for the density
+  scatter, the fixed food groups and contributions for the pie chart), so edits to columns a figure does not
+  show never invalidate it. float32 values and categorical columns from
+  the columnar store are hashed as the float64 and text values they stand
+  for, so a slice read from the store and the same slice read from the
+  workbook share one entry;
+- its styling parameters, such as the title, whether it is drawn from
+  pre-aggregated data and the savefig arguments;
+- the source of foodprices/figures.py and foodprices/preaggregate.py and
+  the matplotlib and seaborn versions, so a change to the drawing code renders it again.
+
+A cache hit copies the stored image to the output path instead of drawing
+the figure. The cache directory is bounded in size: entries are refreshed
+on every hit and the least recently used ones are evicted first.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from foodprices.loader import CACHE_DIR
+from foodprices.store import to_float64
+
+# Default location and size bound of the cache
+FIGURE_CACHE_DIR = os.path.join(CACHE_DIR, 'figures')
+MAX_CACHE_BYTES = 64 << 20
+
+# Arguments used to save every project figure
+SAVEFIG_KWARGS = {'bbox_inches': 'tight'}
+
+
+def _canonical(value):
+    """
+    Return a frame, series or array as the workbook loader would give it:
+    float32 values upcast to the float64 values they stand for, and
+    categorical and string columns as plain object columns.
+    """
+    if isinstance(value, pd.Series):
+        return _canonical(value.to_frame()).iloc[:, 0].rename(value.name)
+    if isinstance(value, pd.DataFrame):
+        value = value.copy(deep=False)
+        for position, dtype in enumerate(value.dtypes):
+            if dtype == np.float32:
+                value.isetitem(position, to_float64(value.iloc[:, position].to_numpy()))
+            elif isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)):
+                value.isetitem(position, value.iloc[:, position].astype(object))
+        return value
+    if value.dtype == np.float32:
+        return to_float64(value)
+    return value
+
+
+def _update(digest, value):
+    """
+    Feed a data slice or parameter value into `digest`.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        value = _canonical(value)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        columns = list(value.columns) if isinstance(value, pd.DataFrame) else [value.name]
+        digest.update(repr((columns, [str(dtype) for dtype in np.atleast_1d(value.dtypes)])).encode())
+    elif isinstance(value, np.ndarray):
+        digest.update(repr((value.dtype.str, value.shape)).encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=repr).encode())
+
+
+def _code_version():
+    """
+    Return a hash of the figure code and the plotting library versions.
+
+    The versions are read from the installed package metadata, so a cache
+    hit never imports matplotlib or seaborn.
+    """
+    from importlib.metadata import version
+
+    from foodprices import figures, preaggregate
+
+    source = b''
+    for module in (figures, preaggregate):
+        with open(module.__file__, 'rb') as handle:
+            source += handle.read()
+    return hashlib.sha256(source + f"{version('matplotlib')}/{version('seaborn')}".encode()).hexdigest()
+
+
+def figure_key(name, data, **params):
+    """
+    Return the cache key of figure `name` drawn from the data slice `data`
+    with the styling parameters `params`.
+    """
+    digest = hashlib.sha256()
+    for value in (name, _code_version(), params):
+        _update(digest, value)
+    for value in (data if isinstance(data, (list, tuple)) else [data]):
+        _update(digest, value)
+    return digest.hexdigest()[:32]
+
+
+class FigureCache:
+    """
+    Size-bounded directory of rendered figures with least-recently-used eviction.
+    """
+
+    def __init__(self, cache_dir=FIGURE_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key, extension):
+        """
+        Return the cache file of `key`.
+        """
+        return os.path.join(self.cache_dir, f"{key}{extension}")
+
+    def get(self, key, extension='.png'):
+        """
+        Return the cached file of `key`, marking it as recently used, or None on a miss.
+        """
+        path = self._path(key, extension)
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return path
+
+    def put(self, key, source_path):
+        """
+        Copy a rendered figure into the cache under `key` and evict old entries.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key, os.path.splitext(source_path)[1])
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    def entries(self):
+        """
+        Return (path, size, last use) for every cached figure, least recently used first.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:  # Evicted by another process meanwhile
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return sorted(entries, key=lambda item: item[2])
+
+    def evict(self):
+        """
+        Delete the least recently used figures until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def save(self, key, build, output_path, **savefig_kwargs):
+        """
+        Write the figure for `key` to `output_path`, calling `build` to draw
+        it only on a cache miss. Returns True when the figure was rendered.
+        """
+        cached = self.get(key, os.path.splitext(output_path)[1])
+        if cached is not None:
+            try:
+                shutil.copyfile(cached, output_path)
+                return False
+            except FileNotFoundError:  # Evicted by another process since the lookup
+                pass
+
+        import matplotlib.pyplot as plt
+
+        fig = build()
+        fig.savefig(output_path, **(savefig_kwargs or SAVEFIG_KWARGS))
+        plt.close(fig)
+        self.put(key, output_path)
+        return True
+
+
+def save_boxplot(merged_data, output_path, title='Cost of Diets by Income Group', cache=None, aggregated=None):
+    """
+    Save the cost by income group boxplot through the cache; returns True when it was rendered.
+    """
+    from foodprices.figures import boxplot_data, data_year, plot_cost_by_income_boxplot
+    from foodprices.preaggregate import AGGREGATE_ROWS, use_aggregated
+
+    aggregated = use_aggregated(len(merged_data), AGGREGATE_ROWS, aggregated)
+    key = figure_key('boxplot', boxplot_data(merged_data), title=title, year=data_year(merged_data),
+                     aggregated=aggregated, savefig=SAVEFIG_KWARGS)
+    return (cache or FigureCache()).save(key, lambda: plot_cost_by_income_boxplot(merged_data, title, aggregated),
+                                         output_path)
+
+
+def save_affordability_bar_chart(merged_data, output_path, ordered_countries=None, title=None, cache=None,
+                                 aggregated=None):
+    """
+    Save the affordability bar chart through the cache; returns True when it was rendered.
+    """
+    from foodprices.figures import (ORDERED_COUNTRIES, affordability_chart_data, affordability_title,
+                                    plot_affordability_bar_chart)
+    from foodprices.preaggregate import AGGREGATE_LABELS, use_aggregated
+
+    ordered_countries = ordered_countries or ORDERED_COUNTRIES
+    kwargs = {'ordered_countries': ordered_countries, 'title': title or affordability_title(merged_data),
+              'aggregated': use_aggregated(len(ordered_countries), AGGREGATE_LABELS, aggregated)}
+    key = figure_key('affordability_bar_chart', affordability_chart_data(merged_data, ordered_countries),
+                     title=kwargs['title'], aggregated=kwargs['aggregated'], savefig=SAVEFIG_KWARGS)
+    return (cache or FigureCache()).save(key, lambda: plot_affordability_bar_chart(merged_data, **kwargs), output_path)
+
+
+def save_cost_affordability_density(merged_data, output_path, title='Cost and Affordability of a Healthy Diet',
+                                    cache=None):
+    """
+    Save the density scatter of cost against affordability through the cache; returns True when it was rendered.
+    """
+    from foodprices.figures import data_year, density_data, plot_cost_affordability_density
+
+    key = figure_key('cost_affordability_density', density_data(merged_data), title=title, year=data_year(merged_data),
+                     savefig=SAVEFIG_KWARGS)
+    return (cache or FigureCache()).save(key, lambda: plot_cost_affordability_density(merged_data, title),
+                                         output_path)
+
+
+def save_food_group_pie_chart(output_path, food_groups=None, contributions=None, cache=None):
+    """
+    Save the food group pie chart through the cache; returns True when it was rendered.
+    """
+    from foodprices.figures import FOOD_GROUP_CONTRIBUTIONS, FOOD_GROUPS, plot_food_group_pie_chart
+
+    food_groups = list(FOOD_GROUPS if food_groups is None else food_groups)
+    contributions = list(FOOD_GROUP_CONTRIBUTIONS if contributions is None else contributions)
+    key = figure_key('food_group_pie_chart', [food_groups, contributions], savefig=SAVEFIG_KWARGS)
+    return (cache or FigureCache()).save(key, lambda: plot_food_group_pie_chart(food_groups, contributions),
+                                         output_path)
+
+
+def save_food_group_share_grid(shares, output_path, title=None, cache=None):
+    """
+    Save a grid of food group share pies through the cache; returns True when it was rendered.
+    """
+    from foodprices.figures import plot_food_group_share_grid
+
+    kwargs = {} if title is None else {'title': title}
+    key = figure_key('food_group_share_grid', shares, title=title, savefig=SAVEFIG_KWARGS)
+    return (cache or FigureCache()).save(key, lambda: plot_food_group_share_grid(shares, **kwargs), output_path)
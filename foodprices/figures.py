@@ -0,0 +1,437 @@
+"""
+Figure builders for the cost and affordability of healthy diets.
+
+Each function draws one of the project figures from the merged data frame and
+returns the matplotlib Figure without saving or showing it, so the scripts and
+the pipeline runner can decide what to do with it. Styling is applied inside
+a style context so building one figure never changes the look of the next.
+
+matplotlib and seaborn are imported inside the plotting functions, so the
+data helpers and constants here can be used, and cached figures copied, without
+paying for the plotting libraries.
+
+Frames of many rows are drawn from pre-aggregated data (see
+foodprices.preaggregate): the boxplot from quartiles and whiskers computed in
+NumPy, and the bar chart's bars and labels as one collection each. The
+density scatter always bins its points. Draw time therefore stays about the
+same as the rows grow. The `aggregated` argument forces either mode; by
+default it switches on at AGGREGATE_ROWS rows or AGGREGATE_LABELS bars.
+"""
+# Countries, regions and aggregates shown in the affordability bar chart, in plotting order
+ORDERED_COUNTRIES = [
+    "East Asia & Pacific", "Europe & Central Asia", "Latin America & Caribbean",
+    "Middle East & North Africa", "North America", "South Asia", "Sub-Saharan Africa",
+    "WORLD", "High income", "Upper-middle income", "Lower-middle income", "Low income"
+]
+
+# Food groups and their percentage contributions to the cost of a healthy diet
+FOOD_GROUPS = [
+    'Fruits',
+    'Starchy Staples',
+    'Vegetables',
+    'Animal-Source Foods',
+    'Legumes, Nuts and Seeds',
+    'Oils and Fats'
+]
+FOOD_GROUP_CONTRIBUTIONS = [19.0, 15.9, 20.9, 28.6, 10.7, 4.8]
+
+# Diet cost columns of the boxplot and their short labels
+DIET_COSTS = {
+    'Cost of an energy sufficient diet': 'Energy sufficient diet',
+    'Cost of a nutrient adequate diet': 'Nutrient adequate diet',
+    'Cost of a healthy diet': 'Healthy diet'
+}
+
+# Income groups in the order the boxplot shows them
+INCOME_ORDER = ['Upper-middle-income', 'Lower-middle-income', 'High-income', 'Low-income']
+
+# Columns of the density scatter of cost against affordability
+DENSITY_COLUMNS = ['Cost of a healthy diet', 'Percent of the population who cannot afford a healthy diet']
+
+
+def affordability_chart_data(merged_data, ordered_countries=ORDERED_COUNTRIES):
+    """
+    Return the affordability percentages for the bar chart, indexed by country in plotting order.
+    """
+    # Extract relevant columns for affordability analysis
+    affordability_data = merged_data[['Country Name', 'Income Group', 'Percent of the population who cannot afford sufficient calories', 'Percent of the population who cannot afford nutrient adequacy', 'Percent of the population who cannot afford a healthy diet']]
+
+    # Rename columns for clarity and readability
+    affordability_data.columns = ['Country', 'Income Group', 'Energy Sufficient Diet', 'Nutrient Adequate Diet', 'Healthy Diet']
+
+    # Pick the rows of the specified countries, in order; where a country has several rows, the last one is taken
+    affordability_data = affordability_data.drop_duplicates('Country', keep='last').set_index('Country')
+    return affordability_data.reindex(ordered_countries)
+
+
+def data_year(merged_data):
+    """
+    Return the latest year in the data, which the titles and cost labels name.
+    """
+    return int(merged_data['Time'].max())
+
+
+def affordability_title(merged_data):
+    """
+    Return the default bar chart title, naming the latest year in the data.
+    """
+    return f"Share of Population Unable to Afford Different Diet Standards, {data_year(merged_data)}"
+
+
+def plot_affordability_bar_chart(merged_data, ordered_countries=ORDERED_COUNTRIES, title=None, aggregated=None):
+    """
+    Draw the share of the population unable to afford each diet standard as
+    three horizontal bar charts, one per diet type, sharing the country axis.
+
+    `ordered_countries` lists the rows to show, top to bottom; the figure grows
+    taller when more rows than the default twelve are shown. The title names
+    the year of the data unless `title` is given. With `aggregated` (default:
+    from AGGREGATE_LABELS rows) the bars and their labels are drawn as one
+    collection each.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+
+    from foodprices.preaggregate import AGGREGATE_LABELS, bar_collection, text_collection, use_aggregated
+
+    aggregated = use_aggregated(len(ordered_countries), AGGREGATE_LABELS, aggregated)
+    title = title or affordability_title(merged_data)
+
+    # Step 1: Filter and reorder data for the chart
+    affordability_data = affordability_chart_data(merged_data, ordered_countries)
+
+    # Step 2: Create the plot
+    # Define diet types and corresponding colors for the bar chart
+    diet_types = ['Energy Sufficient Diet', 'Nutrient Adequate Diet', 'Healthy Diet']
+    colours = ['#88CCEE', '#DDCC77', '#117733']  # Light color-blind-friendly palette
+
+    # Create a horizontal bar chart with subplots for each diet type
+    fig, axes = plt.subplots(nrows=1, ncols=3, figsize=(18, max(8, 0.6 * len(affordability_data))), sharey=True)
+
+    for i, diet in enumerate(diet_types):
+        ax = axes[i]
+        if aggregated:
+            # Draw all bars, then all percentage labels, as one collection each
+            values = affordability_data[diet].to_numpy(dtype=np.float64)
+            positions = np.arange(len(values))
+            bar_collection(ax, positions, values, colours[i])
+            text_collection(ax, values + 2, positions, np.char.mod('%.1f%%', values), size=15, weight='bold')
+        else:
+            # Plot the horizontal bar chart
+            ax.barh(affordability_data.index, affordability_data[diet], color=colours[i])
+
+            # Add percentage labels to each bar
+            for index, value in enumerate(affordability_data[diet]):
+                ax.text(value + 2, index, f"{value:.1f}%", va='center', fontsize=15, color='black', fontweight='bold')
+        ax.set_title(diet, fontsize=16, fontweight='bold', pad=15)  # Add title to each subplot
+        ax.set_xlim(0, 100)  # Set x-axis limits to percentage values
+
+        # Remove unnecessary spines and grid lines for a cleaner look
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['bottom'].set_visible(False)
+        ax.spines['left'].set_visible(False)
+        ax.grid(False)
+
+        # Hide y-axis labels for all but the first subplot
+        if i > 0:
+            ax.tick_params(left=False)
+
+    # Step 3: Add shared labels and adjust layout
+    # Set shared y-axis labels for country names
+    axes[0].set_yticks(range(len(affordability_data.index)))
+    axes[0].set_yticklabels(affordability_data.index, fontsize=14, fontweight='bold')
+    axes[0].tick_params(axis='y', labelsize=14)
+
+    # Add a shared x-axis label centered across all subplots
+    fig.text(0.5, 0.02, 'Percentage of Population (%)', ha='center', fontsize=14, fontweight='bold')
+
+    # Add a shared title for the entire figure
+    fig.suptitle(title, fontsize=20, fontweight='bold', y=1.02)
+
+    # Adjust the layout for better spacing
+    fig.tight_layout(w_pad=3, rect=[0, 0.05, 1, 0.95])  # Add space at the top for the title
+
+    return fig
+
+
+def boxplot_data(merged_data):
+    """
+    Return the diet costs in long format, one row per income group and diet type,
+    with rows lacking an income group dropped.
+    """
+    # Each row represents the cost of a specific diet type for a particular income group
+    filtered_data = merged_data.melt(
+        id_vars=['Income Group'],  # Keep the income group as an identifier
+        value_vars=list(DIET_COSTS),
+        var_name='Diet Type',  # Create a column for diet types
+        value_name='Cost'  # Create a column for corresponding costs
+    )
+
+    # Replace long column names with shorter, more readable labels for visualisation
+    filtered_data['Diet Type'] = filtered_data['Diet Type'].replace(DIET_COSTS)
+
+    # Drop rows where the Income Group is missing, as these cannot be categorised
+    return filtered_data.dropna(subset=['Income Group'])
+
+
+def plot_cost_by_income_boxplot(merged_data, title='Cost of Diets by Income Group', aggregated=None):
+    """
+    Draw the distribution of diet costs by income group as a boxplot with one
+    box per diet type. With `aggregated` (default: from AGGREGATE_ROWS rows)
+    the boxes are drawn from statistics computed in NumPy instead of by seaborn.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    from foodprices.preaggregate import AGGREGATE_ROWS, use_aggregated
+
+    aggregated = use_aggregated(len(merged_data), AGGREGATE_ROWS, aggregated)
+
+    # Step 1: Transform the dataset to create a long format suitable for plotting
+    # Pre-aggregated boxes are computed from the wide columns directly
+    filtered_data = None if aggregated else boxplot_data(merged_data)
+
+    # Step 2: Set up the figure and styling for the plot
+    with sns.axes_style("whitegrid"):  # Apply a clean white grid style
+        fig, ax = plt.subplots(figsize=(12, 8))  # Define the figure size
+
+    # Step 3: Define a custom colour palette with 3 distinct colours for the diet types
+    palette = sns.color_palette("Set2", n_colors=3)
+
+    # Step 4: Create a boxplot to visualise the distribution of diet costs by income group
+    # The order is given explicitly so it matches the tick labels set in Step 5
+    if aggregated:
+        # Each diet's boxes sit side by side within the 0.6 width of an income group, as seaborn places them
+        import numpy as np
+        import pandas as pd
+
+        from foodprices.preaggregate import draw_boxes, grouped_box_stats
+
+        codes = pd.Categorical(merged_data['Income Group'], categories=INCOME_ORDER).codes
+        for i, (column, diet) in enumerate(DIET_COSTS.items()):
+            stats = grouped_box_stats(merged_data[column].to_numpy(dtype=np.float64), codes, INCOME_ORDER)
+            draw_boxes(ax, stats, np.arange(len(INCOME_ORDER)) + 0.2 * (i - 1), 0.2, palette[i], label=diet)
+        ax.set_xlim(-0.5, len(INCOME_ORDER) - 0.5)
+    else:
+        sns.boxplot(
+            data=filtered_data,
+            x='Income Group',
+            y='Cost',
+            order=INCOME_ORDER,  # Order the income groups to match the labels
+            hue='Diet Type',  # Differentiate costs by diet type
+            palette=palette,  # Apply the custom colour palette
+            width=0.6,  # Adjust box width for better spacing
+            ax=ax
+        )
+
+    # Step 5: Customise x-axis labels for better readability
+    # Multi-line labels are used to avoid crowding
+    ax.set_xticks([0, 1, 2, 3])  # Positions of the labels
+    ax.set_xticklabels(
+        ['Upper\nmiddle income', 'Lower\nmiddle income', 'High\nincome', 'Low\nincome'],
+        fontsize=14,
+        fontweight='bold'
+    )
+
+    # Step 6: Add gridlines to improve readability of the plot
+    ax.grid(visible=True, which='major', linestyle='--', linewidth=0.7, alpha=0.7)
+
+    # Step 7: Set axis labels and title with increased font size and bold styling
+    ax.set_xlabel('Country Income Group', fontsize=16, fontweight='bold', labelpad=20)  # Add space below x-axis label
+    ax.set_ylabel(f'Cost (USD, {data_year(merged_data)})', fontsize=16, fontweight='bold', labelpad=20)  # Add space to the left of y-axis label
+    ax.set_title(title, fontsize=18, fontweight='bold')  # Add a title
+
+    # Step 8: Customise the legend to stretch horizontally and improve readability
+    ax.legend(
+        fontsize=14,  # Increase font size for legend items
+        title_fontsize=16,  # Increase font size for the legend title
+        loc='upper center',  # Position the legend at the top center
+        bbox_to_anchor=(0.5, -0.25),  # Adjust position to stretch horizontally below the plot
+        ncol=3,  # Arrange legend items in a single row
+        frameon=False  # Remove the legend border
+    )
+
+    # Step 9: Remove unnecessary spines for a cleaner look
+    sns.despine(ax=ax, left=True, bottom=True)
+
+    # Step 10: Adjust layout to ensure all elements fit well within the figure
+    fig.tight_layout(pad=2)  # Add padding around the plot for better spacing
+
+    return fig
+
+
+def plot_food_group_pie_chart(food_groups=FOOD_GROUPS, contributions=FOOD_GROUP_CONTRIBUTIONS):
+    """
+    Draw the average percentage contribution of each food group to the cost of
+    a healthy diet as a pie chart, highlighting animal-source foods.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Step 1: Set up the figure and chart aesthetics
+    # Create the figure with a square layout for balanced visual proportions
+    fig, ax = plt.subplots(figsize=(8, 8))
+    # Use a consistent and visually appealing color palette
+    colors = sns.color_palette("Set2", n_colors=len(contributions))
+
+    # Step 2: Highlight the most important food group
+    explode = [0.05 if group == 'Animal-Source Foods' else 0 for group in food_groups]
+
+    # Step 3: Create the pie chart
+    ax.pie(
+        contributions,
+        labels=None,  # Labels removed from the slices; legend will be used instead
+        autopct='%1.1f%%',  # Display percentages inside the slices
+        startangle=90,  # Align the first slice starting at 90 degrees
+        colors=colors,  # Apply the defined color palette
+        explode=explode,  # Separate the "Animal-Source Foods" slice
+        wedgeprops={'edgecolor': 'white', 'linewidth': 1.5},  # Add white borders for better slice visibility
+        textprops={'fontsize': 12, 'fontweight': 'bold'}  # Set smaller font size for percentages
+    )
+
+    # Step 4: Add a title with proper formatting
+    # Title is split across two lines for better readability
+    ax.set_title(
+        'Average Percentage Contribution of Each Food Group\n to the Cost of a Healthy Diet',
+        fontsize=15, fontweight='bold', pad=20  # Set font size, weight, and padding
+    )
+
+    # Step 5: Add the legend to the right of the chart
+    # Legend is placed vertically to the right for consistency with report style
+    ax.legend(
+        food_groups,  # Labels for the legend
+        loc='center left',  # Position the legend vertically to the left of the chart
+        bbox_to_anchor=(1, 0.5),  # Adjust the legend position
+        fontsize=12,  # Set font size for readability
+        frameon=False  # Remove legend border for a cleaner look
+    )
+
+    # Step 6: Adjust layout
+    # Ensure there is enough spacing around all elements
+    fig.tight_layout(pad=2.5)
+
+    return fig
+
+
+def plot_affordability_sensitivity(curves, baseline_share=0.52,
+                                   title='Share of Population Unable to Afford a Healthy Diet by Affordability Threshold'):
+    """
+    Draw how the share of the population unable to afford a diet changes with
+    the share of income available for food, one line per income group.
+
+    `curves` has one row per income group and one column per share of
+    income, as returned by sensitivity.sweep_by_income_group.
+    """
+    import matplotlib.pyplot as plt
+
+    # Step 1: Order the income groups from poorest to richest where they are present
+    income_order = ['Low-income', 'Lower-middle-income', 'Upper-middle-income', 'High-income']
+    groups = [group for group in income_order if group in curves.index]
+    groups += [group for group in curves.index if group not in groups]
+    colours = ['#117733', '#DDCC77', '#88CCEE', '#CC6677']  # Color-blind-friendly palette of the bar chart
+
+    # Step 2: Draw one curve per income group, with the share of income as a percentage
+    fig, ax = plt.subplots(figsize=(12, 8))
+    shares = 100 * curves.columns.to_numpy(dtype=float)
+    for i, group in enumerate(groups):
+        ax.plot(shares, curves.loc[group].to_numpy(), color=colours[i % len(colours)], linewidth=3,
+                label=group.replace('-', ' ').capitalize())
+
+    # Step 3: Mark the threshold used in the workbook
+    ax.axvline(100 * baseline_share, color='black', linestyle='--', linewidth=1.2)
+    ax.text(100 * baseline_share + 1, 97, f"Workbook threshold ({100 * baseline_share:.0f}%)",
+            va='top', fontsize=13, fontweight='bold')
+
+    # Step 4: Label the axes and the figure
+    ax.set_xlim(shares.min(), shares.max())
+    ax.set_ylim(0, 100)
+    ax.set_xlabel('Share of Income Available for Food (%)', fontsize=14, fontweight='bold', labelpad=15)
+    ax.set_ylabel('Percentage of Population (%)', fontsize=14, fontweight='bold', labelpad=15)
+    ax.tick_params(labelsize=13)
+    ax.set_title(title, fontsize=18, fontweight='bold', pad=15)
+    ax.legend(fontsize=13, frameon=False, loc='upper right')
+
+    # Step 5: Remove unnecessary spines for a cleaner look, as in the bar chart
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.grid(False)
+    fig.tight_layout()
+
+    return fig
+
+
+def plot_food_group_share_grid(shares, title='Food Group Shares of the Cost of a Healthy Diet'):
+    """
+    Draw one pie per row of `shares` (groups × food groups, in percent) as a
+    grid of small multiples sharing one legend, in a single figure.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Step 1: Lay out a grid with up to four pies per row
+    ncols = min(4, len(shares))
+    nrows = -(-len(shares) // ncols)
+    fig, axes = plt.subplots(nrows=nrows, ncols=ncols, figsize=(4.5 * ncols, 4.5 * nrows + 1.5), squeeze=False)
+    colors = sns.color_palette("Set2", n_colors=shares.shape[1])  # Same palette as the food group pie chart
+
+    # Step 2: Draw the pies, labelled without the '(FPN)' suffix of the region names
+    for ax, (group, row) in zip(axes.flat, shares.iterrows()):
+        ax.pie(
+            row.to_numpy(),
+            autopct='%1.0f%%',
+            startangle=90,
+            colors=colors,
+            wedgeprops={'edgecolor': 'white', 'linewidth': 1.5},
+            textprops={'fontsize': 10, 'fontweight': 'bold'},
+            pctdistance=0.75
+        )
+        ax.set_title(str(group).replace(' (FPN)', ''), fontsize=13, fontweight='bold')
+    for ax in axes.flat[len(shares):]:
+        ax.set_visible(False)
+
+    # Step 3: Add one shared legend and the title
+    fig.legend(shares.columns, loc='lower center', ncol=min(6, shares.shape[1]), fontsize=12, frameon=False)
+    fig.suptitle(title, fontsize=18, fontweight='bold')
+    fig.tight_layout(rect=[0, 0.08, 1, 0.95])
+
+    return fig
+
+
+def density_data(merged_data):
+    """
+    Return the cost of a healthy diet and the share unable to afford it for
+    every country row, the points of the density scatter.
+    """
+    return merged_data.loc[merged_data['Income Group'].notna(), DENSITY_COLUMNS]
+
+
+def plot_cost_affordability_density(merged_data, title='Cost and Affordability of a Healthy Diet'):
+    """
+    Draw the cost of a healthy diet against the share of the population unable
+    to afford it as a density scatter: the points are binned in NumPy and each
+    bin is coloured by its number of country-years on a log scale.
+    """
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.colors import LogNorm
+
+    from foodprices.preaggregate import density_grid
+
+    # Step 1: Bin the country-years on a fixed grid
+    points = density_data(merged_data)
+    counts, x_edges, y_edges = density_grid(points[DENSITY_COLUMNS[0]], points[DENSITY_COLUMNS[1]])
+
+    # Step 2: Draw the occupied bins as one mesh
+    fig, ax = plt.subplots(figsize=(10, 8))
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap='viridis',
+                         norm=LogNorm(vmin=1, vmax=max(counts.max(), 1)))
+    fig.colorbar(mesh, ax=ax).set_label('Country-years', fontsize=14, fontweight='bold')
+
+    # Step 3: Label the axes and add the title
+    ax.set_xlabel(f'Cost of a Healthy Diet (USD, {data_year(merged_data)})', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Population Unable to Afford a Healthy Diet (%)', fontsize=14, fontweight='bold')
+    ax.set_title(title, fontsize=18, fontweight='bold')
+    fig.tight_layout(pad=2)
+
+    return fig
@@ -0,0 +1,90 @@
+"""
+Shared datasets for the tests.
+
+Most tests need either the real workbook or a frame with its schema at some
+size. Loading the workbook in every setUp reparses or unpickles it once per
+test. These helpers load each dataset once per process and hand every
+caller its own copy, so tests may modify what they get:
+
+- workbook() returns the merged frame of the real workbook, and
+  workbook_sheets() its raw 'Data' and 'Country - Metadata' sheets, each
+  loaded once per test session (per worker process under pytest-xdist);
+- synthetic_sheets() and synthetic_merged() return synthetic 'Data' and
+  'Country - Metadata' sheets from foodprices.synthetic, or their merged
+  frame, at any number of rows, generated in memory without touching disk.
+
+load_script imports one of the scripts in scripts/ as a module, so tests can
+call its functions on one of these frames instead of running it.
+"""
+import importlib.util
+import os
+
+from foodprices.loader import DATA_PATH, cache_key
+
+# Directory holding the analysis scripts
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+
+# Datasets already loaded by this process
+_LOADED = {}
+
+
+def _memoised(key, build):
+    """
+    Return a copy of the dataset stored under `key`, building it with `build` on first use.
+    """
+    if key not in _LOADED:
+        _LOADED[key] = build()
+    value = _LOADED[key]
+    if isinstance(value, tuple):
+        return tuple(frame.copy() for frame in value)
+    return value.copy()
+
+
+def workbook(data_path=DATA_PATH):
+    """
+    Return a copy of the merged data and metadata frame of a workbook,
+    loaded once per process and content hash.
+    """
+    from foodprices.loader import load_merged_data
+
+    return _memoised(('workbook', os.path.abspath(data_path), cache_key(data_path)),
+                     lambda: load_merged_data(data_path))
+
+
+def workbook_sheets(data_path=DATA_PATH):
+    """
+    Return copies of the (main_data, country_metadata) sheets of a workbook,
+    parsed once per process and content hash.
+    """
+    from foodprices.loader import read_workbook
+
+    return _memoised(('sheets', os.path.abspath(data_path), cache_key(data_path)), lambda: read_workbook(data_path))
+
+
+def synthetic_sheets(n_rows=1000, seed=0):
+    """
+    Return copies of synthetic (main_data, country_metadata) sheets with `n_rows` data rows.
+    """
+    from foodprices.synthetic import MAX_ENTITIES, synthetic_data, synthetic_metadata
+
+    return _memoised(('synthetic sheets', n_rows, seed),
+                     lambda: (synthetic_data(n_rows, seed), synthetic_metadata(min(n_rows, MAX_ENTITIES), seed)))
+
+
+def synthetic_merged(n_rows=1000, seed=0):
+    """
+    Return a copy of a synthetic merged frame with `n_rows` rows, like workbook().
+    """
+    from foodprices.synthetic import synthetic_merged_data
+
+    return _memoised(('synthetic merged', n_rows, seed), lambda: synthetic_merged_data(n_rows, seed))
+
+
+def load_script(name):
+    """
+    Import scripts/<name>.py as a module without running its main().
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(SCRIPTS_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,124 @@
+"""
+Decomposition of the cost of a healthy diet into food groups.
+
+The workbook gives the cost of each of the six food groups of a healthy diet
+per country. Dividing each row by its total gives every country's shares in
+one vectorised step. The income-group and regional shares are
+population-weighted means of the country shares. Countries without a
+population figure are left out of the weights, and a group with no
+population figures at all falls back to the plain mean. Aggregates are left
+out of the group tables, so no country is counted twice.
+
+The share tables of a workbook are cached in .cache/ keyed on its content
+hash, like the merged frame and the country index.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from foodprices.loader import CACHE_DIR, DATA_PATH, cache_key
+
+# Food group cost columns and their labels, in the order of the pie chart
+FOOD_GROUP_COLUMNS = {
+    'Cost of fruits': 'Fruits',
+    'Cost of starchy staples': 'Starchy Staples',
+    'Cost of vegetables': 'Vegetables',
+    'Cost of animal-source foods': 'Animal-Source Foods',
+    'Cost of legumes, nuts and seeds': 'Legumes, Nuts and Seeds',
+    'Cost of oils and fats': 'Oils and Fats',
+}
+
+# Groupings with a share table of their own, besides the per-country table
+GROUPINGS = ['Income Group', 'Region']
+
+
+def country_shares(merged_data):
+    """
+    Return each country's food group shares of the cost of a healthy diet,
+    in percent, indexed by 'Country Name'.
+
+    Rows missing any food group cost have missing shares, since their total is unknown.
+    """
+    costs = merged_data[list(FOOD_GROUP_COLUMNS)].to_numpy(dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        shares = 100 * costs / costs.sum(axis=1, keepdims=True)
+    shares[~(np.isfinite(shares).all(axis=1))] = np.nan
+    return pd.DataFrame(shares, index=pd.Index(merged_data['Country Name'].to_numpy(), name='Country Name'),
+                        columns=list(FOOD_GROUP_COLUMNS.values()))
+
+
+def group_shares(merged_data, by='Income Group', weights='Population'):
+    """
+    Return the food group shares per value of the `by` column, as the
+    `weights`-weighted mean of the country shares (unweighted when `weights` is None).
+    """
+    countries = merged_data['Income Group'].notna().to_numpy()
+    shares = country_shares(merged_data)[countries].reset_index(drop=True)
+    groups = merged_data.loc[countries, by].astype(object).to_numpy()
+    valid = shares.notna().all(axis=1).to_numpy()
+
+    if weights is None:
+        weight = np.ones(len(shares))
+    else:
+        weight = merged_data.loc[countries, weights].to_numpy(dtype=np.float64)
+    weighted = np.isfinite(weight) & valid
+    weight = np.where(weighted, weight, 0.0)
+
+    # One grouped sum gives both the weighted and the plain means
+    totals = pd.DataFrame(np.column_stack([
+        np.where(weighted[:, None], shares.to_numpy() * weight[:, None], 0.0),
+        np.where(valid[:, None], shares.to_numpy(), 0.0),
+        weight, valid,
+    ])).groupby(groups).sum()
+    k = shares.shape[1]
+    weight_total, count = totals.iloc[:, 2 * k].to_numpy(), totals.iloc[:, 2 * k + 1].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where((weight_total > 0)[:, None],
+                          totals.iloc[:, :k].to_numpy() / weight_total[:, None],
+                          totals.iloc[:, k:2 * k].to_numpy() / count[:, None])
+    return pd.DataFrame(result, index=pd.Index(totals.index, name=by), columns=shares.columns)
+
+
+def average_shares(merged_data):
+    """
+    Return each food group's average share of the cost of a healthy diet, in
+    percent, as drawn in the food group pie chart.
+
+    This is the mean cost of each food group over the countries reporting all
+    six, as a percentage of the sum of those means.
+    """
+    countries = merged_data['Income Group'].notna().to_numpy()
+    means = merged_data.loc[countries, list(FOOD_GROUP_COLUMNS)].astype('float64').dropna().mean()
+    return (100 * means / means.sum()).set_axis(list(FOOD_GROUP_COLUMNS.values()))
+
+
+def share_tables(merged_data, weights='Population'):
+    """
+    Return {'Country': ..., 'Income Group': ..., 'Region': ...} food group share tables.
+    """
+    tables = {'Country': country_shares(merged_data)}
+    for by in GROUPINGS:
+        tables[by] = group_shares(merged_data, by, weights)
+    return tables
+
+
+def load_share_tables(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Return the share tables of a workbook, computing and caching them on first use.
+    """
+    path = os.path.join(cache_dir, f"food-group-shares-{cache_key(data_path)}.pkl")
+    if os.path.exists(path):
+        with open(path, 'rb') as handle:
+            return pickle.load(handle)
+
+    from foodprices.loader import load_merged_data
+
+    tables = share_tables(load_merged_data(data_path, cache_dir))
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        pickle.dump(tables, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return tables
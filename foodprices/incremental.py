@@ -0,0 +1,371 @@
+"""
+Incremental recomputation of the summary statistics.
+
+When the World Bank publishes a revised or extended workbook, only the new
+or changed country rows need processing. IncrementalStatistics keeps
+sufficient statistics for every summary column, overall and per income
+group, and persists them between runs together with the last-seen values of
+each (country, year) row.
+
+On update, new rows are added to the running statistics, and changed rows
+are retracted and re-added. Count, mean and the centred sum of squares are
+retracted exactly. Min, max and the KLL quantile sketch cannot forget a
+value, so after a retraction they are rebuilt from the snapshot, but only
+for the columns and income groups the retracted rows belong to. Added rows
+never cause a rebuild. The trade-off is that revising a single row rescans
+that row's income group, and the overall statistics of its columns, from
+the snapshot; extending the data with new rows rescans nothing. Callers
+that know which rows changed can pass only those rows, and then nothing
+else is compared either.
+
+Columns with at most k values (200 by default), such as those of the
+workbook, keep every value in their sketch, so their quartiles equal those
+of describe(); larger columns get quartiles within the sketch's rank error
+of about 1.7 / k.
+
+The tables it produces have the same layout as describe() and are written
+to the same CSV files as the summary statistics script.
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from foodprices.loader import CACHE_DIR
+from foodprices.sketch import KLLSketch
+from foodprices.summary import AFFORDABILITY_COLUMNS, COST_RATIO_COLUMNS, DIET_COST_COLUMNS, add_cost_ratios
+
+# Default location of the persisted statistics
+STATE_PATH = os.path.join(CACHE_DIR, 'incremental_state.pkl')
+
+# Columns summarised by the incremental mode
+TRACKED_COLUMNS = DIET_COST_COLUMNS + AFFORDABILITY_COLUMNS + COST_RATIO_COLUMNS
+
+# Row labels of describe(), in order
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+# Columns identifying a row of the workbook
+ROW_KEY = ['Country Name', 'Time']
+
+
+def _present(values):
+    """
+    Return the non-missing values of an array as float64.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    return values[~np.isnan(values)]
+
+
+class ColumnStats:
+    """
+    Mergeable sufficient statistics for one column: count, mean, centred sum
+    of squares, min, max and a quantile sketch, a KLLSketch of size `k`
+    unless another empty sketch is given.
+
+    The mean and centred sum of squares are combined with Chan's parallel
+    update, which stays accurate where a raw sum of squares would cancel.
+    """
+
+    def __init__(self, k=200, sketch=None):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch = KLLSketch(k) if sketch is None else sketch
+
+    def _combine(self, count, mean, m2):
+        """
+        Fold a batch with the given count, mean and centred sum of squares into the totals.
+        """
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        """
+        Add an array of values, ignoring NaN, and return this object.
+        """
+        values = _present(values)
+        if len(values):
+            batch_mean = values.mean()
+            self._combine(len(values), batch_mean, float(((values - batch_mean) ** 2).sum()))
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        """
+        Merge the statistics of another ColumnStats into this one and return this object.
+        """
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.sketch.merge(other.sketch)
+        return self
+
+    def retract(self, values):
+        """
+        Remove previously added values from the count, mean and centred sum of squares.
+
+        This is _combine run backwards on the batch. Min, max and the sketch
+        are left untouched, since a sketch cannot forget a value; call
+        rebuild with the remaining values to bring them up to date.
+        """
+        values = _present(values)
+        if not len(values):
+            return self
+        if len(values) >= self.count:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return self
+        batch_mean = values.mean()
+        total = self.count - len(values)
+        mean = (self.mean * self.count - batch_mean * len(values)) / total
+        delta = batch_mean - mean
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        self.m2 = max(self.m2 - batch_m2 - delta * delta * total * len(values) / self.count, 0.0)
+        self.mean, self.count = mean, total
+        return self
+
+    def rebuild(self, values, sketch):
+        """
+        Replace min, max and the sketch with those of the column's remaining
+        `values`, added to the empty `sketch`, and return this object.
+
+        Count, mean and the centred sum of squares are kept as they are.
+        """
+        values = _present(values)
+        self.min = float(values.min()) if len(values) else np.inf
+        self.max = float(values.max()) if len(values) else -np.inf
+        self.sketch = sketch.update(values)
+        return self
+
+    def quartiles(self):
+        """
+        Return the estimated 25%, 50% and 75% quantiles.
+        """
+        return self.sketch.quantiles([0.25, 0.5, 0.75])
+
+    def describe(self):
+        """
+        Return the statistics as a Series with the same index as describe().
+        """
+        if not self.count:
+            return pd.Series([0.0] + [np.nan] * 7, index=DESCRIBE_INDEX)
+        std = np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+        return pd.Series([float(self.count), self.mean, std, self.min, *self.quartiles(), self.max],
+                         index=DESCRIBE_INDEX)
+
+
+class SummaryStatistics:
+    """
+    ColumnStats for a set of columns, over every row and within each group,
+    with describe()-style summary tables.
+    """
+
+    def __init__(self, group='Income Group', columns=TRACKED_COLUMNS, k=200, sketch=None):
+        self.group = group
+        self.columns = list(columns)
+        self.k = k
+        # Called with no arguments for the empty sketch of each column and group; a KLLSketch of size k when None
+        self.sketch = sketch
+        self.overall = {column: self._new_stats() for column in self.columns}
+        self.by_group = {}
+
+    def _new_sketch(self):
+        """
+        Return an empty quantile sketch for one column and group.
+        """
+        return KLLSketch(self.k) if self.sketch is None else self.sketch()
+
+    def _new_stats(self):
+        """
+        Return empty statistics for one column and group.
+        """
+        return ColumnStats(self.k, self._new_sketch())
+
+    def _group_stats(self, group, column):
+        """
+        Return the statistics of `column` within group `group`, creating them if needed.
+        """
+        group_stats = self.by_group.setdefault(group, {})
+        if column not in group_stats:
+            group_stats[column] = self._new_stats()
+        return group_stats[column]
+
+    def merge(self, other):
+        """
+        Merge the statistics of another SummaryStatistics of the same columns into this one and return this object.
+        """
+        for column in self.columns:
+            self.overall[column].merge(other.overall[column])
+        for group, group_stats in other.by_group.items():
+            for column, stats in group_stats.items():
+                self._group_stats(group, column).merge(stats)
+        return self
+
+    def _add(self, rows):
+        """
+        Add the tracked columns of a frame of rows to the overall and group statistics.
+
+        Rows with a missing group only count towards the overall statistics,
+        as in groupby().
+        """
+        for column in self.columns:
+            self.overall[column].update(rows[column].to_numpy(dtype=np.float64))
+            for group, values in rows.groupby(self.group, observed=True)[column]:
+                self._group_stats(group, column).update(values.to_numpy(dtype=np.float64))
+
+    def _retract(self, rows):
+        """
+        Remove the tracked columns of a frame of previously added rows from the statistics.
+        """
+        for column in self.columns:
+            self.overall[column].retract(rows[column].to_numpy(dtype=np.float64))
+            for group, values in rows.groupby(self.group, observed=True)[column]:
+                self._group_stats(group, column).retract(values.to_numpy(dtype=np.float64))
+
+    def summary(self, columns):
+        """
+        Return describe()-style statistics for `columns` over every row.
+        """
+        return pd.DataFrame({column: self.overall[column].describe() for column in columns})
+
+    def summary_by_group(self, columns):
+        """
+        Return describe()-style statistics for `columns` within each group,
+        with the same two-level column header as groupby().describe().
+        """
+        groups = sorted(self.by_group)
+        table = {
+            (column, statistic): [self._group_stats(group, column).describe()[statistic] for group in groups]
+            for column in columns for statistic in DESCRIBE_INDEX
+        }
+        return pd.DataFrame(table, index=pd.Index(groups, name=self.group))
+
+
+class IncrementalStatistics(SummaryStatistics):
+    """
+    Persisted per-column and per-income-group statistics that can be updated
+    with only the rows that changed since the previous update.
+
+    Rows are identified by the `key` columns, a country and year by default.
+    """
+
+    def __init__(self, key=ROW_KEY, group='Income Group', columns=TRACKED_COLUMNS, k=200):
+        super().__init__(group, columns, k)
+        self.key = [key] if isinstance(key, str) else list(key)
+        self.snapshot = pd.DataFrame(columns=self.key + [group] + self.columns).set_index(self.key)
+
+    @classmethod
+    def load(cls, path=STATE_PATH):
+        """
+        Return the statistics saved at `path`, or a fresh instance if there are none.
+        """
+        if os.path.exists(path):
+            with open(path, 'rb') as handle:
+                return pickle.load(handle)
+        return cls()
+
+    def save(self, path=STATE_PATH):
+        """
+        Persist the statistics and the row snapshot to `path`.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as handle:
+            pickle.dump(self, handle)
+        os.replace(temp_path, path)
+
+    def _rows(self, merged_data):
+        """
+        Return the tracked columns of the merged data indexed by the row key.
+        """
+        rows = add_cost_ratios(merged_data)[self.key + [self.group] + self.columns]
+        rows = rows.drop_duplicates(subset=self.key, keep='last').set_index(self.key)
+        rows[self.group] = rows[self.group].astype(object)
+        return rows
+
+    def _rebuild(self, retracted):
+        """
+        Rebuild min, max and the sketch of every column and group that lost a
+        value in `retracted` from the updated snapshot.
+        """
+        for column in self.columns:
+            lost = retracted[retracted[column].notna()]
+            if lost.empty:
+                continue
+            values = self.snapshot[column].to_numpy(dtype=np.float64)
+            self.overall[column].rebuild(values, self._new_sketch())
+            groups = self.snapshot[self.group]
+            for group in lost[self.group].dropna().unique():
+                self._group_stats(group, column).rebuild(values[(groups == group).to_numpy()], self._new_sketch())
+
+    def update(self, merged_data, complete=True):
+        """
+        Fold the new and changed rows of `merged_data` into the statistics.
+
+        Rows are matched to the snapshot on the row key. With complete=True
+        `merged_data` is the whole new dataset, and snapshot rows missing from
+        it are removed. With complete=False it holds only new or revised rows;
+        nothing is removed and only those rows are compared with the snapshot.
+        Returns a dict with the number of added, changed and removed rows.
+        """
+        rows = self._rows(merged_data)
+        previous = self.snapshot
+
+        known = rows.index.isin(previous.index)
+        added = rows.index[~known]
+        common = rows.index[known]
+        removed = previous.index.difference(rows.index) if complete else previous.index[:0]
+        old_common = previous.loc[common, rows.columns]
+        new_common = rows.loc[common]
+        differs = ~((old_common == new_common) | (old_common.isna() & new_common.isna())).all(axis=1)
+        changed = common[differs.to_numpy()]
+
+        # Retract the old version of changed and removed rows, then add the new version of added and changed rows
+        retracted = previous.loc[changed.append(removed)]
+        self._retract(retracted)
+        self._add(rows.loc[added.append(changed)])
+
+        snapshot = previous.drop(removed) if len(removed) else previous
+        if len(changed):
+            snapshot.loc[changed, rows.columns] = rows.loc[changed]
+        if len(added):
+            snapshot = rows.loc[added] if snapshot.empty else pd.concat([snapshot, rows.loc[added]])
+        self.snapshot = snapshot
+        self._rebuild(retracted)
+
+        return {'added': len(added), 'changed': len(changed), 'removed': len(removed)}
+
+
+def update_summary_files(merged_data, results_dir='./summary_stats_results', state_path=STATE_PATH, complete=True):
+    """
+    Update the persisted statistics with `merged_data` and rewrite the summary CSVs.
+
+    Writes diet_cost_summary.csv, affordability_summary.csv,
+    cost_ratios_summary.csv and affordability_summary_by_income_group.csv,
+    and returns the counts of added, changed and removed rows. With
+    complete=False `merged_data` holds only new or revised rows.
+    """
+    statistics = IncrementalStatistics.load(state_path)
+    counts = statistics.update(merged_data, complete)
+    statistics.save(state_path)
+    write_summary_files(statistics, results_dir)
+    return counts
+
+
+def write_summary_files(statistics, results_dir='./summary_stats_results'):
+    """
+    Write the summary CSVs of a SummaryStatistics in the layout of the summary statistics script.
+    """
+    statistics.summary(DIET_COST_COLUMNS).to_csv(os.path.join(results_dir, 'diet_cost_summary.csv'), index=True)
+    statistics.summary(AFFORDABILITY_COLUMNS).to_csv(os.path.join(results_dir, 'affordability_summary.csv'), index=True)
+    statistics.summary(COST_RATIO_COLUMNS).to_csv(os.path.join(results_dir, 'cost_ratios_summary.csv'), index=True)
+    statistics.summary_by_group(AFFORDABILITY_COLUMNS).to_csv(
+        os.path.join(results_dir, 'affordability_summary_by_income_group.csv'))
@@ -0,0 +1,127 @@
+"""
+Shared loading layer for the Food Prices for Nutrition workbook.
+
+Every script and test used to call pd.read_excel on the 'Data' and
+'Country - Metadata' sheets and redo the same Country Name/Table Name merge.
+This module does that once and keeps the merged frame in an on-disk cache
+keyed on the content hash of the workbook, so a workbook is only parsed
+again when its bytes change.
+
+pandas is imported inside the functions that need it, so importing the
+paths and the cache key (as the command-line interface does) stays cheap.
+"""
+import hashlib
+import os
+
+# Default locations, relative to the repository root like the rest of the project
+DATA_PATH = './data/Food_Prices_For_Nutrition.xlsx'
+CACHE_DIR = './.cache'
+
+# Bump this whenever the shape of the cached frame changes so old entries are ignored
+CACHE_VERSION = '1'
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """
+    Return the SHA-256 hex digest of the file at `path`.
+
+    The file is read in fixed-size chunks so large workbooks are hashed
+    without being held in memory.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path):
+    """
+    Return the cache key for a workbook: its content hash plus the cache version.
+    """
+    return f"{file_hash(path)[:32]}-v{CACHE_VERSION}"
+
+
+def read_workbook(data_path=DATA_PATH):
+    """
+    Parse the 'Data' and 'Country - Metadata' sheets in a single pass over the file.
+
+    Returns a (main_data, country_metadata) tuple of DataFrames.
+    """
+    import pandas as pd
+
+    sheets = pd.read_excel(data_path, sheet_name=['Data', 'Country - Metadata'])
+    return sheets['Data'], sheets['Country - Metadata']
+
+
+def merge_metadata(main_data, country_metadata):
+    """
+    Merge the main data with the country metadata on country names.
+
+    This is the left merge every script performed by hand, adding the
+    income group and region classifications to each row of the 'Data' sheet.
+    The names are hashed once into CountryIndex codes and the metadata rows
+    are gathered by code, giving the same frame as pd.merge on the names
+    (names are unique in the metadata sheet, so no data row is repeated).
+    """
+    import pandas as pd
+
+    from foodprices.country_index import CountryIndex
+
+    country_metadata = country_metadata.drop_duplicates(subset='Table Name')
+    index = CountryIndex.from_metadata(country_metadata, extra_aggregates=[])
+    matched = index.select(country_metadata, index.codes(country_metadata['Table Name']), main_data['Country Name'])
+    return pd.concat([main_data.reset_index(drop=True), matched], axis=1)
+
+
+def _parquet_available():
+    """
+    Return True when a Parquet engine is installed.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _cache_path(cache_dir, key):
+    """
+    Return the cache file for `key`, using Parquet when possible and pickle otherwise.
+    """
+    extension = 'parquet' if _parquet_available() else 'pkl'
+    return os.path.join(cache_dir, f"merged-{key}.{extension}")
+
+
+def load_merged_data(data_path=DATA_PATH, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Load the workbook and return the merged data and metadata frame.
+
+    The merged frame is cached under `cache_dir` keyed on the content hash of
+    the workbook. A cached copy is returned when one exists for the current
+    bytes of the file; otherwise the workbook is parsed, merged and written to
+    the cache. Pass use_cache=False to always parse the workbook.
+    """
+    if not use_cache:
+        return merge_metadata(*read_workbook(data_path))
+
+    path = _cache_path(cache_dir, cache_key(data_path))
+    if os.path.exists(path):
+        import pandas as pd
+
+        if path.endswith('.parquet'):
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    merged_data = merge_metadata(*read_workbook(data_path))
+
+    # Write to a temporary file first so a crash never leaves a truncated cache entry
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    if path.endswith('.parquet'):
+        merged_data.to_parquet(temp_path)
+    else:
+        merged_data.to_pickle(temp_path)
+    os.replace(temp_path, path)
+
+    return merged_data
@@ -0,0 +1,175 @@
+"""
+Panel of several workbook vintages indexed by (country code, year).
+
+Each workbook is a snapshot (ICP 2017, ICP 2021, annual extrapolations).
+Panel loads the vintages lazily, on first use, and gives every country one
+integer code from a CountryIndex built over all of them, so the same
+country lines up across vintages. Where several vintages report the same
+country and year, the one listed last wins, so a revised vintage replaces
+the figures it revises.
+
+Year-over-year changes and compound annual growth rates of every 'Cost of'
+and 'Percent of the population who cannot afford' column are computed on the
+sorted panel in one vectorised pass over the whole array, with no Python
+loops over years or countries.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from foodprices.country_index import CountryIndex
+from foodprices.loader import load_merged_data
+
+# Columns whose changes the panel reports
+PANEL_PREFIXES = ('Cost of', 'Percent of the population who cannot afford')
+
+# Index levels of the panel
+PANEL_INDEX = ['Country Code', 'Time']
+
+
+def _growth(current, previous, years):
+    """
+    Return the absolute change and the compound annual growth rate from
+    `previous` to `current` over `years` years, as arrays of the same shape.
+
+    The growth rate is missing where the base value is not positive or the
+    number of years is not positive.
+    """
+    change = current - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = (current / previous) ** (1 / years) - 1
+    cagr[~((previous > 0) & (years > 0))] = np.nan
+    return change, cagr
+
+
+class Panel:
+    """
+    Lazily loaded panel of workbook vintages.
+
+    `vintages` lists workbook paths, or merged data frames such as the
+    output of loader.load_merged_data, from oldest to newest.
+    """
+
+    def __init__(self, vintages):
+        self.vintages = list(vintages)
+        self.index = None
+        self._data = None
+
+    def _load(self, vintage):
+        """
+        Return the merged data of one vintage.
+        """
+        if isinstance(vintage, pd.DataFrame):
+            return vintage
+        return load_merged_data(vintage)
+
+    @property
+    def data(self):
+        """
+        The panel as one frame indexed by (Country Code, Time), loaded on first use.
+        """
+        if self._data is None:
+            frames = [self._load(vintage) for vintage in self.vintages]
+
+            # Newer metadata takes precedence; names without metadata, like 'WORLD', become aggregates
+            metadata = pd.concat([frame[['Table Name', 'Income Group', 'Region']] for frame in reversed(frames)])
+            metadata = metadata.dropna(subset=['Table Name']).astype(object)
+            names = pd.unique(pd.concat([frame['Country Name'] for frame in frames]).astype(object))
+            self.index = CountryIndex.from_metadata(metadata, extra_aggregates=names)
+
+            combined = pd.concat([frame.drop(columns=['Income Group', 'Region']) for frame in frames],
+                                 ignore_index=True)
+            combined = self.index.join(combined)
+            combined = combined.drop_duplicates(subset=PANEL_INDEX, keep='last')
+            self._data = combined.set_index(PANEL_INDEX).sort_index()
+        return self._data
+
+    def years(self):
+        """
+        Return the years in the panel, in order.
+        """
+        return self.data.index.get_level_values('Time').unique().sort_values().tolist()
+
+    def indicator_columns(self):
+        """
+        Return the cost and unaffordability columns of the panel.
+        """
+        return [column for column in self.data.columns if str(column).startswith(PANEL_PREFIXES)]
+
+    def year(self, year):
+        """
+        Return the rows of one year as a merged data frame, as the figures and summaries expect.
+        """
+        return self.data.xs(year, level='Time').reset_index().assign(Time=year)
+
+    def changes(self, columns=None):
+        """
+        Return the change of each column since the previous year the same
+        country reported, and its compound annual growth rate.
+
+        The result is indexed like the panel, with two-level columns
+        ('Change', column) and ('CAGR', column), plus the base year of each
+        comparison. The first year of each country has no base and is missing.
+        """
+        data = self.data
+        columns = columns or self.indicator_columns()
+        values = data[columns].to_numpy(dtype=np.float64)
+        codes = data.index.get_level_values('Country Code').to_numpy()
+        years = data.index.get_level_values('Time').to_numpy(dtype=np.float64)
+
+        # The panel is sorted by country then year, so the previous row of the same country is the base
+        same_country = np.r_[False, codes[1:] == codes[:-1]]
+        previous = np.vstack([np.full((1, len(columns)), np.nan), values[:-1]])
+        previous[~same_country] = np.nan
+        base_year = np.r_[np.nan, years[:-1]]
+        base_year[~same_country] = np.nan
+
+        change, cagr = _growth(values, previous, (years - base_year)[:, None])
+        result = pd.concat({
+            'Change': pd.DataFrame(change, index=data.index, columns=columns),
+            'CAGR': pd.DataFrame(cagr, index=data.index, columns=columns),
+        }, axis=1)
+        result.insert(0, ('Base Year', ''), base_year)
+        return result
+
+    def change_between(self, start, end, columns=None):
+        """
+        Return the change of each column from year `start` to year `end` for
+        every country reporting both years, with its compound annual growth rate.
+        """
+        columns = columns or self.indicator_columns()
+        first = self.data.xs(start, level='Time')[columns]
+        last = self.data.xs(end, level='Time')[columns]
+        first, last = first.align(last, join='inner')
+
+        change, cagr = _growth(last.to_numpy(dtype=np.float64), first.to_numpy(dtype=np.float64),
+                               np.full((len(first), 1), float(end - start)))
+        return pd.concat({
+            'Change': pd.DataFrame(change, index=first.index, columns=columns),
+            'CAGR': pd.DataFrame(cagr, index=first.index, columns=columns),
+        }, axis=1)
+
+    def changes_by_income_group(self, columns=None):
+        """
+        Return the mean change and growth rate of each column per income group and year.
+        """
+        changes = self.changes(columns).drop(columns=[('Base Year', '')])
+        groups = self.data['Income Group'].astype(object)
+        years = self.data.index.get_level_values('Time')
+        return changes.groupby([groups, years]).mean().rename_axis(['Income Group', 'Time'])
+
+
+def write_panel_changes(panel, results_dir):
+    """
+    Write the per-country changes and their income group means to `results_dir` and return the paths.
+    """
+    os.makedirs(results_dir, exist_ok=True)
+    changes = panel.changes()
+    names = panel.data[['Country Name', 'Income Group']].astype(object)
+    names.columns = pd.MultiIndex.from_tuples([(column, '') for column in names.columns])
+    paths = [os.path.join(results_dir, 'panel_changes.csv'),
+             os.path.join(results_dir, 'panel_changes_by_income_group.csv')]
+    pd.concat([names, changes], axis=1).to_csv(paths[0])
+    panel.changes_by_income_group().to_csv(paths[1])
+    return paths
@@ -0,0 +1,353 @@
+"""
+Single-pass pipeline runner for the summary statistics and figures.
+
+The four scripts each reload and re-merge the workbook. The pipeline instead
+loads the merged frame once and runs every deliverable as a stage of a small
+dependency graph against that shared frame:
+
+    load --> summary_statistics, correlations, income_group_aggregates,
+             boxplot, affordability_bar_chart, pie_chart
+    summary_statistics, correlations, income_group_aggregates --> export
+
+The export stage writes every summary table to one long-format SQLite file,
+Parquet dataset or CSV file (see foodprices.export).
+
+Each stage has a fingerprint built from the content of its input files, the
+source code of the stage and the modules it uses, and the fingerprints of the
+stages it depends on. A stage whose fingerprint matches the previous run and
+whose outputs still exist is skipped. Stages without outputs, such as 'load',
+only run when a stage that depends on them has to run.
+
+Run it with `python -m foodprices run`. Every stage that runs is recorded as
+a step by foodprices.profiling, so `--trace` or FOODPRICES_TRACE gives a
+timeline of the run.
+"""
+import hashlib
+import inspect
+import json
+import os
+
+from foodprices.loader import CACHE_DIR, DATA_PATH, file_hash
+from foodprices.profiling import step
+
+# Output directories used by the scripts
+RESULTS_DIR = './summary_stats_results'
+FIGURES_DIR = './figures'
+
+# Fingerprints of the stages completed by the previous run
+STATE_PATH = os.path.join(CACHE_DIR, 'pipeline_state.json')
+
+
+class Stage:
+    """
+    One node of the pipeline graph.
+
+    `func` is called with the pipeline followed by the results of the stages
+    named in `deps`. `outputs` lists (directory, filename) pairs where the
+    directory is 'results' or 'figures'. `inputs` is a function of the pipeline
+    returning the file paths the stage reads directly, and `code` lists the
+    modules whose source contributes to the fingerprint.
+    """
+
+    def __init__(self, name, func, deps=(), outputs=(), inputs=None, code=()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.outputs = list(outputs)
+        self.inputs = inputs
+        self.code = list(code)
+
+
+def topological_order(stages):
+    """
+    Return the stage names ordered so every stage comes after its dependencies.
+
+    Stages keep their declaration order wherever the graph allows it. Raises
+    ValueError for unknown dependencies and for cycles.
+    """
+    names = [stage.name for stage in stages]
+    remaining = {stage.name: set(stage.deps) for stage in stages}
+    for stage in stages:
+        unknown = remaining[stage.name] - set(names)
+        if unknown:
+            raise ValueError(f"Stage '{stage.name}' depends on unknown stages: {sorted(unknown)}")
+
+    order = []
+    while remaining:
+        ready = [name for name in names if name in remaining and not remaining[name]]
+        if not ready:
+            raise ValueError(f"Pipeline has a dependency cycle between: {sorted(remaining)}")
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+    return order
+
+
+def _load(pipeline):
+    """
+    Load the merged data and metadata frame shared by every stage.
+    """
+    from foodprices import store
+
+    # Indicators are stored as float32, so upcast them before accumulating statistics
+    return store.upcast(store.load_store(pipeline.data_path))
+
+
+def _summary_statistics(pipeline, merged_data):
+    """
+    Write the describe() statistics for diet costs, affordability and cost ratios.
+    """
+    from foodprices import summary
+
+    tables = {
+        'diet_cost_summary': summary.diet_cost_summary(merged_data),
+        'affordability_summary': summary.affordability_summary(merged_data),
+        'cost_ratios_summary': summary.cost_ratio_summary(merged_data),
+    }
+    for name, table in tables.items():
+        table.to_csv(pipeline.output_path('results', f"{name}.csv"), index=True)
+    return tables
+
+
+def _correlations(pipeline, merged_data):
+    """
+    Write the healthy diet correlations and the full indicator correlation table.
+    """
+    from foodprices import correlation, summary
+
+    correlations = summary.healthy_diet_correlations(merged_data)
+    correlations.to_csv(pipeline.output_path('results', 'healthy_diet_correlations.csv'), index=True)
+    correlation_table = correlation.correlation_table(merged_data)
+    correlation_table.to_csv(pipeline.output_path('results', correlation.CORRELATION_FILENAME), index=False)
+    return {'healthy_diet_correlations': correlations, 'correlation_matrix': correlation_table}
+
+
+def _income_group_aggregates(pipeline, merged_data):
+    """
+    Write the healthy diet cost and affordability statistics by income group,
+    with bootstrap confidence intervals and pairwise group-difference tests.
+    """
+    from foodprices import bootstrap, summary
+
+    tables = {
+        'healthy_diet_cost_by_income_group': summary.healthy_diet_cost_by_income_group(merged_data),
+        'affordability_summary_by_income_group': summary.affordability_summary_by_income_group(merged_data),
+        'healthy_diet_cost_by_income_group_bootstrap': bootstrap.bootstrap_group_means(merged_data),
+        'healthy_diet_cost_income_group_differences': bootstrap.permutation_test_groups(merged_data),
+    }
+    for name, table in tables.items():
+        # The group differences are numbered rows, so their index is left out
+        table.to_csv(pipeline.output_path('results', f"{name}.csv"),
+                     index=name != 'healthy_diet_cost_income_group_differences')
+    return tables
+
+
+def _export(pipeline, *tables):
+    """
+    Write every summary table returned by the statistics stages to the export file.
+    """
+    from foodprices.export import export_results
+
+    merged = {name: table for stage_tables in tables for name, table in stage_tables.items()}
+    export_results(merged, pipeline.directories['results'], pipeline.export_format)
+
+
+def _boxplot(pipeline, merged_data):
+    """
+    Save the boxplot of diet costs by income group, reusing the cached image when its data is unchanged.
+    """
+    from foodprices.figure_cache import save_boxplot
+
+    save_boxplot(merged_data, pipeline.output_path('figures', 'cost_by_income_boxplot.png'))
+
+
+def _affordability_bar_chart(pipeline, merged_data):
+    """
+    Save the bar chart of the share of the population unable to afford each diet,
+    reusing the cached image when its data is unchanged.
+    """
+    from foodprices.figure_cache import save_affordability_bar_chart
+
+    save_affordability_bar_chart(merged_data, pipeline.output_path('figures', 'affordability_bar_chart.png'))
+
+
+def _pie_chart(pipeline, merged_data):
+    """
+    Save the pie chart of the food groups' average shares of the cost of a
+    healthy diet, reusing the cached image when the shares are unchanged.
+    """
+    from foodprices.figure_cache import save_food_group_pie_chart
+    from foodprices.food_groups import average_shares
+
+    shares = average_shares(merged_data)
+    save_food_group_pie_chart(pipeline.output_path('figures', 'food_group_pie_chart.png'),
+                              list(shares.index), list(shares))
+
+
+def default_stages(export_format=None):
+    """
+    Return the stages producing every summary CSV and figure of the project,
+    and the export of the summary tables in `export_format` (default: EXPORT_FORMAT).
+    """
+    from foodprices import bootstrap, correlation, country_index, export, loader, store, summary
+
+    figures_modules = ['foodprices.figures', 'foodprices.figure_cache', 'foodprices.preaggregate',
+                       'foodprices.country_index']
+    return [
+        Stage('load', _load, inputs=lambda pipeline: [pipeline.data_path], code=[loader, store, country_index]),
+        Stage('summary_statistics', _summary_statistics, deps=['load'], code=[summary, correlation], outputs=[
+            ('results', 'diet_cost_summary.csv'),
+            ('results', 'affordability_summary.csv'),
+            ('results', 'cost_ratios_summary.csv'),
+        ]),
+        Stage('correlations', _correlations, deps=['load'], code=[summary, correlation], outputs=[
+            ('results', 'healthy_diet_correlations.csv'),
+            ('results', correlation.CORRELATION_FILENAME),
+        ]),
+        Stage('income_group_aggregates', _income_group_aggregates, deps=['load'], code=[summary, bootstrap], outputs=[
+            ('results', 'healthy_diet_cost_by_income_group.csv'),
+            ('results', 'affordability_summary_by_income_group.csv'),
+            ('results', 'healthy_diet_cost_by_income_group_bootstrap.csv'),
+            ('results', 'healthy_diet_cost_income_group_differences.csv'),
+        ]),
+        Stage('boxplot', _boxplot, deps=['load'], code=figures_modules, outputs=[
+            ('figures', 'cost_by_income_boxplot.png'),
+        ]),
+        Stage('affordability_bar_chart', _affordability_bar_chart, deps=['load'], code=figures_modules, outputs=[
+            ('figures', 'affordability_bar_chart.png'),
+        ]),
+        Stage('pie_chart', _pie_chart, deps=['load'], code=figures_modules + ['foodprices.food_groups'], outputs=[
+            ('figures', 'food_group_pie_chart.png'),
+        ]),
+        Stage('export', _export, deps=['summary_statistics', 'correlations', 'income_group_aggregates'],
+              code=[export], outputs=[
+            ('results', export.EXPORT_FILENAMES[export_format or export.EXPORT_FORMAT]),
+        ]),
+    ]
+
+
+def _module_source(module):
+    """
+    Return the source of a module given as a module object or a dotted name.
+
+    Modules given by name are located without importing them, so
+    fingerprinting a figure stage does not pull in matplotlib.
+    """
+    if isinstance(module, str):
+        import importlib.util
+
+        with open(importlib.util.find_spec(module).origin) as handle:
+            return handle.read()
+    return inspect.getsource(module)
+
+
+class Pipeline:
+    """
+    Runs a set of stages against one shared in-memory frame, skipping the
+    stages whose inputs and code are unchanged since the last run.
+    """
+
+    def __init__(self, data_path=DATA_PATH, results_dir=RESULTS_DIR, figures_dir=FIGURES_DIR,
+                 state_path=STATE_PATH, stages=None, export_format=None):
+        from foodprices.export import EXPORT_FORMAT
+
+        self.data_path = data_path
+        self.directories = {'results': results_dir, 'figures': figures_dir}
+        self.state_path = state_path
+        self.export_format = export_format or EXPORT_FORMAT
+        self.stages = {stage.name: stage
+                       for stage in (stages if stages is not None else default_stages(self.export_format))}
+        self.order = topological_order(list(self.stages.values()))
+        self._results = {}
+
+    def output_path(self, directory, filename):
+        """
+        Return the path of an output file in the 'results' or 'figures' directory.
+        """
+        return os.path.join(self.directories[directory], filename)
+
+    def fingerprint(self, name, fingerprints):
+        """
+        Return the fingerprint of stage `name` given the fingerprints of its dependencies.
+        """
+        stage = self.stages[name]
+        digest = hashlib.sha256(name.encode())
+        digest.update(inspect.getsource(stage.func).encode())
+        for module in stage.code:
+            digest.update(_module_source(module).encode())
+        for path in (stage.inputs(self) if stage.inputs else []):
+            digest.update(file_hash(path).encode())
+        for dep in stage.deps:
+            digest.update(fingerprints[dep].encode())
+        return digest.hexdigest()
+
+    def result(self, name):
+        """
+        Return the result of stage `name`, running it (and its dependencies) if needed.
+        """
+        if name not in self._results:
+            stage = self.stages[name]
+            args = [self.result(dep) for dep in stage.deps]
+            with step(f"Stage: {name}") as span:
+                self._results[name] = stage.func(self, *args)
+                # Record the rows of the shared frame the stage loaded or used
+                data = args[0] if args else self._results[name]
+                if hasattr(data, 'shape'):
+                    span.rows = data.shape[0]
+        return self._results[name]
+
+    def _load_state(self):
+        """
+        Return the fingerprints saved by the previous run.
+        """
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as handle:
+                return json.load(handle)
+        return {}
+
+    def _save_state(self, state):
+        """
+        Save the fingerprints of the completed stages.
+        """
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        with open(self.state_path, 'w') as handle:
+            json.dump(state, handle, indent=2, sort_keys=True)
+
+    def run(self, only=None, force=False):
+        """
+        Run the pipeline and return a dict mapping each stage with outputs to
+        'ran' or 'skipped'.
+
+        `only` restricts the run to the named stages (their dependencies still
+        run on demand), and force=True reruns stages even when unchanged.
+        """
+        for name in only or []:
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage '{name}'. Available stages: {', '.join(self.order)}")
+
+        for directory in self.directories.values():
+            os.makedirs(directory, exist_ok=True)
+
+        state = self._load_state()
+        fingerprints = {}
+        status = {}
+        for name in self.order:
+            stage = self.stages[name]
+            fingerprints[name] = self.fingerprint(name, fingerprints)
+            if not stage.outputs or (only and name not in only):
+                continue
+
+            outputs_exist = all(os.path.exists(self.output_path(*output)) for output in stage.outputs)
+            if not force and outputs_exist and state.get(name) == fingerprints[name]:
+                status[name] = 'skipped'
+                continue
+
+            self.result(name)
+            state[name] = fingerprints[name]
+            # Save after every stage so an interrupted run keeps the work already done
+            self._save_state(state)
+            status[name] = 'ran'
+
+        return status
@@ -0,0 +1,189 @@
+"""
+Pre-aggregated drawing for figures of many rows.
+
+The project figures draw one matplotlib artist per value or label: seaborn's
+boxplot keeps every value to compute its boxes and draws each outlier, and
+the bar chart adds one Text per bar. That suits the workbook's few hundred
+rows. With sub-national or multi-year data of 10^5-10^6 rows, though, drawing
+takes most of the run. The helpers here reduce the data in NumPy first and
+then draw a fixed number of artists:
+
+- grouped_box_stats sorts the values once and reads each group's quartiles,
+  whiskers and outliers from the sorted array. The results use the layout of
+  matplotlib.cbook.boxplot_stats, so Axes.bxp can draw them. At most
+  MAX_FLIERS outliers are kept per box, spread evenly by rank;
+- density_grid bins a scatter into a fixed grid of counts, drawn as one mesh;
+- bar_collection draws all the bars as one collection, and text_collection
+  does the same for their labels. The outline of each distinct label is
+  built once per process; percentages to one decimal have at most 1001.
+
+Drawing therefore costs the same whatever the number of rows. Only the NumPy
+reductions grow with the data, and they are linear after one sort.
+
+matplotlib is imported inside the drawing helpers, so the statistics can be
+computed without it.
+"""
+import functools
+
+import numpy as np
+
+# Rows of the merged frame from which the boxplot is drawn from pre-aggregated statistics
+AGGREGATE_ROWS = 50000
+
+# Bars from which the bar chart's bars and labels are drawn as collections
+AGGREGATE_LABELS = 200
+
+# Largest number of outliers drawn per box
+MAX_FLIERS = 500
+
+# Bins per axis of a density scatter
+DENSITY_BINS = 100
+
+
+def use_aggregated(n, threshold, aggregated=None):
+    """
+    Return `aggregated`, or whether `n` rows reach `threshold` when it is None.
+    """
+    return n >= threshold if aggregated is None else bool(aggregated)
+
+
+def _quantiles(sorted_values, qs):
+    """
+    Return the linearly interpolated quantiles `qs` of sorted values, like np.percentile.
+    """
+    positions = (len(sorted_values) - 1) * np.asarray(qs, dtype=np.float64)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (positions - lower)
+
+
+def box_stats(sorted_values, whis=1.5, label=None, max_fliers=MAX_FLIERS):
+    """
+    Return the box statistics of sorted finite values, as matplotlib.cbook.boxplot_stats
+    computes them, with the outliers thinned to at most `max_fliers`.
+    """
+    if len(sorted_values) == 0:
+        return {'label': label, 'mean': np.nan, 'med': np.nan, 'q1': np.nan, 'q3': np.nan, 'iqr': np.nan,
+                'whislo': np.nan, 'whishi': np.nan, 'fliers': sorted_values}
+
+    q1, med, q3 = _quantiles(sorted_values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+
+    # The whiskers reach the most extreme values within `whis` IQRs of the box, but never into it
+    low = np.searchsorted(sorted_values, q1 - whis * iqr, side='left')
+    high = np.searchsorted(sorted_values, q3 + whis * iqr, side='right')
+    whislo = min(sorted_values[low], q1) if low < len(sorted_values) else q1
+    whishi = max(sorted_values[high - 1], q3) if high > 0 else q3
+
+    fliers = np.concatenate([sorted_values[:np.searchsorted(sorted_values, whislo, side='left')],
+                             sorted_values[np.searchsorted(sorted_values, whishi, side='right'):]])
+    if len(fliers) > max_fliers:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, max_fliers).round().astype(np.int64)]
+
+    return {'label': label, 'mean': sorted_values.mean(), 'med': med, 'q1': q1, 'q3': q3, 'iqr': iqr,
+            'whislo': whislo, 'whishi': whishi, 'fliers': fliers}
+
+
+def grouped_box_stats(values, codes, labels, whis=1.5, max_fliers=MAX_FLIERS):
+    """
+    Return the box statistics of `values` for every group, where `codes` gives
+    each value's position in `labels` (-1 for none). Missing values are dropped.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.asarray(codes)
+    keep = np.isfinite(values) & (codes >= 0)
+    values, codes = values[keep], codes[keep]
+
+    # One sort orders the values within every group at once
+    order = np.lexsort((values, codes))
+    values = values[order]
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(labels)))])
+    return [box_stats(values[bounds[g]:bounds[g + 1]], whis, label, max_fliers) for g, label in enumerate(labels)]
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """
+    Return the counts of the finite (x, y) pairs on a `bins` x `bins` grid with its x and y edges.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    return np.histogram2d(x[finite], y[finite], bins=bins)
+
+
+def draw_boxes(ax, stats, positions, width, colour, label=None):
+    """
+    Draw precomputed box statistics with Axes.bxp, labelling the first box for the legend.
+    """
+    drawn = [(box, position) for box, position in zip(stats, positions) if not np.isnan(box['med'])]
+    if not drawn:
+        return {}
+    line = {'color': '#3f3f3f', 'linewidth': 1.2}
+    artists = ax.bxp([box for box, _ in drawn], positions=[position for _, position in drawn], widths=width,
+                     patch_artist=True, manage_ticks=False,
+                     boxprops={'facecolor': colour, 'edgecolor': line['color'], 'linewidth': line['linewidth']},
+                     whiskerprops=line, capprops=line, medianprops=line,
+                     flierprops={'marker': 'd', 'markersize': 4, 'markerfacecolor': '#3f3f3f',
+                                 'markeredgecolor': 'none'})
+    artists['boxes'][0].set_label(label)
+    return artists
+
+
+def bar_collection(ax, positions, values, colour, height=0.8):
+    """
+    Draw horizontal bars from zero to `values` at `positions` as one collection.
+    """
+    from matplotlib.collections import PolyCollection
+
+    positions = np.asarray(positions, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    positions, values = positions[finite], values[finite]
+
+    zeros = np.zeros_like(values)
+    bottom, top = positions - height / 2, positions + height / 2
+    verts = np.stack([np.column_stack([zeros, bottom]), np.column_stack([zeros, top]),
+                      np.column_stack([values, top]), np.column_stack([values, bottom])], axis=1)
+    bars = PolyCollection(verts, facecolors=colour, edgecolors='none')
+    ax.add_collection(bars, autolim=True)
+    ax.autoscale_view()
+    return bars
+
+
+@functools.lru_cache(maxsize=4096)
+def _glyphs(label, size, weight):
+    """
+    Return the outline of `label` in points, with its baseline half a digit's
+    height below the origin. Each label is laid out once per process.
+    """
+    from matplotlib.font_manager import FontProperties
+    from matplotlib.path import Path
+    from matplotlib.textpath import TextPath
+
+    prop = FontProperties(size=size, weight=weight)
+    digit = TextPath((0, 0), '0', prop=prop).vertices[:, 1]
+    path = TextPath((0, 0), label, prop=prop)
+    return Path(path.vertices - [0, (digit.min() + digit.max()) / 2], path.codes)
+
+
+def text_collection(ax, x, y, labels, size, weight='normal', colour='black'):
+    """
+    Draw `labels` starting at data coordinates (x, y), vertically centred, as
+    one collection of glyph outlines.
+    """
+    from matplotlib.collections import PathCollection
+    from matplotlib.transforms import Affine2D
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    labels = [label for label, keep in zip(labels, finite) if keep]
+
+    points = Affine2D().scale(1 / 72) + ax.figure.dpi_scale_trans
+    paths = [_glyphs(label, size, weight) for label in labels]
+    texts = PathCollection(paths, offsets=np.column_stack([x[finite], y[finite]]), offset_transform=ax.transData,
+                           transform=points, facecolors=colour, edgecolors='none')
+    # Like ax.text, the labels may extend past the axes
+    texts.set_clip_on(False)
+    ax.add_collection(texts, autolim=False)
+    return texts
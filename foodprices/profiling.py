@@ -0,0 +1,203 @@
+"""
+Lightweight instrumentation of the named steps of the scripts and pipeline.
+
+Wrap a step in `with step("Step 1: Load data") as span:` (or decorate a
+function with @traced) to record its wall time, CPU time, the peak resident
+set size of the process at the end of the step and, when the step sets
+`span.rows`, the number of rows it handled. Steps can nest.
+
+Recording is always on and costs a few microseconds per step. What happens
+with the records is controlled by environment variables, so runs can be
+observed without editing code:
+
+- FOODPRICES_TRACE=trace.json writes the steps as a Chrome trace (open it in
+  chrome://tracing or https://ui.perfetto.dev) when the process exits;
+- FOODPRICES_PROFILE=profiles/ runs every step under cProfile and writes
+  one .prof file per step, to inspect with pstats or snakeviz;
+- FOODPRICES_TRACE_SUMMARY=1 prints a table of the steps to stderr at exit.
+"""
+import atexit
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of this process in MB, or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / (1 << 10)
+
+
+class Span:
+    """
+    The measurements of one step.
+    """
+
+    def __init__(self, name, depth):
+        self.name = name
+        self.depth = depth
+        self.rows = None
+        self.error = None
+        self.start = None
+        self.wall = None
+        self.cpu = None
+        self.peak_rss_mb = None
+
+    def as_dict(self):
+        """
+        Return the measurements as a dict.
+        """
+        return {
+            'name': self.name, 'depth': self.depth, 'wall_s': self.wall, 'cpu_s': self.cpu,
+            'peak_rss_mb': self.peak_rss_mb, 'rows': self.rows, 'error': self.error,
+        }
+
+
+class Tracer:
+    """
+    Records the spans of the steps run in this process.
+
+    `profile_dir`, when set, runs each top-level step under cProfile and
+    dumps the statistics to `<profile_dir>/<step>.prof`.
+    """
+
+    def __init__(self, profile_dir=None):
+        self.profile_dir = profile_dir
+        self.spans = []
+        self.origin = time.perf_counter()
+        self._local = threading.local()
+
+    def _stack(self):
+        """
+        Return the stack of open spans of the current thread.
+        """
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _profile_path(self, name):
+        """
+        Return the cProfile dump path for a step.
+        """
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', name).strip('_').lower()
+        return os.path.join(self.profile_dir, f"{len(self.spans):03d}_{slug}.prof")
+
+    @contextmanager
+    def step(self, name, rows=None):
+        """
+        Context manager recording the step `name`; yields its Span.
+
+        An exception raised inside the step is recorded on the span and re-raised.
+        """
+        stack = self._stack()
+        span = Span(name, len(stack))
+        span.rows = rows
+        # Only profile the outermost step; cProfile cannot be nested
+        profiler = cProfile.Profile() if self.profile_dir and not stack else None
+        stack.append(span)
+
+        span.start = time.perf_counter() - self.origin
+        cpu_start = time.process_time()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            span.wall = time.perf_counter() - self.origin - span.start
+            span.cpu = time.process_time() - cpu_start
+            span.peak_rss_mb = peak_rss_mb()
+            stack.pop()
+            if profiler is not None:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                profiler.dump_stats(self._profile_path(name))
+            self.spans.append(span)
+
+    def summary(self):
+        """
+        Return the recorded spans as a DataFrame, in the order they started.
+        """
+        import pandas as pd
+
+        spans = sorted(self.spans, key=lambda span: span.start)
+        table = pd.DataFrame([span.as_dict() for span in spans], columns=list(Span('', 0).as_dict()))
+        return table.astype({'rows': 'Int64'})
+
+    def chrome_trace(self):
+        """
+        Return the spans as a Chrome trace event dict of complete ('X') events.
+        """
+        events = []
+        for span in self.spans:
+            args = {key: value for key, value in span.as_dict().items()
+                    if key not in ('name', 'depth', 'wall_s') and value is not None}
+            events.append({
+                'name': span.name, 'cat': 'step', 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                'ts': round(span.start * 1e6, 3), 'dur': round(span.wall * 1e6, 3), 'args': args,
+            })
+        return {'traceEvents': sorted(events, key=lambda event: event['ts']), 'displayTimeUnit': 'ms'}
+
+    def write_chrome_trace(self, path):
+        """
+        Write the Chrome trace to `path` and return the path.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as handle:
+            json.dump(self.chrome_trace(), handle, indent=1)
+        return path
+
+
+def _report(tracer):
+    """
+    Write the trace and summary requested through the environment at exit.
+    """
+    trace_path = os.environ.get('FOODPRICES_TRACE')
+    if trace_path and tracer.spans:
+        tracer.write_chrome_trace(trace_path)
+    if os.environ.get('FOODPRICES_TRACE_SUMMARY', '') not in ('', '0') and tracer.spans:
+        print(tracer.summary().to_string(index=False), file=sys.stderr)
+
+
+# Tracer shared by the scripts and the pipeline
+TRACER = Tracer(profile_dir=os.environ.get('FOODPRICES_PROFILE') or None)
+atexit.register(_report, TRACER)
+
+
+def step(name, rows=None):
+    """
+    Record the step `name` on the shared tracer; see Tracer.step.
+    """
+    return TRACER.step(name, rows)
+
+
+def traced(name=None):
+    """
+    Decorator recording every call of a function as a step, named after the function by default.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with step(name or func.__qualname__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
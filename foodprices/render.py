@@ -0,0 +1,144 @@
+"""
+Headless and parallel rendering of the project figures.
+
+The scripts used to block on plt.show(), which makes unattended batch runs
+impossible. This module provides:
+
+- a headless mode that forces the non-interactive Agg backend, selected with
+  the --headless flag or the FOODPRICES_HEADLESS environment variable;
+- render_variants, which renders one figure per value of a grouping column
+  (e.g. one boxplot per region or per ICP year) across a process pool.
+
+Rendering is CPU-bound and each variant is independent, so the variants are
+spread over worker processes that each start in headless mode.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+# Figures that can be rendered per group, mapped to their cached save function in foodprices.figure_cache
+VARIANT_FIGURES = {
+    'boxplot': 'save_boxplot',
+    'affordability_bar_chart': 'save_affordability_bar_chart',
+    'cost_affordability_density': 'save_cost_affordability_density',
+}
+
+# Region value used by the metadata for regional and income aggregates
+AGGREGATES_REGION = 'Aggregates'
+
+
+def headless_requested(argv=None):
+    """
+    Return True when headless rendering was asked for on the command line or
+    through the FOODPRICES_HEADLESS environment variable.
+    """
+    import sys
+
+    argv = sys.argv[1:] if argv is None else argv
+    return '--headless' in argv or os.environ.get('FOODPRICES_HEADLESS', '') not in ('', '0')
+
+
+def use_headless():
+    """
+    Switch matplotlib to the non-interactive Agg backend.
+
+    Safe to call after pyplot has been imported; figures are then only ever
+    written to files and plt.show() becomes a no-op. When matplotlib has not
+    been imported yet, the backend is only requested through MPLBACKEND, so
+    runs that never draw a figure never import matplotlib.
+    """
+    import sys
+
+    if 'matplotlib' not in sys.modules:
+        os.environ['MPLBACKEND'] = 'Agg'
+        return
+
+    import matplotlib
+
+    matplotlib.use('Agg', force=True)
+
+
+def show_or_close(fig, headless):
+    """
+    Display a finished figure, or close it when running headless.
+    """
+    import matplotlib.pyplot as plt
+
+    if headless:
+        plt.close(fig)
+    else:
+        plt.show()
+
+
+def _slug(value):
+    """
+    Return a filesystem-friendly version of a group value for use in file names.
+    """
+    return re.sub(r'[^A-Za-z0-9]+', '_', str(value)).strip('_').lower()
+
+
+def _render_job(job):
+    """
+    Render and save one figure variant, or copy it from the figure cache when
+    its data and title are unchanged. Runs inside a worker process.
+    """
+    from foodprices import figure_cache
+
+    figure, data, output_path, kwargs = job
+    getattr(figure_cache, VARIANT_FIGURES[figure])(data, output_path, **kwargs)
+    return output_path
+
+
+def variant_kwargs(figure, value, group):
+    """
+    Return the save function arguments of the `figure` variant for the group
+    `value` with rows `group`.
+
+    The bar chart of a group shows the countries of that group, ordered by the
+    share of the population who cannot afford a healthy diet.
+    """
+    if figure == 'boxplot':
+        return {'title': f"Cost of Diets by Income Group: {value}"}
+    if figure == 'cost_affordability_density':
+        return {'title': f"Cost and Affordability of a Healthy Diet: {value}"}
+    countries = group.sort_values('Percent of the population who cannot afford a healthy diet')
+    return {
+        'ordered_countries': countries['Country Name'].tolist(),
+        'title': f"Share of Population Unable to Afford Different Diet Standards: {value}",
+    }
+
+
+def variant_jobs(merged_data, figures, by, output_dir):
+    """
+    Return the render jobs for every figure in `figures` and every value of
+    the `by` column, skipping missing values and the aggregate rows.
+    """
+    jobs = []
+    for value, group in merged_data.groupby(by, observed=True, sort=True):
+        if value == AGGREGATES_REGION:
+            continue
+        for figure in figures:
+            if figure not in VARIANT_FIGURES:
+                raise ValueError(f"Unknown figure '{figure}'. Available figures: {', '.join(VARIANT_FIGURES)}")
+            output_path = os.path.join(output_dir, f"{figure}_{_slug(by)}_{_slug(value)}.png")
+            jobs.append((figure, group, output_path, variant_kwargs(figure, value, group)))
+    return jobs
+
+
+def render_variants(merged_data, figures, by, output_dir, processes=None):
+    """
+    Render every figure in `figures` once per value of the `by` column and
+    return the paths written.
+
+    `processes` sets the number of worker processes (default: one per CPU);
+    processes=1 renders serially in the current process.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = variant_jobs(merged_data, figures, by, output_dir)
+
+    if processes == 1 or len(jobs) <= 1:
+        use_headless()
+        return [_render_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=use_headless) as executor:
+        return list(executor.map(_render_job, jobs))
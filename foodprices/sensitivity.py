@@ -0,0 +1,109 @@
+"""
+Sensitivity of the unaffordability headcounts to the affordability threshold.
+
+The workbook counts a diet as unaffordable for people whose income is too
+low for its cost to fit within 52% of it, the share of income the poor
+spend on food. Each country reports that percentage for three diets of
+different costs. Under a lognormal income distribution, the probit of the
+percentage is linear in the log of the cost:
+
+    probit(percent / 100) = (log(cost / share) - mu) / sigma
+
+So a least-squares line through a country's three (log cost, probit)
+points recovers its mu and sigma. The percentage at any other share of
+income, or at a cost scaled to another poverty line, then follows in closed
+form. The fit and the sweep over every country and threshold are broadcast
+NumPy operations on (country, diet) and (country, threshold) arrays, with
+no loop over countries.
+"""
+import numpy as np
+import pandas as pd
+
+# Share of income available for food under which the workbook counts a diet as unaffordable
+BASELINE_SHARE = 0.52
+
+# Shares of income swept by default, from 20% to 100% in steps of a quarter point
+SHARES = np.round(np.linspace(0.2, 1.0, 321), 4)
+
+# Percentages of 0 and 100 have no probit, so they are clipped into this range before the fit
+PERCENT_CLIP = (0.05, 99.95)
+
+# Cost and unaffordability columns of each diet, cheapest diet first
+DIETS = {
+    'Energy Sufficient Diet': ('Cost of an energy sufficient diet',
+                               'Percent of the population who cannot afford sufficient calories'),
+    'Nutrient Adequate Diet': ('Cost of a nutrient adequate diet',
+                               'Percent of the population who cannot afford nutrient adequacy'),
+    'Healthy Diet': ('Cost of a healthy diet',
+                     'Percent of the population who cannot afford a healthy diet'),
+}
+
+
+def fit_income_distribution(merged_data, baseline_share=BASELINE_SHARE):
+    """
+    Fit a lognormal income distribution to each row of `merged_data`.
+
+    Returns a DataFrame indexed like `merged_data` with the log-scale mean
+    `mu`, the log-scale standard deviation `sigma` and the number of diets
+    used in the fit. Rows with fewer than two usable diets, or whose
+    headcount does not rise with the cost, get missing parameters.
+    """
+    from scipy.special import ndtri
+
+    costs = merged_data[[cost for cost, _ in DIETS.values()]].to_numpy(dtype=np.float64)
+    percents = merged_data[[percent for _, percent in DIETS.values()]].to_numpy(dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = np.log(costs)
+    z = ndtri(np.clip(percents, *PERCENT_CLIP) / 100)
+    valid = np.isfinite(x) & np.isfinite(z)
+    x, z = np.where(valid, x, 0.0), np.where(valid, z, 0.0)
+
+    # Least-squares line of z on x per row, over the valid diets only
+    n = valid.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x_mean = x.sum(axis=1) / n
+        z_mean = z.sum(axis=1) / n
+        dx = np.where(valid, x - x_mean[:, None], 0.0)
+        slope = (dx * (z - z_mean[:, None])).sum(axis=1) / (dx * dx).sum(axis=1)
+        sigma = 1 / slope
+    fitted = (n >= 2) & np.isfinite(slope) & (slope > 0)
+    sigma = np.where(fitted, sigma, np.nan)
+    mu = np.where(fitted, x_mean - np.log(baseline_share) - z_mean * sigma, np.nan)
+    return pd.DataFrame({'mu': mu, 'sigma': sigma, 'diets': n}, index=merged_data.index)
+
+
+def affordability_sweep(merged_data, shares=SHARES, diet='Healthy Diet', cost_scale=1.0,
+                        baseline_share=BASELINE_SHARE):
+    """
+    Return the percentage of the population who cannot afford `diet` at
+    each share of income in `shares`, as a country × threshold matrix.
+
+    The rows are the countries and aggregates of `merged_data` indexed by
+    'Country Name', and the columns are the shares. `cost_scale` multiplies
+    the diet cost, for example to move to another poverty line. Halving the
+    share has the same effect as doubling the cost.
+    """
+    from scipy.special import ndtr
+
+    fit = fit_income_distribution(merged_data, baseline_share)
+    cost = merged_data[DIETS[diet][0]].to_numpy(dtype=np.float64) * cost_scale
+    shares = np.asarray(shares, dtype=np.float64)
+
+    # Income threshold of every (country, share) pair, broadcast from the cost column and share row
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (np.log(cost)[:, None] - np.log(shares)[None, :] - fit['mu'].to_numpy()[:, None]) \
+            / fit['sigma'].to_numpy()[:, None]
+    matrix = pd.DataFrame(100 * ndtr(z), index=merged_data['Country Name'].to_numpy(), columns=shares)
+    matrix.index.name = 'Country Name'
+    matrix.columns.name = 'Share of Income'
+    return matrix
+
+
+def sweep_by_income_group(merged_data, sweep):
+    """
+    Return the mean of the country × threshold matrix `sweep` per income
+    group, one curve per row. Aggregates, which have no income group, are left out.
+    """
+    groups = merged_data['Income Group'].astype(object).to_numpy()
+    return sweep.groupby(groups).mean().rename_axis('Income Group')
@@ -0,0 +1,356 @@
+"""
+Long-running report server for dashboards.
+
+Running a script per dashboard request pays for Python startup, the pandas,
+matplotlib and seaborn imports and a workbook load on every call. This
+server loads the merged data and the country index once and answers from
+memory:
+
+    GET /stats?indicator=Cost of a healthy diet&income_group=Lower-middle income
+    GET /render/boxplot?region=Sub-Saharan Africa
+    GET /render/affordability_bar_chart?income_group=Low income
+    GET /health
+
+Statistics are JSON describe() results for the selected rows, filtered by
+`income_group`, `region` or `country`. Group names are matched ignoring
+case, punctuation and the '(FPN)' suffix of the region names, so
+'Lower-middle income' finds 'Lower-middle-income'. Renders return PNG bytes
+of the same variants as `python -m foodprices render`.
+
+Every response is cached in memory, keyed on the resolved group labels so
+spellings of the same group share one entry, and the least recently used
+responses are dropped beyond MAX_RESPONSES. Identical requests that arrive
+while the first one is still being computed wait for that result instead of
+computing it again. Rendering runs in a process pool, so the
+event loop keeps answering statistics while figures are drawn. The server is
+built on asyncio streams with a minimal HTTP/1.1 handler, using only the
+standard library.
+"""
+import asyncio
+import json
+import os
+import re
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+from foodprices.loader import CACHE_DIR, DATA_PATH
+
+# Default address of the server
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Query parameters that select rows, mapped to the column they filter
+FILTERS = {'income_group': 'Income Group', 'region': 'Region', 'country': 'Country Name'}
+
+# Directory the render workers write figures to before they are served
+RENDER_DIR = os.path.join(CACHE_DIR, 'server')
+
+# Number of responses kept in memory
+MAX_RESPONSES = 256
+
+# Largest request head accepted, in bytes
+MAX_HEADER_BYTES = 16 << 10
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+    """
+    A request that cannot be answered, with the HTTP status to report.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _normalise(label):
+    """
+    Return a group label reduced to lowercase letters and digits, without the '(FPN)' suffix.
+    """
+    return re.sub(r'[^a-z0-9]', '', str(label).lower().replace('(fpn)', ''))
+
+
+def _render_png(job):
+    """
+    Render one figure variant to a file and return its PNG bytes. Runs inside a worker process.
+    """
+    from foodprices.render import _render_job
+
+    with open(_render_job(job), 'rb') as handle:
+        return handle.read()
+
+
+class ReportModel:
+    """
+    The merged data and country index held in memory, with the queries the server answers.
+    """
+
+    def __init__(self, merged_data, index=None):
+        from foodprices.country_index import CountryIndex
+
+        self.merged_data = merged_data
+        self.index = index or CountryIndex.from_metadata(merged_data.dropna(subset=['Table Name']))
+        self.codes = self.index.codes(merged_data['Country Name'])
+        self.labels = {
+            column: {_normalise(label): label for label in merged_data[column].dropna().unique()}
+            for column in FILTERS.values() if column != 'Country Name'
+        }
+
+    @classmethod
+    def load(cls, data_path=DATA_PATH):
+        """
+        Load the merged data and the country index of a workbook.
+        """
+        from foodprices.country_index import load_country_index
+        from foodprices.loader import load_merged_data
+
+        return cls(load_merged_data(data_path), load_country_index(data_path))
+
+    def resolve(self, column, value):
+        """
+        Return the label of `column` that `value` names, or raise QueryError.
+        """
+        label = self.labels[column].get(_normalise(value))
+        if label is None:
+            raise QueryError(404, f"Unknown {column} '{value}'")
+        return label
+
+    def resolve_filters(self, filters):
+        """
+        Return {parameter: label} for {parameter: value} filters, raising QueryError for unknown groups.
+
+        Countries are named exactly, since they are looked up in the country index.
+        """
+        resolved = {}
+        for parameter, value in filters.items():
+            column = FILTERS[parameter]
+            if column == 'Country Name':
+                if self.index.codes([value])[0] < 0:
+                    raise QueryError(404, f"Unknown country '{value}'")
+                resolved[parameter] = value
+            else:
+                resolved[parameter] = self.resolve(column, value)
+        return resolved
+
+    def select(self, filters):
+        """
+        Return the rows matching resolved {parameter: label} filters on income
+        group, region or country, over every year of the data.
+        """
+        import numpy as np
+
+        mask = np.ones(len(self.merged_data), dtype=bool)
+        for parameter, label in filters.items():
+            column = FILTERS[parameter]
+            if column == 'Country Name':
+                mask &= self.codes == self.index.codes([label])[0]
+            else:
+                mask &= (self.merged_data[column] == label).to_numpy()
+        return self.merged_data[mask]
+
+    def statistics(self, indicator, filters):
+        """
+        Return the describe() statistics of `indicator` over the rows selected
+        by resolved filters, as a dict.
+        """
+        import pandas as pd
+
+        if indicator not in self.merged_data.columns:
+            raise QueryError(400, f"Unknown indicator '{indicator}'")
+        if not pd.api.types.is_numeric_dtype(self.merged_data[indicator]):
+            raise QueryError(400, f"'{indicator}' is not a numeric indicator")
+        described = self.select(filters)[indicator].astype('float64').describe()
+        return {
+            'indicator': indicator,
+            'filters': filters,
+            'statistics': {name: (None if value != value else float(value)) for name, value in described.items()},
+        }
+
+    def render_job(self, figure, filters, output_dir=RENDER_DIR):
+        """
+        Return the render job of `figure` for the rows selected by one resolved filter.
+        """
+        from foodprices.render import VARIANT_FIGURES, _slug, variant_kwargs
+
+        if figure not in VARIANT_FIGURES:
+            raise QueryError(404, f"Unknown figure '{figure}'. Available figures: {', '.join(VARIANT_FIGURES)}")
+        if len(filters) != 1:
+            raise QueryError(400, f"Render one of: {', '.join(FILTERS)}")
+        (parameter, label), = filters.items()
+        group = self.select(filters)
+        output_path = os.path.join(output_dir, f"{figure}_{_slug(parameter)}_{_slug(label)}.png")
+        return figure, group, output_path, variant_kwargs(figure, label, group)
+
+
+class ReportServer:
+    """
+    asyncio HTTP server answering statistics and render requests from a ReportModel.
+
+    `processes` sets the number of render worker processes (default: one per
+    CPU) and `render_dir` the directory they write figures to.
+    """
+
+    def __init__(self, model, host=HOST, port=PORT, processes=None, render_dir=RENDER_DIR):
+        self.model = model
+        self.host = host
+        self.port = port
+        self.processes = processes
+        self.render_dir = render_dir
+        self.responses = OrderedDict()
+        self.computed = 0
+        self._pending = {}
+        self._executor = None
+        self._server = None
+
+    async def start(self):
+        """
+        Start listening and the render pool; returns the bound (host, port).
+        """
+        from foodprices.render import use_headless
+
+        os.makedirs(self.render_dir, exist_ok=True)
+        self._executor = ProcessPoolExecutor(max_workers=self.processes, initializer=use_headless)
+        # Start the workers before listening: workers forked later would inherit the
+        # listening socket and every open connection, so clients would never see EOF
+        await asyncio.get_running_loop().run_in_executor(self._executor, os.getpid)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=MAX_HEADER_BYTES)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def close(self):
+        """
+        Stop listening and shut the render pool down.
+        """
+        self._server.close()
+        await self._server.wait_closed()
+        self._executor.shutdown()
+
+    async def serve_forever(self):
+        """
+        Answer requests until cancelled, then close the server.
+        """
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _respond(self, key, compute):
+        """
+        Return the cached response for `key`, computing it with the coroutine
+        function `compute` once no matter how many requests ask for it meanwhile.
+        """
+        if key in self.responses:
+            self.responses.move_to_end(key)
+            return self.responses[key]
+        if key not in self._pending:
+            self._pending[key] = asyncio.ensure_future(compute())
+        pending = self._pending[key]
+        try:
+            response = await asyncio.shield(pending)
+        finally:
+            if pending.done():
+                self._pending.pop(key, None)
+        self.responses[key] = response
+        while len(self.responses) > MAX_RESPONSES:
+            self.responses.popitem(last=False)
+        return response
+
+    async def _statistics(self, indicator, filters):
+        """
+        Compute a statistics response body.
+        """
+        self.computed += 1
+        return 'application/json', json.dumps(self.model.statistics(indicator, filters)).encode()
+
+    async def _render(self, figure, filters):
+        """
+        Render a figure in the worker pool and return the PNG response body.
+        """
+        self.computed += 1
+        job = self.model.render_job(figure, filters, self.render_dir)
+        png = await asyncio.get_running_loop().run_in_executor(self._executor, _render_png, job)
+        return 'image/png', png
+
+    async def dispatch(self, method, target):
+        """
+        Return (status, content type, body) for a request.
+        """
+        if method != 'GET':
+            raise QueryError(405, f"Method {method} not allowed")
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        unknown = set(query) - set(FILTERS) - {'indicator'}
+        if unknown:
+            raise QueryError(400, f"Unknown parameters: {', '.join(sorted(unknown))}")
+        has_indicator = 'indicator' in query
+        indicator = query.pop('indicator', 'Cost of a healthy diet')
+
+        if url.path == '/health':
+            return 200, 'application/json', b'{"status": "ok"}'
+        if url.path == '/stats':
+            filters = self.model.resolve_filters(query)
+            key = (url.path, indicator, tuple(sorted(filters.items())))
+            return (200, *await self._respond(key, lambda: self._statistics(indicator, filters)))
+        if url.path.startswith('/render/'):
+            if has_indicator:
+                raise QueryError(400, "The 'indicator' parameter applies to /stats only")
+            figure = url.path[len('/render/'):]
+            filters = self.model.resolve_filters(query)
+            key = (url.path, tuple(sorted(filters.items())))
+            return (200, *await self._respond(key, lambda: self._render(figure, filters)))
+        raise QueryError(404, f"Unknown path '{url.path}'")
+
+    async def _handle(self, reader, writer):
+        """
+        Answer the HTTP/1.1 requests of one connection until the client closes it.
+        """
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    break
+                headers = {name.strip().lower(): value.strip()
+                           for name, _, value in (line.partition(':') for line in lines[1:] if line)}
+
+                try:
+                    status, content_type, body = await self.dispatch(method, target)
+                except QueryError as exc:
+                    status, content_type, body = exc.status, 'application/json', json.dumps({'error': str(exc)}).encode()
+                except Exception as exc:  # Report the failure instead of dropping the connection
+                    status, content_type, body = 500, 'application/json', json.dumps({'error': repr(exc)}).encode()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                    .encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+
+def serve(data_path=DATA_PATH, host=HOST, port=PORT, processes=None):
+    """
+    Load the data once and serve reports until interrupted.
+    """
+    server = ReportServer(ReportModel.load(data_path), host, port, processes)
+
+    async def main():
+        host, port = await server.start()
+        print(f"Serving reports on http://{host}:{port}/")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,289 @@
+"""
+Mergeable quantile sketches.
+
+Both sketches here take values in batches, merge with another sketch of the
+same parameters and estimate quantiles interpolated like pandas. They differ
+in the error they bound:
+
+KLLSketch is a KLL sketch (Karnin, Lang and Liberty, 2016): a stack of
+compactors where level h holds items of weight 2**h. The top level has
+capacity k and each level below two thirds of the one above. When the levels
+together hold more than their total capacity, about 3k items, the lowest
+level over its own capacity is sorted and every other item, from a random
+offset, is promoted to the next level. Memory stays about 3k items however
+many values are added, the rank error is about 1.7 / k with high
+probability, and two sketches merge by concatenating their levels.
+
+Until the first compaction every item has weight one and quantiles are exact,
+interpolated linearly between order statistics exactly like pandas, so
+small groups give the same quartiles as describe().
+
+DDSketch (Masson, Rim and Lee, 2019) bounds the relative error of the value
+instead: it counts values in logarithmic buckets of width gamma = (1 + a) /
+(1 - a), so every quantile it returns is within a fraction a of the true
+order statistic. Merging adds the bucket counts, and is exact, so chunks can
+be sketched in any order and in any process. The number of buckets grows
+with the log of the range of the values, not with their count.
+"""
+import math
+import random
+
+import numpy as np
+
+# Rank error of a KLL sketch is about this constant divided by k
+KLL_ERROR_CONSTANT = 1.7
+
+
+class KLLSketch:
+    """
+    Mergeable streaming quantile sketch with rank error of about 1.7 / k.
+    """
+
+    def __init__(self, k=200, seed=0):
+        self.k = k
+        self.seed = seed
+        self.levels = [[]]
+        self.compactions = 0
+
+    @classmethod
+    def with_error(cls, error, seed=0):
+        """
+        Return a sketch whose rank error is about `error`, a fraction of the number of values.
+        """
+        return cls(max(2, int(np.ceil(KLL_ERROR_CONSTANT / error))), seed)
+
+    @property
+    def error(self):
+        """
+        Return the approximate rank error of the sketch as a fraction of the number of values.
+        """
+        return KLL_ERROR_CONSTANT / self.k
+
+    def __len__(self):
+        """
+        Return the number of values summarised by the sketch.
+        """
+        return sum(len(level) << height for height, level in enumerate(self.levels))
+
+    def _capacity(self, height):
+        """
+        Return the capacity of level `height`: k at the top level and about
+        two thirds of the level above at each level below it.
+        """
+        depth = len(self.levels) - height - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self):
+        """
+        Return the number of items retained over every level.
+        """
+        return sum(len(level) for level in self.levels)
+
+    def _max_size(self):
+        """
+        Return the number of items the levels may hold together, about 3k.
+        """
+        return sum(self._capacity(height) for height in range(len(self.levels)))
+
+    def _compact(self, height):
+        """
+        Sort level `height` and promote every other item, from a random offset, to the level above.
+        """
+        if height + 1 == len(self.levels):
+            self.levels.append([])
+        level = self.levels[height]
+        level.sort()
+        # Keep the odd item out at this level so no weight is lost
+        keep = [level.pop()] if len(level) % 2 else []
+        offset = random.Random(self.seed * 1000003 + self.compactions).randint(0, 1)
+        self.levels[height + 1].extend(level[offset::2])
+        self.levels[height] = keep
+        self.compactions += 1
+
+    def _compress(self):
+        """
+        Compact levels until the sketch holds fewer items than its total capacity.
+
+        Only the lowest level at or over its own capacity is compacted each
+        time, so a level may stay over capacity while the others have room,
+        and the upper levels, whose items weigh the most, are compacted as
+        rarely as possible.
+        """
+        while self._size() >= self._max_size():
+            height = next(height for height, level in enumerate(self.levels)
+                          if len(level) >= self._capacity(height))
+            self._compact(height)
+
+    def update(self, values):
+        """
+        Add an array of values to the sketch, ignoring NaN.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.levels[0].extend(values[~np.isnan(values)].tolist())
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Merge another sketch into this one and return this sketch.
+        """
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for height, level in enumerate(other.levels):
+            self.levels[height].extend(level)
+        self.compactions += other.compactions
+        self._compress()
+        return self
+
+    def _weighted_items(self):
+        """
+        Return the retained values in sorted order with their weights.
+        """
+        values = np.concatenate([np.asarray(level, dtype=np.float64) for level in self.levels])
+        weights = np.concatenate([np.full(len(level), 1 << height, dtype=np.int64)
+                                  for height, level in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        return values[order], weights[order]
+
+    def quantiles(self, qs):
+        """
+        Return estimates of the quantiles `qs` (fractions in [0, 1]).
+
+        Each retained item stands for `weight` consecutive order statistics,
+        and the estimate interpolates linearly between the order statistics
+        either side of rank q * (n - 1), as pandas does.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if len(self) == 0:
+            return np.full(qs.shape, np.nan)
+        values, weights = self._weighted_items()
+        upper_ranks = np.cumsum(weights)  # item i covers ranks up to upper_ranks[i] - 1
+
+        ranks = qs * (upper_ranks[-1] - 1)
+        below = np.floor(ranks)
+        lower_values = values[np.searchsorted(upper_ranks, below, side='right')]
+        upper_values = values[np.minimum(np.searchsorted(upper_ranks, np.ceil(ranks), side='right'), len(values) - 1)]
+        return lower_values + (upper_values - lower_values) * (ranks - below)
+
+    def quantile(self, q):
+        """
+        Return an estimate of the quantile `q`.
+        """
+        return float(self.quantiles([q])[0])
+
+
+class DDSketch:
+    """
+    Mergeable quantile sketch whose estimates are within `error`, relative to
+    the value, of the true order statistics.
+
+    Positive and negative values are counted in separate stores of
+    logarithmic buckets; values closer to zero than `min_value` are counted
+    as zero.
+    """
+
+    def __init__(self, error=0.01, min_value=1e-9):
+        self.error = error
+        self.min_value = min_value
+        self.gamma = (1 + error) / (1 - error)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def with_error(cls, error):
+        """
+        Return a sketch with relative error `error`.
+        """
+        return cls(error)
+
+    def __len__(self):
+        """
+        Return the number of values summarised by the sketch.
+        """
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zeros
+
+    def _count(self, store, magnitudes):
+        """
+        Add the bucket counts of an array of magnitudes of at least min_value to a store.
+        """
+        indices, counts = np.unique(np.ceil(np.log(magnitudes) / math.log(self.gamma)).astype(np.int64),
+                                    return_counts=True)
+        for index, count in zip(indices.tolist(), counts.tolist()):
+            store[index] = store.get(index, 0) + count
+
+    def update(self, values):
+        """
+        Add an array of values to the sketch, ignoring NaN.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self._count(self.positive, values[values >= self.min_value])
+            self._count(self.negative, -values[values <= -self.min_value])
+            self.zeros += int((np.abs(values) < self.min_value).sum())
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+        return self
+
+    def merge(self, other):
+        """
+        Merge another sketch with the same error into this one and return this sketch.
+        """
+        if other.gamma != self.gamma:
+            raise ValueError(f"Cannot merge a DDSketch with error {other.error} into one with error {self.error}")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in other_store.items():
+                store[index] = store.get(index, 0) + count
+        self.zeros += other.zeros
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def _buckets(self):
+        """
+        Return the value standing for each non-empty bucket in ascending order, with its count.
+        """
+        negative = sorted(self.negative, reverse=True)
+        positive = sorted(self.positive)
+        # The midpoint 2 * gamma**i / (gamma + 1) of bucket (gamma**(i - 1), gamma**i] is within `error` of all of it
+        scale = 2 / (self.gamma + 1)
+        values = np.concatenate([-scale * self.gamma ** np.array(negative, dtype=np.float64),
+                                 np.zeros(1 if self.zeros else 0),
+                                 scale * self.gamma ** np.array(positive, dtype=np.float64)])
+        counts = np.array([self.negative[i] for i in negative] + ([self.zeros] if self.zeros else [])
+                          + [self.positive[i] for i in positive], dtype=np.int64)
+        return values, counts
+
+    def quantiles(self, qs):
+        """
+        Return estimates of the quantiles `qs` (fractions in [0, 1]).
+
+        Like KLLSketch, the estimate interpolates between the order statistics
+        either side of rank q * (n - 1), each read from its bucket and kept
+        within the smallest and largest values seen.
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if len(self) == 0:
+            return np.full(qs.shape, np.nan)
+        values, counts = self._buckets()
+        values = np.clip(values, self.min, self.max)
+        upper_ranks = np.cumsum(counts)
+
+        ranks = qs * (upper_ranks[-1] - 1)
+        below = np.floor(ranks)
+        lower_values = values[np.searchsorted(upper_ranks, below, side='right')]
+        upper_values = values[np.searchsorted(upper_ranks, np.ceil(ranks), side='right')]
+        return lower_values + (upper_values - lower_values) * (ranks - below)
+
+    def quantile(self, q):
+        """
+        Return an estimate of the quantile `q`.
+        """
+        return float(self.quantiles([q])[0])
+
+
+# Sketch class of each sketch-based statistics method; each has a with_error constructor
+SKETCHES = {'kll': KLLSketch, 'ddsketch': DDSketch}
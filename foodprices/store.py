@@ -0,0 +1,240 @@
+"""
+Convert-once columnar store for the Food Prices for Nutrition indicators.
+
+The merged 'Data' and 'Country - Metadata' frame is written once per workbook
+version as one .npy file per column plus a JSON manifest:
+
+- numeric indicator columns are stored as float32 whenever that is lossless
+  (integer columns such as 'Time' keep an integer dtype),
+- 'Income Group' and 'Region' are stored as categorical codes,
+- every other text column is stored as codes into a list of unique strings.
+
+Reads memory-map the .npy files, so opening the store costs milliseconds and
+only the pages a script actually touches are read from disk.
+
+Run `python -m foodprices.store` to ingest the default workbook.
+"""
+import argparse
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from foodprices.loader import DATA_PATH, CACHE_DIR, cache_key, load_merged_data
+from foodprices.validation import check_workbook
+
+# Default location of the store, inside the shared cache directory
+STORE_DIR = os.path.join(CACHE_DIR, 'store')
+
+# Columns kept as pandas categoricals when the store is opened
+CATEGORICAL_COLUMNS = ['Income Group', 'Region']
+
+MANIFEST_NAME = 'manifest.json'
+
+# Significant digits that always identify a float32 value
+MAX_FLOAT32_DIGITS = 9
+
+
+def _code_dtype(n_categories):
+    """
+    Return the smallest signed integer dtype able to hold the codes (and -1 for missing).
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _float32_is_lossless(values):
+    """
+    Return True when every value reads back exactly after a trip through float32.
+
+    The workbook holds indicators with a handful of significant digits, which
+    float32 represents exactly at their shortest decimal form. Columns such as
+    'Population' that need more digits are kept as float64.
+    """
+    return np.array_equal(to_float64(values.astype(np.float32)), values, equal_nan=True)
+
+
+def to_float64(values):
+    """
+    Upcast a float32 array to float64 through its shortest decimal representation.
+
+    A plain astype would turn a stored 0.3 into 0.30000001192092896; going via
+    the decimal form gives back exactly 0.3, as written in the workbook.
+
+    The decimal form is found arithmetically: each value is rounded to 1, 2,
+    ... significant digits until the rounded float64 reads back as the same
+    float32. The few values needing powers of ten beyond 1e22, which float64
+    does not hold exactly, fall back to formatting through strings.
+    """
+    shape = np.shape(values)
+    values = np.asarray(values, dtype=np.float32).ravel()
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        result = values.astype(np.float64)
+        pending = np.flatnonzero(np.isfinite(result) & (result != 0))
+        exponent = np.floor(np.log10(np.abs(result[pending]))).astype(np.int64)
+        fallback = []
+        for digits in range(1, MAX_FLOAT32_DIGITS + 1):
+            x = result[pending]
+            shift = digits - 1 - exponent
+            scale = 10.0 ** np.abs(shift)
+            # Products and quotients of integers and exact powers of ten are correctly rounded
+            rounded = np.where(shift >= 0, np.round(x * scale) / scale, np.round(x / scale) * scale)
+            found = rounded.astype(np.float32) == values[pending]
+            exact = np.abs(shift) <= 22
+            result[pending[found & exact]] = rounded[found & exact]
+            fallback.append(pending[found & ~exact])
+            pending, exponent = pending[~found], exponent[~found]
+    fallback = np.concatenate(fallback + [pending])
+    if len(fallback):
+        result[fallback] = values[fallback].astype(str).astype(np.float64)
+    return result.reshape(shape)
+
+
+def upcast(frame):
+    """
+    Return `frame` with every float32 column upcast with to_float64.
+
+    Use this before accumulating statistics so sums and means are computed in
+    float64 on the values as published. Only the upcast columns are new
+    arrays; the other columns are shared with `frame`.
+    """
+    frame = frame.copy(deep=False)
+    for name in frame.select_dtypes('float32').columns:
+        frame[name] = to_float64(frame[name].to_numpy())
+    return frame
+
+
+def _encode_column(series):
+    """
+    Encode one column of the merged frame for the store.
+
+    Returns (array, column_manifest). Numeric columns become float32 (int32 for
+    integer columns, float64 where float32 would lose digits), and everything
+    else becomes integer codes with the categories recorded in the manifest.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return series.to_numpy(dtype=np.bool_), {'kind': 'bool'}
+    if pd.api.types.is_integer_dtype(series):
+        return series.to_numpy(dtype=np.int32), {'kind': 'int'}
+    if pd.api.types.is_numeric_dtype(series):
+        values = series.to_numpy(dtype=np.float64)
+        if _float32_is_lossless(values):
+            return values.astype(np.float32), {'kind': 'float'}
+        return values, {'kind': 'float'}
+
+    codes, categories = pd.factorize(series, sort=True)
+    categories = [str(value) for value in categories]
+    kind = 'category' if series.name in CATEGORICAL_COLUMNS else 'text'
+    return codes.astype(_code_dtype(len(categories))), {'kind': kind, 'categories': categories}
+
+
+def store_path(data_path=DATA_PATH, store_dir=STORE_DIR):
+    """
+    Return the directory holding the store for the current contents of `data_path`.
+    """
+    return os.path.join(store_dir, cache_key(data_path))
+
+
+def ingest(data_path=DATA_PATH, store_dir=STORE_DIR):
+    """
+    Convert the workbook into the columnar store and return the store directory.
+
+    The workbook is first validated against foodprices.validation.SCHEMA,
+    raising SchemaError if it fails. The store is written to a temporary
+    directory and renamed into place, so a partially written store is never
+    picked up by a reader. Ingesting a workbook that already has a store is a
+    no-op.
+    """
+    path = store_path(data_path, store_dir)
+    if os.path.exists(os.path.join(path, MANIFEST_NAME)):
+        return path
+
+    # Raises SchemaError before anything is written for a workbook that fails validation
+    check_workbook(data_path)
+    merged_data = load_merged_data(data_path)
+
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    columns = []
+    for position, name in enumerate(merged_data.columns):
+        array, column = _encode_column(merged_data[name])
+        column['name'] = name
+        column['file'] = f"col_{position:03d}.npy"
+        np.save(os.path.join(temp_path, column['file']), array)
+        columns.append(column)
+
+    manifest = {
+        'source': os.path.basename(data_path),
+        'key': os.path.basename(path),
+        'rows': len(merged_data),
+        'columns': columns,
+    }
+    with open(os.path.join(temp_path, MANIFEST_NAME), 'w') as handle:
+        json.dump(manifest, handle, indent=2)
+
+    try:
+        os.replace(temp_path, path)
+    except OSError:
+        # Another process finished ingesting the same workbook first
+        shutil.rmtree(temp_path, ignore_errors=True)
+    return path
+
+
+def open_store(path, mmap=True):
+    """
+    Open a store directory and return it as a DataFrame.
+
+    With mmap=True the numeric columns are read-only memory maps of the .npy
+    files, so no indicator data is copied until it is used. Text columns are
+    decoded back to strings, and the columns in CATEGORICAL_COLUMNS are
+    returned as pandas categoricals.
+    """
+    with open(os.path.join(path, MANIFEST_NAME)) as handle:
+        manifest = json.load(handle)
+
+    mmap_mode = 'r' if mmap else None
+    data = {}
+    for column in manifest['columns']:
+        array = np.load(os.path.join(path, column['file']), mmap_mode=mmap_mode)
+        if column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(np.asarray(array), column['categories'])
+        elif column['kind'] == 'text':
+            categories = np.array(column['categories'] + [np.nan], dtype=object)
+            data[column['name']] = categories[np.asarray(array)]
+        else:
+            data[column['name']] = array
+
+    return pd.DataFrame(data, copy=False)
+
+
+def load_store(data_path=DATA_PATH, store_dir=STORE_DIR, mmap=True):
+    """
+    Return the merged dataset read from the columnar store.
+
+    The workbook is ingested first if it has no store yet, so scripts can call
+    this unconditionally in place of parsing the workbook.
+    """
+    return open_store(ingest(data_path, store_dir), mmap=mmap)
+
+
+def main(argv=None):
+    """
+    Command-line entry point: ingest a workbook into the columnar store.
+    """
+    parser = argparse.ArgumentParser(description='Convert the Food Prices for Nutrition workbook into a columnar store.')
+    parser.add_argument('data_path', nargs='?', default=DATA_PATH, help='Path to the workbook')
+    parser.add_argument('--store-dir', default=STORE_DIR, help='Directory holding the stores')
+    args = parser.parse_args(argv)
+
+    path = ingest(args.data_path, args.store_dir)
+    print(f"Store written to '{path}'")
+
+
+if __name__ == '__main__':
+    main()
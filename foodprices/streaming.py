@@ -0,0 +1,140 @@
+"""
+Streaming ingestion for exports too large to hold in memory.
+
+pd.read_excel materialises the whole 'Data' sheet and the metadata merge
+makes a second full copy. This module instead iterates the sheet in
+fixed-size chunks, using a read-only openpyxl workbook or a CSV export, and
+joins each chunk against a CountryIndex built once from the country metadata.
+The chunks are fed into the mergeable ColumnStats aggregators of the
+incremental mode, so peak memory is bounded by the chunk size and the
+sketch size, however many rows the input holds.
+"""
+from itertools import islice
+
+import pandas as pd
+
+from foodprices.correlation import indicator_columns
+from foodprices.country_index import CountryIndex, load_country_index
+from foodprices.incremental import TRACKED_COLUMNS, SummaryStatistics
+from foodprices.loader import DATA_PATH
+from foodprices.summary import add_cost_ratios
+
+# Number of rows held in memory at a time
+CHUNK_SIZE = 10000
+
+
+def _is_csv(path):
+    """
+    Return True when `path` is a CSV export rather than a workbook.
+    """
+    return str(path).lower().endswith('.csv')
+
+
+def _sheet_rows(path, sheet_name):
+    """
+    Yield the rows of a worksheet as tuples of values, header first, without
+    loading the sheet into memory.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook[sheet_name].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_sheet_chunks(path=DATA_PATH, sheet_name='Data', chunk_size=CHUNK_SIZE):
+    """
+    Yield the rows of a sheet as DataFrames of at most `chunk_size` rows.
+
+    `path` is a workbook, read with openpyxl in read-only mode, or a CSV
+    export of the sheet, read with pandas in chunks.
+    """
+    if _is_csv(path):
+        yield from pd.read_csv(path, chunksize=chunk_size)
+        return
+
+    rows = _sheet_rows(path, sheet_name)
+    header = list(next(rows))
+    while True:
+        records = list(islice(rows, chunk_size))
+        if not records:
+            break
+        yield pd.DataFrame.from_records(records, columns=header)
+
+
+def metadata_index(path=DATA_PATH):
+    """
+    Return the CountryIndex used to join the chunks.
+
+    `path` is the workbook, whose saved index is reused, or a CSV export of
+    the 'Country - Metadata' sheet. The metadata has one row per country, so
+    the index stays small however long the data sheet is.
+    """
+    if _is_csv(path):
+        return CountryIndex.from_metadata(pd.read_csv(path))
+    return load_country_index(path)
+
+
+def iter_merged_chunks(data_path=DATA_PATH, metadata_path=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield chunks of the 'Data' sheet with the country code, income group,
+    region and aggregate flag joined on.
+
+    This is the streaming equivalent of loader.merge_metadata: each chunk's
+    names are hashed once into CountryIndex codes and the metadata columns
+    are integer lookups. Countries missing from the metadata get NaN, as in
+    a left merge. Indicator values
+    that are not numbers, such as the '..' placeholders of World Bank
+    exports, become NaN. `metadata_path` defaults to `data_path` and must be
+    given when the data is a CSV export.
+    """
+    if metadata_path is None:
+        if _is_csv(data_path):
+            raise ValueError("metadata_path is required when the data is a CSV export")
+        metadata_path = data_path
+    index = metadata_index(metadata_path)
+
+    for chunk in iter_sheet_chunks(data_path, chunk_size=chunk_size):
+        for column in indicator_columns(chunk):
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+        yield index.join(chunk)
+
+
+class StreamingSummary(SummaryStatistics):
+    """
+    Summary statistics accumulated one chunk at a time.
+    """
+
+    def __init__(self, group='Income Group', columns=TRACKED_COLUMNS, k=200, sketch=None):
+        super().__init__(group, columns, k, sketch)
+        self.rows = 0
+
+    def update(self, chunk):
+        """
+        Add a chunk of merged rows, with the cost ratios derived per chunk, and return this object.
+        """
+        self._add(add_cost_ratios(chunk))
+        self.rows += len(chunk)
+        return self
+
+    def merge(self, other):
+        """
+        Merge the statistics of chunks summarised elsewhere, e.g. in another process, and return this object.
+        """
+        super().merge(other)
+        self.rows += other.rows
+        return self
+
+
+def stream_summary(data_path=DATA_PATH, metadata_path=None, chunk_size=CHUNK_SIZE, sketch=None):
+    """
+    Return the StreamingSummary of a workbook or CSV export, read one chunk at a time.
+
+    `sketch` creates the empty quantile sketches, as in SummaryStatistics.
+    """
+    statistics = StreamingSummary(sketch=sketch)
+    for chunk in iter_merged_chunks(data_path, metadata_path, chunk_size):
+        statistics.update(chunk)
+    return statistics
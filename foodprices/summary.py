@@ -0,0 +1,115 @@
+"""
+Summary statistics for the cost and affordability of diets.
+
+These are the calculations behind scripts/summary_statistics_analysis.py,
+written as functions of the merged data frame so the script and the pipeline
+runner share one implementation.
+"""
+import pandas as pd
+
+from foodprices.correlation import correlation_matrix
+
+# Columns for the cost of each diet type
+DIET_COST_COLUMNS = [
+    'Cost of an energy sufficient diet',
+    'Cost of a nutrient adequate diet',
+    'Cost of a healthy diet'
+]
+
+# Columns for the share of the population who cannot afford each diet type
+AFFORDABILITY_COLUMNS = [
+    'Percent of the population who cannot afford sufficient calories',
+    'Percent of the population who cannot afford nutrient adequacy',
+    'Percent of the population who cannot afford a healthy diet'
+]
+
+# Cost of a healthy diet followed by the food-group components it is correlated with
+CORRELATION_COLUMNS = [
+    'Cost of a healthy diet',
+    'Cost of fruits',
+    'Cost of vegetables',
+    'Cost of animal-source foods',
+    'Cost of legumes, nuts and seeds',
+    'Cost of oils and fats'
+]
+
+# Names of the cost ratio columns added by add_cost_ratios
+COST_RATIO_COLUMNS = ['Healthy vs Energy Sufficient', 'Healthy vs Nutrient Adequate']
+
+
+def diet_cost_summary(merged_data):
+    """
+    Return describe() statistics for the cost of each diet type.
+    """
+    return merged_data[DIET_COST_COLUMNS].describe()
+
+
+def affordability_summary(merged_data):
+    """
+    Return describe() statistics for the share of the population who cannot afford each diet.
+    """
+    return merged_data[AFFORDABILITY_COLUMNS].describe()
+
+
+def add_cost_ratios(merged_data):
+    """
+    Return a copy of the merged data with the healthy diet cost ratio columns added.
+
+    The ratios compare the cost of a healthy diet with the cost of an energy
+    sufficient diet and of a nutrient adequate diet. A ratio is missing where
+    its denominator is missing, zero or negative, rather than infinite;
+    foodprices.validation reports such costs when the workbook is ingested.
+    """
+    merged_data = merged_data.copy()
+    energy_sufficient = merged_data['Cost of an energy sufficient diet']
+    nutrient_adequate = merged_data['Cost of a nutrient adequate diet']
+    merged_data['Healthy vs Energy Sufficient'] = (
+        merged_data['Cost of a healthy diet'] / energy_sufficient.where(energy_sufficient > 0)
+    )
+    merged_data['Healthy vs Nutrient Adequate'] = (
+        merged_data['Cost of a healthy diet'] / nutrient_adequate.where(nutrient_adequate > 0)
+    )
+    return merged_data
+
+
+def cost_ratio_summary(merged_data):
+    """
+    Return describe() statistics for the healthy diet cost ratios.
+    """
+    return add_cost_ratios(merged_data)[COST_RATIO_COLUMNS].describe()
+
+
+def healthy_diet_correlations(merged_data):
+    """
+    Return the Pearson correlations behind Step 3 of the summary statistics script.
+
+    The first row correlates the cost of a healthy diet with the share of the
+    population who cannot afford one; the remaining rows correlate each
+    food-group cost with the cost of a healthy diet. The coefficients come from
+    one batched correlation matrix, with missing values handled pairwise.
+    """
+    affordability_column = 'Percent of the population who cannot afford a healthy diet'
+    r, p_values, _ = correlation_matrix(merged_data, CORRELATION_COLUMNS + [affordability_column])
+
+    variables = [affordability_column] + CORRELATION_COLUMNS[1:]  # Skip 'Cost of a healthy diet'
+    correlations = pd.DataFrame({
+        'Pearson r': r.loc[variables, 'Cost of a healthy diet'],
+        'P-value': p_values.loc[variables, 'Cost of a healthy diet'],
+    })
+    correlations.index.name = 'Variable'
+    return correlations
+
+
+def healthy_diet_cost_by_income_group(merged_data):
+    """
+    Return the mean cost of a healthy diet for each income group.
+    """
+    return merged_data.groupby('Income Group', observed=True)['Cost of a healthy diet'].mean()
+
+
+def affordability_summary_by_income_group(merged_data):
+    """
+    Return describe() statistics for each affordability column within each income group.
+    """
+    affordability = merged_data[AFFORDABILITY_COLUMNS]
+    return affordability.groupby(merged_data['Income Group'], observed=True).describe()
@@ -0,0 +1,155 @@
+"""
+Synthetic Food Prices for Nutrition datasets of any size.
+
+The real workbook has one row per country for 2021. These generators build
+'Data' and 'Country - Metadata' sheets with the same columns and the same
+kinds of rows (countries plus regional, income-group and world aggregates)
+scaled to any number of rows by adding years. Values are drawn from a seeded
+generator so a size and seed always give the same frame.
+"""
+import numpy as np
+import pandas as pd
+
+# Columns of the 'Data' sheet, in sheet order
+DATA_COLUMNS = [
+    'Country Name', 'Time',
+    'Cost of an energy sufficient diet', 'Cost of a nutrient adequate diet', 'Cost of a healthy diet',
+    'Affordability of an energy sufficient diet: ratio of cost to the food poverty line',
+    'Affordability of a nutrient adequate diet: ratio of cost to the food poverty line',
+    'Affordability of a healthy diet: ratio of cost to the food poverty line',
+    'Affordability of an energy sufficient diet: ratio of cost to food expenditures',
+    'Affordability of a nutrient adequate diet: ratio of cost to food expenditures',
+    'Affordability of a healthy diet: ratio of cost to food expenditures',
+    'Percent of the population who cannot afford sufficient calories',
+    'Percent of the population who cannot afford nutrient adequacy',
+    'Percent of the population who cannot afford a healthy diet',
+    'Millions of people who cannot afford sufficient calories',
+    'Millions of people who cannot afford nutrient adequacy',
+    'Millions of people who cannot afford a healthy diet',
+    'Population',
+    'Cost of fruits', 'Cost of starchy staples', 'Cost of vegetables', 'Cost of animal-source foods',
+    'Cost of legumes, nuts and seeds', 'Cost of oils and fats',
+]
+
+# Columns of the 'Country - Metadata' sheet
+METADATA_COLUMNS = ['Code', 'Long Name', 'Income Group', 'Region', 'Special Notes', 'Table Name']
+
+INCOME_GROUPS = ['High-income', 'Upper-middle-income', 'Lower-middle-income', 'Low-income']
+REGIONS = [
+    'East Asia & Pacific', 'Europe & Central Asia', 'Latin America & Caribbean',
+    'Middle East & North Africa', 'North America', 'South Asia', 'Sub-Saharan Africa',
+]
+
+# Aggregate rows of the 'Data' sheet, as they are named in the workbook
+AGGREGATES = REGIONS + INCOME_GROUPS + ['WORLD']
+
+# Number of distinct countries and aggregates; larger frames add years instead
+MAX_ENTITIES = 200
+
+# First year of the synthetic time series
+FIRST_YEAR = 2021
+
+# Share of indicator values left missing, like the gaps in the real workbook
+MISSING_FRACTION = 0.03
+
+
+def _entity_names(n_entities):
+    """
+    Return the aggregate names followed by synthetic country names, `n_entities` in total.
+    """
+    n_aggregates = min(len(AGGREGATES), max(n_entities // 10, 1))
+    countries = [f"Country {i:04d}" for i in range(n_entities - n_aggregates)]
+    return AGGREGATES[:n_aggregates], countries
+
+
+def synthetic_metadata(n_entities=MAX_ENTITIES, seed=0):
+    """
+    Return a 'Country - Metadata' sheet for `n_entities` countries and aggregates.
+
+    Countries get a random income group and region. Aggregates have no
+    income group and the region 'Aggregates', and 'WORLD' has no metadata
+    row at all, as in the workbook.
+    """
+    rng = np.random.default_rng(seed)
+    aggregates, countries = _entity_names(n_entities)
+    aggregates = [name for name in aggregates if name != 'WORLD']
+
+    names = countries + aggregates
+    metadata = pd.DataFrame({
+        'Code': [f"C{i:04d}" for i in range(len(names))],
+        'Long Name': [f"Republic of {name}" for name in countries] + aggregates,
+        'Income Group': rng.choice(INCOME_GROUPS, size=len(countries)).tolist() + [np.nan] * len(aggregates),
+        'Region': [f"{region} (FPN)" for region in rng.choice(REGIONS, size=len(countries)).tolist()]
+        + ['Aggregates'] * len(aggregates),
+        'Special Notes': np.nan,
+        'Table Name': names,
+    })
+    return metadata[METADATA_COLUMNS]
+
+
+def synthetic_data(n_rows, seed=0):
+    """
+    Return a 'Data' sheet with `n_rows` rows.
+
+    Up to MAX_ENTITIES countries and aggregates each get one row per year,
+    with as many years as needed. Diet costs are lognormal, with the
+    cheaper diets and the food-group costs as fractions of the healthy diet;
+    affordability, headcounts and population follow from them.
+    """
+    rng = np.random.default_rng(seed)
+    aggregates, countries = _entity_names(min(n_rows, MAX_ENTITIES))
+    names = np.array(sorted(countries + aggregates), dtype=object)
+    n_years = -(-n_rows // len(names))
+
+    country = np.repeat(names, n_years)[:n_rows]
+    time = np.tile(np.arange(FIRST_YEAR, FIRST_YEAR + n_years), len(names))[:n_rows]
+
+    healthy = rng.lognormal(np.log(3.5), 0.2, n_rows)
+    energy = healthy * rng.uniform(0.2, 0.35, n_rows)
+    nutrient = healthy * rng.uniform(0.6, 0.85, n_rows)
+    poverty_line = rng.uniform(1.5, 4.0, n_rows)
+    expenditure = rng.uniform(1.0, 12.0, n_rows)
+    income = rng.normal(0, 1.5, n_rows)
+    population = np.round(rng.lognormal(np.log(1e7), 1.5, n_rows))
+    shares = rng.dirichlet([19.0, 15.9, 20.9, 28.6, 10.7, 4.8], n_rows)
+
+    percents = []
+    for cost in (energy, nutrient, healthy):
+        percents.append(100 / (1 + np.exp(income - 2 * np.log(cost))))
+    costs = np.column_stack([energy, nutrient, healthy])
+    values = np.column_stack([
+        costs,
+        costs / poverty_line[:, None],
+        costs / expenditure[:, None],
+        *percents,
+        *[pct / 100 * population / 1e6 for pct in percents],
+        population,
+        shares * healthy[:, None],
+    ])
+    values = np.round(values, 2)
+    values[:, -7] = population
+    values[rng.random(values.shape) < MISSING_FRACTION] = np.nan
+
+    data = pd.DataFrame(values, columns=DATA_COLUMNS[2:])
+    data.insert(0, 'Time', time)
+    data.insert(0, 'Country Name', country)
+    return data
+
+
+def synthetic_merged_data(n_rows, seed=0):
+    """
+    Return synthetic data merged with its metadata, like loader.load_merged_data.
+    """
+    from foodprices.loader import merge_metadata
+
+    return merge_metadata(synthetic_data(n_rows, seed), synthetic_metadata(min(n_rows, MAX_ENTITIES), seed))
+
+
+def write_synthetic_workbook(path, n_rows, seed=0):
+    """
+    Write a synthetic workbook with 'Data' and 'Country - Metadata' sheets to `path`.
+    """
+    with pd.ExcelWriter(path) as writer:
+        synthetic_data(n_rows, seed).to_excel(writer, sheet_name='Data', index=False)
+        synthetic_metadata(min(n_rows, MAX_ENTITIES), seed).to_excel(writer, sheet_name='Country - Metadata', index=False)
+    return path
@@ -0,0 +1,227 @@
+"""
+Declarative schema and data-quality checks for the merged workbook.
+
+SCHEMA lists every column the analyses read with its kind and, for numeric
+columns, the range its values must fall in: costs are positive, percentages
+lie in [0, 100], and the affordability ratios, headcounts and population
+are never negative. validate checks the merged frame against it in one
+pass:
+
+- presence: every column of SCHEMA exists;
+- dtypes: numeric columns are numeric, 'Time' is an integer, text columns
+  hold strings (or nothing at all);
+- ranges: every numeric column is stacked into one matrix and compared with
+  the lower and upper bounds of all columns in one broadcast; missing values
+  are allowed;
+- join coverage: rows of the 'Data' sheet without a row in the metadata
+  sheet, other than the known extra aggregates such as 'WORLD';
+- duplicates: more than one row for the same country and year.
+
+The result is a DataFrame with one row per failed check, empty when the
+workbook is valid. Join coverage gaps are warnings, since a left merge keeps
+those rows; every other failure is an error. validate_workbook caches the
+result in .cache/ keyed on the content hash of the workbook, so the store
+validates each workbook version once, at ingest, and later stages and tests
+read the cached result instead of checking the workbook again.
+"""
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from foodprices.country_index import EXTRA_AGGREGATES
+from foodprices.loader import CACHE_DIR, DATA_PATH, cache_key
+
+# Columns of the issues table returned by validate
+ISSUE_COLUMNS = ['Severity', 'Check', 'Column', 'Rows', 'Message']
+
+# Number of example row labels quoted in an issue message
+MAX_EXAMPLES = 5
+
+
+class Column:
+    """
+    Schema of one column: its kind ('number', 'integer' or 'text') and, for
+    numbers, the bounds of its values. `exclusive` makes the lower bound strict.
+    """
+
+    def __init__(self, kind, minimum=None, maximum=None, exclusive=False):
+        self.kind = kind
+        self.minimum = minimum
+        self.maximum = maximum
+        self.exclusive = exclusive
+
+    def __repr__(self):
+        return f"Column({self.kind!r}, {self.minimum!r}, {self.maximum!r}, exclusive={self.exclusive!r})"
+
+
+# The 'Data' sheet, with the metadata columns joined to it by loader.merge_metadata
+SCHEMA = {
+    'Country Name': Column('text'),
+    'Time': Column('integer'),
+    'Cost of an energy sufficient diet': Column('number', 0, exclusive=True),
+    'Cost of a nutrient adequate diet': Column('number', 0, exclusive=True),
+    'Cost of a healthy diet': Column('number', 0, exclusive=True),
+    'Affordability of an energy sufficient diet: ratio of cost to the food poverty line': Column('number', 0),
+    'Affordability of a nutrient adequate diet: ratio of cost to the food poverty line': Column('number', 0),
+    'Affordability of a healthy diet: ratio of cost to the food poverty line': Column('number', 0),
+    'Affordability of an energy sufficient diet: ratio of cost to food expenditures': Column('number', 0),
+    'Affordability of a nutrient adequate diet: ratio of cost to food expenditures': Column('number', 0),
+    'Affordability of a healthy diet: ratio of cost to food expenditures': Column('number', 0),
+    'Percent of the population who cannot afford sufficient calories': Column('number', 0, 100),
+    'Percent of the population who cannot afford nutrient adequacy': Column('number', 0, 100),
+    'Percent of the population who cannot afford a healthy diet': Column('number', 0, 100),
+    'Millions of people who cannot afford sufficient calories': Column('number', 0),
+    'Millions of people who cannot afford nutrient adequacy': Column('number', 0),
+    'Millions of people who cannot afford a healthy diet': Column('number', 0),
+    'Population': Column('number', 0, exclusive=True),
+    'Cost of fruits': Column('number', 0, exclusive=True),
+    'Cost of starchy staples': Column('number', 0, exclusive=True),
+    'Cost of vegetables': Column('number', 0, exclusive=True),
+    'Cost of animal-source foods': Column('number', 0, exclusive=True),
+    'Cost of legumes, nuts and seeds': Column('number', 0, exclusive=True),
+    'Cost of oils and fats': Column('number', 0, exclusive=True),
+    'Code': Column('text'),
+    'Income Group': Column('text'),
+    'Region': Column('text'),
+    'Table Name': Column('text'),
+}
+
+
+class SchemaError(ValueError):
+    """
+    A workbook that fails the schema, with the issues table of validate.
+    """
+
+    def __init__(self, issues):
+        errors = issues[issues['Severity'] == 'error']
+        super().__init__(f"{len(errors)} schema checks failed:\n" + '\n'.join(errors['Message']))
+        self.issues = issues
+
+
+def _kind_matches(series, kind):
+    """
+    Return True when the dtype of `series` suits a column of `kind`.
+    """
+    if kind == 'integer':
+        return pd.api.types.is_integer_dtype(series)
+    if kind == 'number':
+        return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+    # Text columns that are empty throughout are read as float by read_excel
+    return (pd.api.types.is_string_dtype(series) or isinstance(series.dtype, pd.CategoricalDtype)
+            or bool(series.isna().all()))
+
+
+def _examples(labels):
+    """
+    Return up to MAX_EXAMPLES labels as a comma-separated string.
+    """
+    shown = ', '.join(str(label) for label in labels[:MAX_EXAMPLES])
+    return shown + (', ...' if len(labels) > MAX_EXAMPLES else '')
+
+
+def validate(merged_data, schema=SCHEMA, extra_aggregates=EXTRA_AGGREGATES):
+    """
+    Check the merged frame against `schema` and return the issues found.
+    """
+    issues = []
+
+    def issue(severity, check, column, rows, message):
+        issues.append([severity, check, column, rows, message])
+
+    missing = [name for name in schema if name not in merged_data.columns]
+    for name in missing:
+        issue('error', 'presence', name, 0, f"Column '{name}' is missing")
+
+    present = {name: column for name, column in schema.items() if name in merged_data.columns}
+    for name, column in present.items():
+        if not _kind_matches(merged_data[name], column.kind):
+            issue('error', 'dtype', name, len(merged_data),
+                  f"Column '{name}' has dtype {merged_data[name].dtype}, expected {column.kind}")
+
+    # Every bounded column is checked at once against its own bounds
+    bounded = [name for name, column in present.items() if column.kind != 'text'
+               and pd.api.types.is_numeric_dtype(merged_data[name])
+               and (column.minimum is not None or column.maximum is not None)]
+    if bounded:
+        values = merged_data[bounded].to_numpy(dtype=np.float64)
+        lower = np.array([-np.inf if present[name].minimum is None else present[name].minimum for name in bounded])
+        upper = np.array([np.inf if present[name].maximum is None else present[name].maximum for name in bounded])
+        strict = np.array([present[name].exclusive for name in bounded])
+        with np.errstate(invalid='ignore'):
+            outside = (values < lower) | (values > upper) | (strict & (values == lower))
+        names = merged_data['Country Name'].to_numpy() if 'Country Name' in merged_data else merged_data.index
+        for j in np.flatnonzero(outside.any(axis=0)):
+            rows = np.flatnonzero(outside[:, j])
+            column = present[bounded[j]]
+            bounds = f"{'(' if column.exclusive else '['}{lower[j]:g}, {upper[j]:g}]"
+            issue('error', 'range', bounded[j], len(rows),
+                  f"{len(rows)} values of '{bounded[j]}' fall outside {bounds}: {_examples(names[rows])}")
+
+    if 'Country Name' in merged_data and 'Table Name' in merged_data:
+        unmatched = merged_data['Table Name'].isna() & ~merged_data['Country Name'].isin(extra_aggregates)
+        if unmatched.any():
+            names = merged_data.loc[unmatched, 'Country Name'].unique()
+            issue('warning', 'join', 'Country Name', int(unmatched.sum()),
+                  f"{len(names)} names have no row in the metadata sheet: {_examples(names)}")
+
+    key = [name for name in ['Country Name', 'Time'] if name in merged_data]
+    if key:
+        duplicated = merged_data.duplicated(subset=key, keep=False)
+        if duplicated.any():
+            names = merged_data.loc[duplicated, 'Country Name'].unique() if 'Country Name' in key else []
+            issue('error', 'duplicates', ', '.join(key), int(duplicated.sum()),
+                  f"{int(duplicated.sum())} rows share a country and year: {_examples(names)}")
+
+    return pd.DataFrame(issues, columns=ISSUE_COLUMNS)
+
+
+def _validator_version():
+    """
+    Return a short hash of SCHEMA, the aggregate names and the source of this
+    module, so that editing the checks invalidates the cached results.
+    """
+    with open(__file__, 'rb') as handle:
+        source = handle.read()
+    return hashlib.sha256(source + repr(SCHEMA).encode() + repr(EXTRA_AGGREGATES).encode()).hexdigest()[:16]
+
+
+def validation_path(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Return the path of the cached validation result for the current contents
+    of the workbook and the current checks.
+    """
+    return os.path.join(cache_dir, f"validation-{cache_key(data_path)}-{_validator_version()}.pkl")
+
+
+def validate_workbook(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Return the issues of a workbook, validating it once per content hash and version of the checks.
+    """
+    path = validation_path(data_path, cache_dir)
+    if os.path.exists(path):
+        with open(path, 'rb') as handle:
+            return pickle.load(handle)
+
+    from foodprices.loader import load_merged_data
+
+    issues = validate(load_merged_data(data_path, cache_dir))
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as handle:
+        pickle.dump(issues, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)
+    return issues
+
+
+def check_workbook(data_path=DATA_PATH, cache_dir=CACHE_DIR):
+    """
+    Validate a workbook and raise SchemaError if any check fails with an
+    error. Returns the issues, which then hold warnings at most.
+    """
+    issues = validate_workbook(data_path, cache_dir)
+    if (issues['Severity'] == 'error').any():
+        raise SchemaError(issues)
+    return issues
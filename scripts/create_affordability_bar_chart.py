@@ -1,96 +1,78 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import os
+import sys
 
-# Path to the dataset
-data_path = './data/Food_Prices_For_Nutrition.xlsx'
+# Make the shared foodprices package importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-try:
+from foodprices.figure_cache import save_affordability_bar_chart
+from foodprices.figures import plot_affordability_bar_chart
+from foodprices.loader import DATA_PATH
+from foodprices.profiling import step
+from foodprices.render import headless_requested, show_or_close, use_headless
+from foodprices.store import load_store
+
+# File the bar chart is saved to
+OUTPUT_PATH = './figures/affordability_bar_chart.png'
+
+
+def load_data(data_path=DATA_PATH):
+    """
+    Return the main data merged with the income group and region classifications.
+    """
     # Step 1: Load the dataset
-    # Load the main data sheet containing affordability metrics
-    main_data = pd.read_excel(data_path, sheet_name='Data')
-
-    # Load the metadata sheet containing income group and region classifications
-    country_metadata = pd.read_excel(data_path, sheet_name='Country - Metadata')
-
-    # Step 2: Merge data and filter required columns
-    # Merge the main data with metadata on country names
-    merged_data = pd.merge(
-        main_data,
-        country_metadata,
-        left_on='Country Name',
-        right_on='Table Name',
-        how='left'
-    )
-
-    # Extract relevant columns for affordability analysis
-    affordability_data = merged_data[['Country Name', 'Income Group', 'Percent of the population who cannot afford sufficient calories','Percent of the population who cannot afford nutrient adequacy', 'Percent of the population who cannot afford a healthy diet']]
-
-    # Rename columns for clarity and readability
-    affordability_data.columns = ['Country', 'Income Group', 'Energy Sufficient Diet','Nutrient Adequate Diet', 'Healthy Diet']
-
-    # Step 3: Filter and reorder data for the chart
-    # Specify the order of countries and regions for the plot
-    ordered_countries = [
-        "East Asia & Pacific", "Europe & Central Asia", "Latin America & Caribbean",
-        "Middle East & North Africa", "North America", "South Asia", "Sub-Saharan Africa",
-        "WORLD", "High income", "Upper-middle income", "Lower-middle income", "Low income"
-    ]
-    # Filter and reorder data based on the specified order
-    affordability_data = affordability_data[affordability_data['Country'].isin(ordered_countries)]
-    affordability_data = affordability_data.set_index('Country').reindex(ordered_countries)
-
-    # Step 4: Create the plot
-    # Define diet types and corresponding colors for the bar chart
-    diet_types = ['Energy Sufficient Diet', 'Nutrient Adequate Diet', 'Healthy Diet']
-    colours = ['#88CCEE', '#DDCC77', '#117733']  # Light color-blind-friendly palette
-
-    # Create a horizontal bar chart with subplots for each diet type
-    fig, axes = plt.subplots(nrows=1, ncols=3, figsize=(18, 8), sharey=True)
-
-    for i, diet in enumerate(diet_types):
-        ax = axes[i]
-        # Plot the horizontal bar chart
-        ax.barh(affordability_data.index, affordability_data[diet], color=colours[i])
-        ax.set_title(diet, fontsize=16, fontweight='bold', pad=15)  # Add title to each subplot
-        ax.set_xlim(0, 100)  # Set x-axis limits to percentage values
-
-        # Add percentage labels to each bar
-        for index, value in enumerate(affordability_data[diet]):
-            ax.text(value + 2, index, f"{value:.1f}%", va='center', fontsize=15, color='black', fontweight = 'bold')
-
-        # Remove unnecessary spines and grid lines for a cleaner look
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
-        ax.spines['bottom'].set_visible(False)
-        ax.spines['left'].set_visible(False)
-        ax.grid(False)
-
-        # Hide y-axis labels for all but the first subplot
-        if i > 0:
-            ax.tick_params(left=False)
-
-    # Step 5: Add shared labels and adjust layout
-    # Set shared y-axis labels for country names
-    axes[0].set_yticklabels(affordability_data.index, fontsize=14, fontweight = 'bold')
-    axes[0].tick_params(axis='y', labelsize=14)
-
-    # Add a shared x-axis label centered across all subplots
-    fig.text(0.5, 0.02, 'Percentage of Population (%)', ha='center', fontsize=14,fontweight='bold')
-
-    # Add a shared title for the entire figure
-    fig.suptitle('Share of Population Unable to Afford Different Diet Standards, 2021', 
-                 fontsize=20, fontweight='bold', y=1.02)
-
-    # Adjust the layout for better spacing
-    plt.tight_layout(w_pad=3, rect=[0, 0.05, 1, 0.95])  # Add space at the top for the title
+    # The data is read from the columnar store, which is built from the workbook on first use.
+    with step('Step 1: Load') as span:
+        merged_data = load_store(data_path)
+        span.rows = len(merged_data)
+    return merged_data
+
+
+def create_bar_chart(merged_data, output_path=OUTPUT_PATH, headless=True, cache=None):
+    """
+    Save the affordability bar chart for a merged frame.
+
+    Headless runs copy the figure from the figure cache (`cache`, default:
+    the shared one) when the plotted data is unchanged; otherwise the figure
+    is drawn, saved and displayed.
+    """
+    if headless:
+        # Steps 2-6: Create and save the bar chart, or copy it from the figure cache
+        # when the plotted data is unchanged since it was last rendered
+        with step('Steps 2-6: Bar chart', rows=len(merged_data)):
+            save_affordability_bar_chart(merged_data, output_path, cache=cache)
+        print(f"Figure saved to '{output_path}'")
+        return
+
+    # Steps 2-5: Filter and reorder the affordability data and create the bar chart
+    # The plotting code lives in foodprices/figures.py so the pipeline runner can reuse it
+    with step('Steps 2-5: Bar chart', rows=len(merged_data)):
+        fig = plot_affordability_bar_chart(merged_data)
 
     # Step 6: Save and display the figure
     # Save the final plot as a PNG file
-    plt.savefig('./figures/affordability_bar_chart.png', bbox_inches='tight')
-    print("Figure saved to './figures/population_affordability_bar_chart.png'")
+    with step('Step 6: Save'):
+        fig.savefig(output_path, bbox_inches='tight')
+    print(f"Figure saved to '{output_path}'")
+
+    show_or_close(fig, headless)
+
+
+def main(data_path=DATA_PATH, output_path=OUTPUT_PATH):
+    """
+    Load the workbook and create the bar chart.
+    """
+    # Run with --headless (or set FOODPRICES_HEADLESS=1) to save the figure without opening a window;
+    # headless runs reuse the cached image when the plotted data has not changed
+    headless = headless_requested()
+    if headless:
+        use_headless()
+
+    try:
+        create_bar_chart(load_data(data_path), output_path, headless)
+    except Exception as e:
+        # Handle any exceptions that occur during data loading or plotting
+        print(f"Error: {e}")
 
-    plt.show()
 
-except Exception as e:
-    # Handle any exceptions that occur during data loading or plotting
-    print(f"Error: {e}")
+if __name__ == '__main__':
+    main()
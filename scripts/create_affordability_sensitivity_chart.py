@@ -0,0 +1,73 @@
+import os
+import sys
+
+# Make the shared foodprices package importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from foodprices.figures import plot_affordability_sensitivity
+from foodprices.loader import DATA_PATH
+from foodprices.profiling import step
+from foodprices.render import headless_requested, show_or_close, use_headless
+from foodprices.sensitivity import BASELINE_SHARE, affordability_sweep, sweep_by_income_group
+from foodprices.store import load_store
+
+# Output directory of the curves and file the chart is saved to
+RESULTS_DIR = './summary_stats_results'
+OUTPUT_PATH = './figures/affordability_sensitivity.png'
+
+
+def load_data(data_path=DATA_PATH):
+    """
+    Return the main data merged with the income group and region classifications.
+    """
+    # Step 1: Load the dataset
+    with step('Step 1: Load') as span:
+        merged_data = load_store(data_path)
+        span.rows = len(merged_data)
+    return merged_data
+
+
+def create_sensitivity_chart(merged_data, results_dir=RESULTS_DIR, output_path=OUTPUT_PATH, headless=True):
+    """
+    Save the affordability sensitivity curves per income group and their chart
+    for a merged frame, displaying the chart unless `headless`.
+    """
+    # Step 2: Sweep the affordability threshold
+    # Every country is evaluated at every share of income at once, from a lognormal
+    # income distribution fitted to its three diet costs and headcounts
+    with step('Step 2: Sweep', rows=len(merged_data)):
+        sweep = affordability_sweep(merged_data)
+        curves = sweep_by_income_group(merged_data, sweep)
+
+    # Step 3: Save the income group curves
+    os.makedirs(results_dir, exist_ok=True)
+    curves.T.to_csv(os.path.join(results_dir, 'affordability_sensitivity_by_income_group.csv'))
+    print(f"Sensitivity curves saved to '{results_dir}/affordability_sensitivity_by_income_group.csv'")
+
+    # Step 4: Create, save and display the figure
+    with step('Step 4: Sensitivity chart'):
+        fig = plot_affordability_sensitivity(curves, BASELINE_SHARE)
+        fig.savefig(output_path, bbox_inches='tight')
+    print(f"Figure saved to '{output_path}'")
+
+    show_or_close(fig, headless)
+
+
+def main(data_path=DATA_PATH, results_dir=RESULTS_DIR, output_path=OUTPUT_PATH):
+    """
+    Load the workbook and create the sensitivity curves and chart.
+    """
+    # Run with --headless (or set FOODPRICES_HEADLESS=1) to save the figure without opening a window
+    headless = headless_requested()
+    if headless:
+        use_headless()
+
+    try:
+        create_sensitivity_chart(load_data(data_path), results_dir, output_path, headless)
+    except Exception as e:
+        # Handle any exceptions that occur during data loading or plotting
+        print(f"Error: {e}")
+
+
+if __name__ == '__main__':
+    main()
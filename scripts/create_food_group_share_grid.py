@@ -0,0 +1,62 @@
+import os
+import sys
+
+# Make the shared foodprices package importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from foodprices.figure_cache import save_food_group_share_grid
+from foodprices.food_groups import GROUPINGS, load_share_tables
+from foodprices.loader import DATA_PATH
+from foodprices.profiling import step
+from foodprices.render import use_headless
+
+# Output directories of the share tables and the grids
+RESULTS_DIR = './summary_stats_results'
+FIGURES_DIR = './figures'
+
+
+def load_tables(data_path=DATA_PATH):
+    """
+    Return the food group share tables of the workbook.
+    """
+    # Step 1: Compute the food group shares
+    # Shares per country, and population-weighted per income group and region,
+    # cached on the content hash of the workbook
+    with step('Step 1: Food group shares') as span:
+        tables = load_share_tables(data_path)
+        span.rows = len(tables['Country'])
+    return tables
+
+
+def create_share_grids(tables, results_dir=RESULTS_DIR, figures_dir=FIGURES_DIR, cache=None):
+    """
+    Save each grouping's share table and grid of pies, given the tables of
+    foodprices.food_groups.share_tables.
+    """
+    # Step 2: Save the share tables and one grid of pies per grouping
+    os.makedirs(results_dir, exist_ok=True)
+    for by in GROUPINGS:
+        name = f"food_group_shares_by_{by.lower().replace(' ', '_')}"
+        tables[by].to_csv(os.path.join(results_dir, f"{name}.csv"))
+        with step(f"Step 2: {by} grid", rows=len(tables[by])):
+            save_food_group_share_grid(tables[by], os.path.join(figures_dir, f"{name}.png"),
+                                       title=f"Food Group Shares of the Cost of a Healthy Diet by {by}", cache=cache)
+        print(f"Shares saved to '{results_dir}/{name}.csv' and '{figures_dir}/{name}.png'")
+
+
+def main(data_path=DATA_PATH, results_dir=RESULTS_DIR, figures_dir=FIGURES_DIR):
+    """
+    Compute the share tables of the workbook and save them with their grids.
+    """
+    # The grids are only ever saved to files, so no window is opened
+    use_headless()
+
+    try:
+        create_share_grids(load_tables(data_path), results_dir, figures_dir)
+    except Exception as e:
+        # Handle any exceptions that occur during data loading or plotting
+        print(f"Error: {e}")
+
+
+if __name__ == '__main__':
+    main()
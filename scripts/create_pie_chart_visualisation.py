@@ -1,63 +1,84 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# Step 1: Define the data for the pie chart
-# Food groups and their percentage contributions to the cost of a healthy diet
-food_groups = [
-    'Fruits', 
-    'Starchy Staples', 
-    'Vegetables', 
-    'Animal-Source Foods', 
-    'Legumes, Nuts and Seeds', 
-    'Oils and Fats'
-]
-contributions = [19.0, 15.9, 20.9, 28.6, 10.7, 4.8]  # Percentage contributions for each food group
-
-# Step 2: Set up the figure and chart aesthetics
-# Create the figure with a square layout for balanced visual proportions
-plt.figure(figsize=(8, 8))
-# Use a consistent and visually appealing color palette
-colors = sns.color_palette("Set2", n_colors=len(contributions))
-
-# Step 3: Highlight the most important food group
-explode = [0, 0, 0, 0.05, 0, 0]
-
-# Step 4: Create the pie chart
-plt.pie(
-    contributions, 
-    labels=None,  # Labels removed from the slices; legend will be used instead
-    autopct='%1.1f%%',  # Display percentages inside the slices
-    startangle=90,  # Align the first slice starting at 90 degrees
-    colors=colors,  # Apply the defined color palette
-    explode=explode,  # Separate the "Animal-Source Foods" slice
-    wedgeprops={'edgecolor': 'white', 'linewidth': 1.5},  # Add white borders for better slice visibility
-    textprops={'fontsize': 12, 'fontweight': 'bold'}  # Set smaller font size for percentages
-)
-
-# Step 5: Add a title with proper formatting
-# Title is split across two lines for better readability
-plt.title(
-    'Average Percentage Contribution of Each Food Group\n to the Cost of a Healthy Diet', 
-    fontsize=15, fontweight='bold', pad=20  # Set font size, weight, and padding
-)
-
-# Step 6: Add the legend to the right of the chart
-# Legend is placed vertically to the right for consistency with report style
-plt.legend(
-    food_groups,  # Labels for the legend
-    loc='center left',  # Position the legend vertically to the left of the chart
-    bbox_to_anchor=(1, 0.5),  # Adjust the legend position
-    fontsize=12,  # Set font size for readability
-    frameon=False  # Remove legend border for a cleaner look
-)
-
-# Step 7: Adjust layout and save the chart
-# Ensure there is enough spacing around all elements
-plt.tight_layout(pad=2.5)
-# Save the final figure to the "figures" directory
-plt.savefig('./figures/food_group_pie_chart.png', bbox_inches='tight')
-
-# Step 8: Display the chart
-# Show the pie chart in the output
-plt.show()
+import os
+import sys
+
+# Make the shared foodprices package importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from foodprices.figure_cache import save_food_group_pie_chart
+from foodprices.figures import FOOD_GROUP_CONTRIBUTIONS, FOOD_GROUPS, plot_food_group_pie_chart
+from foodprices.food_groups import average_shares
+from foodprices.loader import DATA_PATH
+from foodprices.profiling import step
+from foodprices.render import headless_requested, show_or_close, use_headless
+from foodprices.store import load_store
+
+# File the pie chart is saved to
+OUTPUT_PATH = './figures/food_group_pie_chart.png'
+
+
+def food_group_shares(merged_data):
+    """
+    Return the food groups and their average percentage contributions to the
+    cost of a healthy diet in a merged frame.
+    """
+    # Step 1: Define the data for the pie chart
+    # Average the food group costs over the countries in the workbook
+    with step('Step 1: Food group shares') as span:
+        span.rows = len(merged_data)
+        shares = average_shares(merged_data)
+    return list(shares.index), list(shares)
+
+
+def create_pie_chart(food_groups, contributions, output_path=OUTPUT_PATH, headless=True, cache=None):
+    """
+    Save the pie chart of the food groups' contributions.
+
+    Headless runs copy the figure from the figure cache (`cache`, default:
+    the shared one) when the food groups and contributions are unchanged;
+    otherwise the figure is drawn, saved and displayed.
+    """
+    if headless:
+        # Steps 2-7: Create and save the chart, or copy it from the figure cache
+        # when the food groups and contributions are unchanged since it was last rendered
+        with step('Steps 2-7: Pie chart'):
+            save_food_group_pie_chart(output_path, food_groups, contributions, cache=cache)
+        return
+
+    # Steps 2-6: Create the pie chart with its title and legend
+    # The plotting code lives in foodprices/figures.py so the pipeline runner can reuse it
+    with step('Steps 2-6: Pie chart'):
+        fig = plot_food_group_pie_chart(food_groups, contributions)
+
+    # Step 7: Save the chart
+    # Save the final figure to the "figures" directory
+    with step('Step 7: Save'):
+        fig.savefig(output_path, bbox_inches='tight')
+
+    # Step 8: Display the chart
+    # Show the pie chart in the output
+    show_or_close(fig, headless)
+
+
+def main(data_path=DATA_PATH, output_path=OUTPUT_PATH, argv=None):
+    """
+    Create the pie chart from the workbook, or from the published contributions with --published.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Run with --headless (or set FOODPRICES_HEADLESS=1) to save the figure without opening a window;
+    # headless runs reuse the cached image when the chart's data has not changed
+    headless = headless_requested(argv)
+    if headless:
+        use_headless()
+
+    # Run with --published to draw the contributions as published instead of computing them from the workbook
+    if '--published' in argv:
+        food_groups, contributions = FOOD_GROUPS, FOOD_GROUP_CONTRIBUTIONS
+    else:
+        food_groups, contributions = food_group_shares(load_store(data_path))
+
+    create_pie_chart(food_groups, contributions, output_path, headless)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,125 +1,263 @@
-import pandas as pd
-from scipy.stats import pearsonr
+import os
+import sys
+
+# Make the shared foodprices package importable when the script is run directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from foodprices import summary
+from foodprices.approximate import SKETCH_ERROR, sketch_requested, sketch_statistics
+from foodprices.bootstrap import bootstrap_group_means, permutation_test_groups
+from foodprices.correlation import CORRELATION_FILENAME, correlation_table
+from foodprices.export import EXPORT_FORMAT, export_results
+from foodprices.loader import DATA_PATH
+from foodprices.profiling import step
+from foodprices.store import load_store, upcast
+
+# Folder the summary statistics are saved to
+RESULTS_DIR = './summary_stats_results'
+
+# Each step is a function of the merged data, so it can be imported and run on any frame, and returns
+# the tables it saved by name for the export in Step 6;
+# every step is timed by foodprices.profiling; set FOODPRICES_TRACE=trace.json to save a trace
+
 
 # Step 1: Load the data
-data_path = './data/Food_Prices_For_Nutrition.xlsx'
-
-try:
-    # Load the main data sheet
-    main_data = pd.read_excel(data_path, sheet_name='Data')
-    
-    # Load the country metadata sheet for income group and region
-    country_metadata = pd.read_excel(data_path, sheet_name='Country - Metadata')
-    
-    # Merge the main dataset with country metadata
-    merged_data = pd.merge(
-        main_data,
-        country_metadata,
-        left_on='Country Name',
-        right_on='Table Name',
-        how='left'
-    )
-
-    # Display the first few rows to confirm data is loaded correctly
-    print("Data loaded successfully:")
-    print(merged_data.head())
-
-except Exception as e:
-    print(f"Error loading data: {e}")
+def load_data(data_path=DATA_PATH):
+    """
+    Return the merged data with float64 indicators.
+    """
+    with step('Step 1: Load data') as span:
+        # Load the main dataset merged with the country metadata for income group and region.
+        # The data is read from the columnar store, which is built from the workbook on first use.
+        # Indicators are stored as float32, so upcast them before accumulating statistics
+        merged_data = upcast(load_store(data_path))
+        span.rows = len(merged_data)
+
+        # Display the first few rows to confirm data is loaded correctly
+        print("Data loaded successfully:")
+        print(merged_data.head())
+    return merged_data
+
+
+# Optional: Estimate the quartiles with mergeable sketches instead of sorting every column
+def sketch_summary(merged_data, method, error=SKETCH_ERROR):
+    """
+    Return the sketch-based statistics used by Steps 2 and 5 in place of describe().
+    """
+    with step('Sketch statistics') as span:
+        span.rows = len(merged_data)
+
+        # Counts, means, standard deviations and extremes stay exact; only the quartiles are estimated
+        statistics = sketch_statistics(merged_data, method, error)
+        print(f"\nQuartiles estimated with {method} sketches (error {error})")
+    return statistics
+
 
 # Step 2: Calculate necessary summary statistics
-try:
-    # Select columns for diet costs and affordability
-    diet_costs = merged_data[['Cost of an energy sufficient diet', 
-                              'Cost of a nutrient adequate diet', 
-                              'Cost of a healthy diet']]
-    
-    affordability = merged_data[['Percent of the population who cannot afford sufficient calories', 
-                                  'Percent of the population who cannot afford nutrient adequacy', 
-                                  'Percent of the population who cannot afford a healthy diet']]
-    
-    # Calculate summary statistics for diet costs
-    diet_cost_stats = diet_costs.describe()
-    print("\nSummary Statistics for Diet Costs:")
-    print(diet_cost_stats)
-
-    # Calculate summary statistics for affordability
-    affordability_stats = affordability.describe()
-    print("\nSummary Statistics for Affordability:")
-    print(affordability_stats)
-
-    # Calculate cost ratios (Healthy vs Energy Sufficient and Nutrient Adequate)
-    merged_data['Healthy vs Energy Sufficient'] = (
-        merged_data['Cost of a healthy diet'] / merged_data['Cost of an energy sufficient diet']
-    )
-    merged_data['Healthy vs Nutrient Adequate'] = (
-        merged_data['Cost of a healthy diet'] / merged_data['Cost of a nutrient adequate diet']
-    )
-    cost_ratio_stats = merged_data[['Healthy vs Energy Sufficient', 'Healthy vs Nutrient Adequate']].describe()
-    print("\nSummary Statistics for Cost Ratios:")
-    print(cost_ratio_stats)
-
-    # Save summary statistics to CSV files
-    diet_cost_stats.to_csv('./summary_stats_results/diet_cost_summary.csv', index=True)
-    affordability_stats.to_csv('./summary_stats_results/affordability_summary.csv', index=True)
-    cost_ratio_stats.to_csv('./summary_stats_results/cost_ratios_summary.csv', index=True)
-    print("\nSummary statistics saved to './summary_stats_results/' folder.")
-
-except Exception as e:
-    print(f"Error calculating summary statistics: {e}")
+def summary_statistics(merged_data, results_dir=RESULTS_DIR, statistics=None):
+    """
+    Save describe() statistics for diet costs, affordability and cost ratios,
+    read from sketch-based `statistics` when given.
+    """
+    with step('Step 2: Summary statistics') as span:
+        span.rows = len(merged_data)
+
+        # Calculate summary statistics for diet costs
+        if statistics is None:
+            diet_cost_stats = summary.diet_cost_summary(merged_data)
+        else:
+            diet_cost_stats = statistics.summary(summary.DIET_COST_COLUMNS)
+        print("\nSummary Statistics for Diet Costs:")
+        print(diet_cost_stats)
+
+        # Calculate summary statistics for affordability
+        if statistics is None:
+            affordability_stats = summary.affordability_summary(merged_data)
+        else:
+            affordability_stats = statistics.summary(summary.AFFORDABILITY_COLUMNS)
+        print("\nSummary Statistics for Affordability:")
+        print(affordability_stats)
+
+        # Calculate cost ratios (Healthy vs Energy Sufficient and Nutrient Adequate)
+        if statistics is None:
+            cost_ratio_stats = summary.cost_ratio_summary(merged_data)
+        else:
+            cost_ratio_stats = statistics.summary(summary.COST_RATIO_COLUMNS)
+        print("\nSummary Statistics for Cost Ratios:")
+        print(cost_ratio_stats)
+
+        # Save summary statistics to CSV files
+        diet_cost_stats.to_csv(os.path.join(results_dir, 'diet_cost_summary.csv'), index=True)
+        affordability_stats.to_csv(os.path.join(results_dir, 'affordability_summary.csv'), index=True)
+        cost_ratio_stats.to_csv(os.path.join(results_dir, 'cost_ratios_summary.csv'), index=True)
+        print(f"\nSummary statistics saved to '{results_dir}/' folder.")
+    return {'diet_cost_summary': diet_cost_stats, 'affordability_summary': affordability_stats,
+            'cost_ratios_summary': cost_ratio_stats}
+
 
 # Step 3: Perform correlation analysis
-try:
-    # Drop rows with missing values for relevant columns
-    correlation_columns = ['Cost of a healthy diet', 'Cost of fruits', 'Cost of vegetables',
-                           'Cost of animal-source foods', 'Cost of legumes, nuts and seeds', 
-                           'Cost of oils and fats']
-    clean_data = merged_data.dropna(subset=correlation_columns)
-
-    # Correlation between cost of a healthy diet and affordability
-    cost_healthy_diet = clean_data['Cost of a healthy diet']
-    percent_cannot_afford = clean_data['Percent of the population who cannot afford a healthy diet']
-    corr_cost_afford, p_value_afford = pearsonr(cost_healthy_diet, percent_cannot_afford)
-    print(f"\nCorrelation between cost of a healthy diet and affordability:")
-    print(f"Pearson correlation coefficient: {corr_cost_afford:.2f}, P-value: {p_value_afford:.4f}")
-
-    # Correlation between components and total cost of a healthy diet
-    print("\nCorrelation of Healthy Diet Components with Total Cost of a Healthy Diet:")
-    for component in correlation_columns[1:]:  # Skip 'Cost of a healthy diet'
-        corr, p_val = pearsonr(clean_data[component], cost_healthy_diet)
-        print(f"{component}: Pearson r = {corr:.2f}, P-value = {p_val:.4f}")
-
-except Exception as e:
-    print(f"Error calculating correlation coefficients: {e}")
+def correlation_analysis(merged_data, results_dir=RESULTS_DIR):
+    """
+    Print the healthy diet correlations and save the full correlation table.
+    """
+    with step('Step 3: Correlations') as span:
+        span.rows = len(merged_data)
+
+        # Correlations come from one batched matrix computation, with missing values handled pairwise
+        correlations = summary.healthy_diet_correlations(merged_data)
+
+        # Correlation between cost of a healthy diet and affordability
+        corr_cost_afford, p_value_afford = correlations.iloc[0]
+        print(f"\nCorrelation between cost of a healthy diet and affordability:")
+        print(f"Pearson correlation coefficient: {corr_cost_afford:.2f}, P-value: {p_value_afford:.4f}")
+
+        # Correlation between components and total cost of a healthy diet
+        print("\nCorrelation of Healthy Diet Components with Total Cost of a Healthy Diet:")
+        for component, (corr, p_val) in correlations.iloc[1:].iterrows():
+            print(f"{component}: Pearson r = {corr:.2f}, P-value = {p_val:.4f}")
+
+        # Save the Pearson and Spearman correlations between all cost and affordability indicators
+        correlation_matrix = correlation_table(merged_data)
+        correlation_matrix.to_csv(os.path.join(results_dir, CORRELATION_FILENAME), index=False)
+        print(f"\nCorrelation matrix saved to '{results_dir}/{CORRELATION_FILENAME}'")
+    return {'healthy_diet_correlations': correlations, 'correlation_matrix': correlation_matrix}
+
 
 # Step 4: Calculate cost of a healthy diet by income group
-try:
-    # Group the data by Income Group and calculate the mean cost of a healthy diet
-    income_group_cost = merged_data.groupby('Income Group')['Cost of a healthy diet'].mean()
+def cost_by_income_group(merged_data, results_dir=RESULTS_DIR):
+    """
+    Save the mean cost of a healthy diet per income group with bootstrap
+    confidence intervals and pairwise group-difference tests.
+    """
+    with step('Step 4: Cost by income group') as span:
+        span.rows = len(merged_data)
 
-    # Display the results
-    print("\nAverage Cost of a Healthy Diet by Income Group:")
-    print(income_group_cost)
+        # Group the data by Income Group and calculate the mean cost of a healthy diet
+        income_group_cost = summary.healthy_diet_cost_by_income_group(merged_data)
 
-    # Save the results to a CSV file
-    income_group_cost.to_csv('./summary_stats_results/healthy_diet_cost_by_income_group.csv', index=True)
-    print("\nCost by income group saved to './summary_stats_results/healthy_diet_cost_by_income_group.csv'")
+        # Display the results
+        print("\nAverage Cost of a Healthy Diet by Income Group:")
+        print(income_group_cost)
+
+        # Save the results to a CSV file
+        income_group_cost.to_csv(os.path.join(results_dir, 'healthy_diet_cost_by_income_group.csv'), index=True)
+        print(f"\nCost by income group saved to '{results_dir}/healthy_diet_cost_by_income_group.csv'")
+
+        # Attach 95% bootstrap confidence intervals to the means (10,000 seeded resamples per group)
+        income_group_cost_ci = bootstrap_group_means(merged_data)
+        print("\nBootstrap 95% Confidence Intervals for the Average Cost of a Healthy Diet:")
+        print(income_group_cost_ci)
+        income_group_cost_ci.to_csv(os.path.join(results_dir, 'healthy_diet_cost_by_income_group_bootstrap.csv'),
+                                    index=True)
+
+        # Test the difference in mean cost between every pair of income groups
+        income_group_differences = permutation_test_groups(merged_data)
+        print("\nPermutation Tests for Differences Between Income Groups:")
+        print(income_group_differences)
+        income_group_differences.to_csv(os.path.join(results_dir, 'healthy_diet_cost_income_group_differences.csv'),
+                                        index=False)
+        print(f"\nConfidence intervals and group differences saved to '{results_dir}/' folder.")
+    return {'healthy_diet_cost_by_income_group': income_group_cost,
+            'healthy_diet_cost_by_income_group_bootstrap': income_group_cost_ci,
+            'healthy_diet_cost_income_group_differences': income_group_differences}
 
-except Exception as e:
-    print(f"Error calculating cost by income group: {e}")
 
 # Step 5: Calculate affordability summary stats by income group
-try:
-    # Group by Income Group and calculate summary stats for affordability percentages
-    affordability_summary_by_income = affordability.groupby(merged_data['Income Group']).describe()
+def affordability_by_income_group(merged_data, results_dir=RESULTS_DIR, statistics=None):
+    """
+    Save describe() statistics for the affordability percentages per income
+    group, read from sketch-based `statistics` when given.
+    """
+    with step('Step 5: Affordability by income group') as span:
+        span.rows = len(merged_data)
+
+        # Group by Income Group and calculate summary stats for affordability percentages
+        if statistics is None:
+            affordability_summary_by_income = summary.affordability_summary_by_income_group(merged_data)
+        else:
+            affordability_summary_by_income = statistics.summary_by_group(summary.AFFORDABILITY_COLUMNS)
+
+        # Save the summary statistics to a CSV file
+        affordability_summary_by_income.to_csv(os.path.join(results_dir, 'affordability_summary_by_income_group.csv'))
+        print(f"\nAffordability summary stats by income group saved to "
+              f"'{results_dir}/affordability_summary_by_income_group.csv'")
+
+        # Print the summary statistics for review
+        print("\nAffordability Summary Statistics by Income Group:")
+        print(affordability_summary_by_income)
+    return {'affordability_summary_by_income_group': affordability_summary_by_income}
+
+
+# Step 6: Export every table to one long-format file
+def export_tables(tables, results_dir=RESULTS_DIR, export_format=EXPORT_FORMAT):
+    """
+    Write the tables saved by Steps 2-5 to one SQLite file (or Parquet dataset or CSV file).
+    """
+    with step('Step 6: Export'):
+        # One row per value with a stable schema, written in a single transaction,
+        # so loaders do not have to open and parse every CSV
+        path = export_results(tables, results_dir, export_format)
+        print(f"\nAll tables exported to '{path}'")
+
+
+# Steps 2-5 with the message printed when each one fails
+ANALYSIS_STEPS = [
+    (summary_statistics, 'Error calculating summary statistics'),
+    (correlation_analysis, 'Error calculating correlation coefficients'),
+    (cost_by_income_group, 'Error calculating cost by income group'),
+    (affordability_by_income_group, 'Error calculating affordability stats by income group'),
+]
+
+# Steps reading their describe() statistics from the sketches in sketch mode
+SKETCHED_STEPS = [summary_statistics, affordability_by_income_group]
+
+
+def run_analysis(merged_data, results_dir=RESULTS_DIR, export_format=EXPORT_FORMAT, sketch=None):
+    """
+    Run Steps 2-5 on a merged frame, reporting a failed step and going on with
+    the next, then export the tables of the steps that succeeded.
+
+    `sketch` is a (method, error) pair of foodprices.approximate, or None for
+    the exact statistics of describe().
+    """
+    options = {}
+    if sketch is not None:
+        try:
+            options = {'statistics': sketch_summary(merged_data, *sketch)}
+        except Exception as e:
+            print(f"Error calculating sketch statistics, using describe() instead: {e}")
+
+    tables = {}
+    for analysis_step, message in ANALYSIS_STEPS:
+        step_options = options if analysis_step in SKETCHED_STEPS else {}
+        try:
+            tables.update(analysis_step(merged_data, results_dir, **step_options))
+        except Exception as e:
+            print(f"{message}: {e}")
+
+    try:
+        export_tables(tables, results_dir, export_format)
+    except Exception as e:
+        print(f"Error exporting tables: {e}")
+
+
+def main(data_path=DATA_PATH, results_dir=RESULTS_DIR, argv=None):
+    """
+    Load the workbook and run every step of the analysis.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+
+    # Run with --sketch kll or --sketch ddsketch, and optionally --sketch-error 0.01, to estimate the
+    # quartiles of Steps 2 and 5 with mergeable sketches instead of sorting every column
+    sketch = sketch_requested(argv)
 
-    # Save the summary statistics to a CSV file
-    affordability_summary_by_income.to_csv('./summary_stats_results/affordability_summary_by_income_group.csv')
-    print("\nAffordability summary stats by income group saved to './summary_stats_results/affordability_summary_by_income_group.csv'")
+    try:
+        merged_data = load_data(data_path)
+    except Exception as e:
+        print(f"Error loading data: {e}")
+        return
+    run_analysis(merged_data, results_dir, sketch=sketch)
 
-    # Print the summary statistics for review
-    print("\nAffordability Summary Statistics by Income Group:")
-    print(affordability_summary_by_income)
 
-except Exception as e:
-    print(f"Error calculating affordability stats by income group: {e}")
+if __name__ == '__main__':
+    main()
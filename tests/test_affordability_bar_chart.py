@@ -1,7 +1,8 @@
-import pandas as pd
 import os
 import unittest
 
+from foodprices.fixtures import workbook
+
 class TestAffordabilityVisualisation(unittest.TestCase):
     """
     Unit tests for verifying the data and outputs related to the affordability bar chart visualisation.
@@ -30,7 +31,7 @@ class TestAffordabilityVisualisation(unittest.TestCase):
         cause the test to fail with an appropriate error message.
         """
         # Load the dataset
-        df = pd.read_excel(self.data_path, sheet_name='Data')
+        df = workbook()
 
         # Check for the presence of each required column
         for col in self.required_columns:
@@ -44,18 +45,8 @@ class TestAffordabilityVisualisation(unittest.TestCase):
         out during the data preparation stage. The merged dataset should only contain
         rows with non-null income group values.
         """
-        # Load the metadata and main dataset
-        metadata = pd.read_excel(self.data_path, sheet_name='Country - Metadata')
-        main_data = pd.read_excel(self.data_path, sheet_name='Data')
-
-        # Merge the main data with metadata to include income groups
-        merged_data = pd.merge(
-            main_data,
-            metadata,
-            left_on='Country Name',
-            right_on='Table Name',
-            how='left'
-        )
+        # Load the main data merged with the metadata to include income groups
+        merged_data = workbook()
 
         # Filter rows with non-null income groups
         filtered_data = merged_data.dropna(subset=['Income Group'])
@@ -0,0 +1,82 @@
+import unittest
+
+import numpy as np
+
+from foodprices.aggregation import QUANTILES, indicator_columns, rollup, rollups
+from foodprices.synthetic import synthetic_merged_data
+
+
+class TestAggregation(unittest.TestCase):
+    """
+    Unit tests for the population-weighted rollups.
+    """
+
+    def setUp(self):
+        """
+        Build a synthetic merged frame with missing values and aggregates.
+        """
+        self.merged_data = synthetic_merged_data(2000, seed=3)
+        self.countries = self.merged_data[self.merged_data['Income Group'].notna()]
+
+    def weighted_quantiles(self, values, weights, qs):
+        """
+        Return the smallest values reached by the shares `qs` of the total
+        weight, numpy's 'inverted_cdf' method with weights.
+        """
+        order = np.argsort(values, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        return values[order][np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side='left')]
+
+    def test_matches_numpy_weighted_statistics(self):
+        """
+        Test to verify that the weighted means and quantiles of every group
+        equal numpy's weighted average and 'inverted_cdf' weighted quantiles.
+        """
+        column = 'Cost of a healthy diet'
+        table = rollup(self.merged_data, 'Region', [column])
+
+        for region, rows in self.countries.dropna(subset=[column, 'Population']).groupby('Region'):
+            values, weights = rows[column].to_numpy(), rows['Population'].to_numpy()
+            result = table.loc[(region, column)]
+            self.assertEqual(result['Countries'], len(rows))
+            np.testing.assert_allclose(result['Weighted Mean'], np.average(values, weights=weights))
+            np.testing.assert_allclose(result[['P10', 'P25', 'Median', 'P75', 'P90']].to_numpy(dtype=float),
+                                       self.weighted_quantiles(values, weights, list(QUANTILES.values())))
+
+    def test_headcounts_and_aggregates(self):
+        """
+        Test to verify that the headcount is the population who cannot afford
+        the diet in millions, that aggregates are left out and that every
+        indicator of every grouping is produced in one call.
+        """
+        column = 'Percent of the population who cannot afford a healthy diet'
+        table = rollup(self.merged_data, 'Income Group', [column, 'Cost of a healthy diet'])
+
+        rows = self.countries.dropna(subset=[column, 'Population'])
+        expected = (rows[column] / 100 * rows['Population']).groupby(rows['Income Group']).sum() / 1e6
+        np.testing.assert_allclose(table.xs(column, level='Indicator')['Millions Who Cannot Afford'], expected)
+        self.assertTrue(table.xs('Cost of a healthy diet', level='Indicator')['Millions Who Cannot Afford'].isna().all())
+
+        both = rollups(self.merged_data)
+        self.assertFalse(any(column.startswith('Millions of people') for column in indicator_columns(self.merged_data)))
+        self.assertNotIn('Millions of people who cannot afford a healthy diet', both.index.get_level_values('Indicator'))
+        self.assertEqual(set(both.index.get_level_values('Grouping')), {'Income Group', 'Region'})
+        self.assertNotIn('Aggregates', both.index.get_level_values('Group'))
+
+    def test_custom_grouping(self):
+        """
+        Test to verify that a mapping from country name to group rolls up
+        only the mapped countries under the new labels.
+        """
+        names = self.countries['Country Name'].unique()
+        grouping = {name: ('North' if i % 2 else 'South') for i, name in enumerate(names[:20])}
+        table = rollup(self.merged_data, grouping, ['Cost of a healthy diet'])
+
+        self.assertEqual(list(table.index.get_level_values('Group')), ['North', 'South'])
+        mapped = self.countries[self.countries['Country Name'].isin(grouping)].dropna(
+            subset=['Cost of a healthy diet', 'Population'])
+        self.assertEqual(table['Countries'].sum(), len(mapped))
+
+
+if __name__ == '__main__':
+    unittest.main()
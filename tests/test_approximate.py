@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices import summary
+from foodprices.approximate import sketch_factory, sketch_requested, sketch_statistics
+from foodprices.fixtures import load_script, synthetic_merged, workbook
+from foodprices.incremental import DESCRIBE_INDEX
+from foodprices.sketch import DDSketch, KLLSketch
+
+# Rows of the synthetic frame the sketches are checked on
+N_ROWS = 200000
+
+# Error bound the sketches are built with
+ERROR = 0.01
+
+
+class TestApproximateStatistics(unittest.TestCase):
+    """
+    Unit tests for the sketch-based summary statistics mode.
+    """
+
+    def setUp(self):
+        """
+        Load a large synthetic frame and its exact describe() statistics.
+        """
+        self.merged_data = synthetic_merged(N_ROWS, seed=3)
+        self.exact = pd.concat([summary.diet_cost_summary(self.merged_data),
+                                summary.affordability_summary(self.merged_data)], axis=1)
+        self.columns = summary.DIET_COST_COLUMNS + summary.AFFORDABILITY_COLUMNS
+
+    def assert_exact_moments(self, table):
+        """
+        Assert that every statistic but the quartiles equals describe().
+        """
+        moments = ['count', 'mean', 'std', 'min', 'max']
+        np.testing.assert_allclose(table.loc[moments].to_numpy(), self.exact.loc[moments].to_numpy(), rtol=1e-9)
+
+    def test_kll_within_rank_error(self):
+        """
+        Test to verify that the KLL quartiles of every diet cost and
+        affordability column lie within the requested rank error of the exact
+        quartiles, and that the other statistics are exact.
+        """
+        table = sketch_statistics(self.merged_data, 'kll', ERROR).summary(self.columns)
+
+        self.assert_exact_moments(table)
+        for column in self.columns:
+            values = np.sort(self.merged_data[column].dropna().to_numpy())
+            for q, statistic in zip([0.25, 0.5, 0.75], ['25%', '50%', '75%']):
+                # Ranks of the estimate: the positions of the values it falls between
+                low = np.searchsorted(values, table.loc[statistic, column], side='left') / (len(values) - 1)
+                high = (np.searchsorted(values, table.loc[statistic, column], side='right') - 1) / (len(values) - 1)
+                self.assertLessEqual(max(low - q, q - high, 0), ERROR, (column, statistic))
+
+    def test_kll_bound_over_seeds_and_batches(self):
+        """
+        Test to verify that a KLL sketch stays within its rank error between
+        the 5% and 95% quantiles for several seeds and batch sizes, while
+        holding about 3k items.
+        """
+        qs = np.linspace(0.05, 0.95, 19)
+        for seed in range(5):
+            values = np.random.default_rng(seed).random(100000)
+            ordered = np.sort(values)
+            for batch_size in [100, 1000, len(values)]:
+                sketch = KLLSketch.with_error(ERROR, seed=seed)
+                for start in range(0, len(values), batch_size):
+                    sketch.update(values[start:start + batch_size])
+
+                ranks = np.searchsorted(ordered, sketch.quantiles(qs)) / len(values)
+                self.assertLessEqual(np.abs(ranks - qs).max(), ERROR, (seed, batch_size))
+                self.assertLess(sum(len(level) for level in sketch.levels), 4 * sketch.k)
+
+    def test_ddsketch_within_relative_error(self):
+        """
+        Test to verify that the DDSketch quartiles, overall and per income
+        group, are within the requested relative error of describe() and
+        groupby().describe().
+        """
+        statistics = sketch_statistics(self.merged_data, 'ddsketch', ERROR)
+        table = statistics.summary(self.columns)
+
+        self.assert_exact_moments(table)
+        quartiles = ['25%', '50%', '75%']
+        np.testing.assert_allclose(table.loc[quartiles].to_numpy(), self.exact.loc[quartiles].to_numpy(),
+                                   rtol=ERROR)
+
+        by_group = statistics.summary_by_group(summary.AFFORDABILITY_COLUMNS)
+        exact_by_group = summary.affordability_summary_by_income_group(self.merged_data)
+        pd.testing.assert_index_equal(by_group.columns, exact_by_group.columns)
+        pd.testing.assert_index_equal(by_group.index, exact_by_group.index, exact=False)
+        np.testing.assert_allclose(by_group.to_numpy(), exact_by_group.to_numpy(), rtol=ERROR)
+
+    def test_merged_across_chunks_and_processes(self):
+        """
+        Test to verify that statistics of chunks summarised in worker
+        processes merge into the same DDSketch tables as one pass, and into
+        KLL tables within the rank error, and that mismatched sketches do not merge.
+        """
+        whole = sketch_statistics(self.merged_data, 'ddsketch', ERROR)
+        parts = sketch_statistics(self.merged_data, 'ddsketch', ERROR, chunk_size=30000, processes=2)
+
+        self.assertEqual(parts.rows, len(self.merged_data))
+        pd.testing.assert_frame_equal(parts.summary(self.columns), whole.summary(self.columns), rtol=1e-9)
+        pd.testing.assert_frame_equal(parts.summary_by_group(self.columns), whole.summary_by_group(self.columns),
+                                      rtol=1e-9)
+
+        values = self.merged_data['Cost of a healthy diet'].dropna().to_numpy()
+        sketch = KLLSketch.with_error(ERROR)
+        for chunk in np.array_split(values, 7):
+            sketch.merge(KLLSketch.with_error(ERROR).update(chunk))
+        ranks = np.searchsorted(np.sort(values), sketch.quantiles([0.25, 0.5, 0.75])) / len(values)
+        np.testing.assert_allclose(ranks, [0.25, 0.5, 0.75], atol=ERROR)
+
+        with self.assertRaises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+        with self.assertRaises(ValueError):
+            sketch_factory('tdigest')
+
+    def test_script_writes_same_layout(self):
+        """
+        Test to verify that the summary statistics script in sketch mode
+        writes the diet cost, affordability and income-group CSVs with the
+        same rows and columns as the exact run.
+        """
+        self.assertIsNone(sketch_requested([]))
+        self.assertEqual(sketch_requested(['--sketch', 'kll', '--sketch-error', '0.05']), ('kll', 0.05))
+
+        script = load_script('summary_statistics_analysis')
+        merged_data = workbook()
+        results_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, results_dir, ignore_errors=True)
+        statistics = script.sketch_summary(merged_data, 'kll', ERROR)
+        script.summary_statistics(merged_data, results_dir, statistics)
+        script.affordability_by_income_group(merged_data, results_dir, statistics)
+
+        for name, exact in [('diet_cost_summary', summary.diet_cost_summary(merged_data)),
+                            ('affordability_summary', summary.affordability_summary(merged_data))]:
+            written = pd.read_csv(os.path.join(results_dir, f"{name}.csv"), index_col=0)
+            self.assertEqual(written.index.tolist(), DESCRIBE_INDEX)
+            self.assertEqual(written.columns.tolist(), exact.columns.tolist())
+        written = pd.read_csv(os.path.join(results_dir, 'affordability_summary_by_income_group.csv'),
+                              header=[0, 1], index_col=0)
+        pd.testing.assert_index_equal(
+            written.columns, summary.affordability_summary_by_income_group(merged_data).columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import copy
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from foodprices import benchmark, summary
+from foodprices.loader import read_workbook
+from foodprices.synthetic import synthetic_data, synthetic_merged_data, synthetic_metadata
+
+
+class TestBenchmarkSuite(unittest.TestCase):
+    """
+    Unit tests for the synthetic dataset generators and the benchmark suite.
+    """
+
+    def setUp(self):
+        """
+        Create a temporary directory for benchmark results.
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_synthetic_sheets_match_workbook_layout(self):
+        """
+        Test to verify that the synthetic sheets have the columns of the real
+        workbook, the requested number of rows, and are reproducible.
+        """
+        main_data, country_metadata = read_workbook('./data/Food_Prices_For_Nutrition.xlsx')
+        data = synthetic_data(5000, seed=3)
+
+        self.assertEqual(list(data.columns), list(main_data.columns))
+        self.assertEqual(list(synthetic_metadata(seed=3).columns), list(country_metadata.columns))
+        self.assertEqual(len(data), 5000)
+        pd.testing.assert_frame_equal(data, synthetic_data(5000, seed=3))
+
+        merged_data = synthetic_merged_data(5000, seed=3)
+        self.assertEqual(set(merged_data['Income Group'].dropna()),
+                         {'High-income', 'Upper-middle-income', 'Lower-middle-income', 'Low-income'})
+        self.assertFalse(summary.diet_cost_summary(merged_data).isna().any().any())
+
+    def test_results_saved_as_json(self):
+        """
+        Test to verify that a small benchmark run times every requested step
+        and saves its results and environment as JSON.
+        """
+        names = ['read_excel', 'merge', 'describe', 'figure_pie_chart']
+        results = benchmark.run_benchmarks(sizes=[200], names=names, repeat=1)
+        path = benchmark.save_results(results, os.path.join(self.temp_dir, 'results.json'))
+        loaded = benchmark.load_results(path)
+
+        self.assertEqual([result['benchmark'] for result in loaded['results']], names)
+        self.assertIn('pandas', loaded['environment'])
+        self.assertTrue(all(result['min'] > 0 for result in loaded['results']))
+
+    def test_regressions_are_flagged(self):
+        """
+        Test to verify that a benchmark that became slower than the threshold
+        is flagged as a regression and the others are not.
+        """
+        baseline = {'environment': {}, 'results': [
+            {'benchmark': 'merge', 'rows': 200, 'min': 1.0},
+            {'benchmark': 'describe', 'rows': 200, 'min': 1.0},
+        ]}
+        current = copy.deepcopy(baseline)
+        current['results'][1]['min'] = 2.0
+
+        comparison = benchmark.compare_results(baseline, current)
+        self.assertEqual(comparison['Regression'].tolist(), [False, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
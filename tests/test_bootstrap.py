@@ -0,0 +1,80 @@
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from foodprices import bootstrap
+from foodprices.bootstrap import bootstrap_group_means, bootstrap_means, permutation_test_groups
+
+
+class TestBootstrap(unittest.TestCase):
+    """
+    Unit tests for the bootstrap confidence intervals and permutation tests.
+    """
+
+    def setUp(self):
+        """
+        Set up mock data with two clearly separated groups and one overlapping group.
+        """
+        rng = np.random.default_rng(1)
+        self.data = pd.DataFrame({
+            'Income Group': ['A'] * 40 + ['B'] * 40 + ['C'] * 40,
+            'Cost of a healthy diet': np.concatenate([
+                rng.normal(3.0, 0.3, 40), rng.normal(4.0, 0.3, 40), rng.normal(3.05, 0.3, 40)
+            ])
+        })
+
+    def test_results_are_reproducible(self):
+        """
+        Test to verify that the same seed gives the same resamples, whether the
+        chunks run in this process or across worker processes.
+        """
+        values = self.data['Cost of a healthy diet'].to_numpy()
+        serial = bootstrap_means(values, n_resamples=2500, seed=7)
+        parallel = bootstrap_means(values, n_resamples=2500, seed=7, processes=2)
+
+        self.assertEqual(len(serial), 2500)
+        np.testing.assert_array_equal(serial, parallel)
+        self.assertFalse(np.array_equal(serial, bootstrap_means(values, n_resamples=2500, seed=8)))
+
+    def test_confidence_intervals_contain_means(self):
+        """
+        Test to verify that each group's confidence interval brackets its mean
+        and has roughly the width expected from the standard error.
+        """
+        intervals = bootstrap_group_means(self.data, n_resamples=4000)
+
+        self.assertEqual(list(intervals.index), ['A', 'B', 'C'])
+        self.assertTrue((intervals['CI Lower'] < intervals['Mean']).all())
+        self.assertTrue((intervals['Mean'] < intervals['CI Upper']).all())
+        expected_error = self.data.groupby('Income Group')['Cost of a healthy diet'].sem()
+        np.testing.assert_allclose(intervals['Std Error'], expected_error, rtol=0.15)
+
+    def test_permutation_test_detects_differences(self):
+        """
+        Test to verify that the permutation test finds the large difference
+        between groups A and B but not the small difference between A and C.
+        """
+        tests = permutation_test_groups(self.data, n_permutations=2000).set_index(['Group 1', 'Group 2'])
+
+        self.assertLess(tests.loc[('A', 'B'), 'P-value'], 0.01)
+        self.assertGreater(tests.loc[('A', 'C'), 'P-value'], 0.05)
+
+    def test_one_pool_per_call(self):
+        """
+        Test to verify that the chunks of every group and every pair of groups
+        run through a single worker pool, with the same results as in-process.
+        """
+        with mock.patch.object(bootstrap, 'ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            intervals = bootstrap_group_means(self.data, n_resamples=2500, processes=2)
+            tests = permutation_test_groups(self.data, n_permutations=2500, processes=2)
+
+        self.assertEqual(pool.call_count, 2)
+        pd.testing.assert_frame_equal(intervals, bootstrap_group_means(self.data, n_resamples=2500))
+        pd.testing.assert_frame_equal(tests, permutation_test_groups(self.data, n_permutations=2500))
+
+
+if __name__ == '__main__':
+    unittest.main()
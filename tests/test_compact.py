@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices import summary
+from foodprices.compact import INDICATOR_COLUMNS, CompactDataset
+from foodprices.fixtures import workbook
+from foodprices.store import upcast
+from foodprices.synthetic import synthetic_merged_data
+
+
+class TestCompactDataset(unittest.TestCase):
+    """
+    Unit tests for the compact in-memory dataset.
+    """
+
+    def setUp(self):
+        """
+        Load the merged data and build its compact dataset.
+        """
+        self.merged_data = workbook()
+        self.compact = CompactDataset.from_merged_data(self.merged_data)
+
+    def test_compact_dtypes(self):
+        """
+        Test to verify that indicators are float32, the country code uint16,
+        the income group and region codes uint8 and the time int16.
+        """
+        self.assertEqual(self.compact.indicators.dtype, np.float32)
+        self.assertEqual(self.compact.indicators.shape, (len(INDICATOR_COLUMNS), len(self.merged_data)))
+        self.assertEqual(self.compact.country_codes.dtype, np.uint16)
+        self.assertEqual(self.compact.income_codes.dtype, np.uint8)
+        self.assertEqual(self.compact.region_codes.dtype, np.uint8)
+        self.assertEqual(self.compact.time.dtype, np.int16)
+
+    def test_frame_view_shares_memory(self):
+        """
+        Test to verify that the pandas view shares the indicator arrays
+        without copying and decodes the names and groups of every row.
+        """
+        frame = self.compact.to_frame()
+
+        for name in INDICATOR_COLUMNS:
+            self.assertTrue(np.shares_memory(frame[name].to_numpy(), self.compact.indicators))
+        self.assertTrue(np.shares_memory(frame['Population'].to_numpy(), self.compact.population))
+        for name in ['Country Name', 'Income Group', 'Region']:
+            np.testing.assert_array_equal(frame[name].astype(object).fillna('').to_numpy(),
+                                          self.merged_data[name].astype(object).fillna('').to_numpy())
+
+    def test_scripts_get_same_statistics(self):
+        """
+        Test to verify that the upcast view gives the summary statistics of
+        the merged frame.
+        """
+        frame = upcast(self.compact.to_frame())
+
+        pd.testing.assert_frame_equal(summary.diet_cost_summary(frame), summary.diet_cost_summary(self.merged_data))
+        by_income_group = summary.healthy_diet_cost_by_income_group(frame)
+        expected = summary.healthy_diet_cost_by_income_group(self.merged_data)
+        self.assertEqual(list(by_income_group.index), list(expected.index))
+        np.testing.assert_array_equal(by_income_group.to_numpy(), expected.to_numpy())
+
+    def test_memory_report(self):
+        """
+        Test to verify that on a large frame the compact dataset takes less
+        than a fifth of the memory of the merged frame.
+        """
+        merged_data = synthetic_merged_data(100000, seed=1)
+        report = CompactDataset.from_merged_data(merged_data).memory_report(merged_data)
+
+        self.assertEqual(report.loc['merged_data', 'Bytes'], merged_data.memory_usage(deep=True).sum())
+        self.assertLess(report.loc['CompactDataset', 'Share of merged_data'], 0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
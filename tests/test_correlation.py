@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from scipy.stats import pearsonr, spearmanr
+
+from foodprices.correlation import correlation_matrix, correlation_table
+
+
+class TestCorrelationEngine(unittest.TestCase):
+    """
+    Unit tests for the vectorised correlation engine.
+    """
+
+    def setUp(self):
+        """
+        Set up a mock dataset with missing values in different rows of different columns.
+        """
+        rng = np.random.default_rng(0)
+        values = rng.normal(size=(50, 4))
+        values[:, 1] += values[:, 0]
+        values[[3, 7], 0] = np.nan
+        values[[5, 11, 19], 2] = np.nan
+        self.data = pd.DataFrame(values, columns=['Cost of a', 'Cost of b', 'Cost of c', 'Percent of the population who cannot afford d'])
+
+    def test_pearson_matches_pairwise_scipy(self):
+        """
+        Test to verify that every Pearson coefficient and p-value matches
+        scipy.stats.pearsonr on the rows where both columns are present.
+        """
+        r, p_values, n = correlation_matrix(self.data)
+
+        for a in self.data.columns:
+            for b in self.data.columns:
+                pair = self.data[[a, b]].dropna()
+                self.assertEqual(n.loc[a, b], len(pair))
+                if a != b:
+                    expected_r, expected_p = pearsonr(pair[a], pair[b])
+                    self.assertAlmostEqual(r.loc[a, b], expected_r, places=10)
+                    self.assertAlmostEqual(p_values.loc[a, b], expected_p, places=10)
+
+    def test_spearman_matches_scipy_without_missing_values(self):
+        """
+        Test to verify that the Spearman matrix matches scipy.stats.spearmanr
+        when there are no missing values.
+        """
+        complete = self.data.dropna()
+        r, p_values, _ = correlation_matrix(complete, method='spearman')
+        expected = spearmanr(complete)
+
+        np.testing.assert_allclose(r.to_numpy(), expected.statistic, atol=1e-10)
+        np.testing.assert_allclose(p_values.to_numpy(), expected.pvalue, atol=1e-10)
+
+    def test_spearman_matches_pairwise_scipy(self):
+        """
+        Test to verify that with missing values every Spearman coefficient
+        and p-value matches scipy.stats.spearmanr on the rows where both
+        columns are present, and the matrix matches DataFrame.corr.
+        """
+        r, p_values, n = correlation_matrix(self.data, method='spearman')
+
+        for a in self.data.columns:
+            for b in self.data.columns:
+                pair = self.data[[a, b]].dropna()
+                self.assertEqual(n.loc[a, b], len(pair))
+                if a != b:
+                    expected = spearmanr(pair[a], pair[b])
+                    self.assertAlmostEqual(r.loc[a, b], expected.statistic, places=10)
+                    self.assertAlmostEqual(p_values.loc[a, b], expected.pvalue, places=10)
+        pd.testing.assert_frame_equal(r, self.data.corr(method='spearman'), atol=1e-12)
+
+    def test_spearman_with_scattered_gaps_and_ties(self):
+        """
+        Test to verify that with gaps scattered over many columns, ties and a
+        column that is present on a single row, the Spearman matrix matches
+        DataFrame.corr when the re-ranked pairs are split into several batches.
+        """
+        rng = np.random.default_rng(1)
+        data = pd.DataFrame(rng.normal(size=(300, 12)).round(1), columns=[f'Cost of {i}' for i in range(12)])
+        data = data.mask(rng.random(data.shape) < 0.1)
+        data.iloc[:, 3] = data.iloc[:, 2].fillna(0.0)
+        data.iloc[1:, 4] = np.nan
+
+        with mock.patch('foodprices.correlation.RANK_BATCH', 3000):
+            r, _, _ = correlation_matrix(data, method='spearman')
+
+        pd.testing.assert_frame_equal(r, data.corr(method='spearman'), atol=1e-12)
+
+    def test_long_table_layout(self):
+        """
+        Test to verify that the long-format table holds one row per ordered pair
+        of distinct columns for each method.
+        """
+        table = correlation_table(self.data)
+        k = len(self.data.columns)
+
+        self.assertEqual(len(table), 2 * k * (k - 1))
+        self.assertEqual(list(table.columns), ['Variable 1', 'Variable 2', 'Method', 'Correlation', 'P-value', 'N'])
+        self.assertFalse((table['Variable 1'] == table['Variable 2']).any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
-import pandas as pd
 import unittest
 
+from foodprices.fixtures import workbook
+
 class TestBoxplotData(unittest.TestCase):
     """
     Unit tests for validating the data and logic used in the boxplot visualisation.
@@ -29,18 +30,8 @@ class TestBoxplotData(unittest.TestCase):
         in the merged dataset. Missing columns will result in a failed test
         with an appropriate error message.
         """
-        # Load the main dataset and metadata
-        main_data = pd.read_excel(self.data_path, sheet_name='Data')
-        country_metadata = pd.read_excel(self.data_path, sheet_name='Country - Metadata')
-
-        # Merge the datasets to include income groups
-        merged_data = pd.merge(
-            main_data,
-            country_metadata,
-            left_on='Country Name',
-            right_on='Table Name',
-            how='left'
-        )
+        # Load the main dataset merged with the metadata to include income groups
+        merged_data = workbook()
 
         # Check if each required column is present in the merged dataset
         for column in self.required_columns:
@@ -52,18 +43,8 @@ class TestBoxplotData(unittest.TestCase):
         - No missing values in 'Income Group' or 'Cost' columns.
         - Data is properly reshaped and contains valid entries for all diet types.
         """
-        # Load the main dataset and metadata
-        main_data = pd.read_excel(self.data_path, sheet_name='Data')
-        country_metadata = pd.read_excel(self.data_path, sheet_name='Country - Metadata')
-
-        # Merge the datasets to include income groups
-        merged_data = pd.merge(
-            main_data,
-            country_metadata,
-            left_on='Country Name',
-            right_on='Table Name',
-            how='left'
-        )
+        # Load the main dataset merged with the metadata to include income groups
+        merged_data = workbook()
 
         # Reshape the data for boxplot creation
         filtered_data = merged_data.melt(
@@ -89,18 +70,8 @@ class TestBoxplotData(unittest.TestCase):
         Test to verify that the cost values in the filtered data fall within a 
         reasonable range (e.g., positive values).
         """
-        # Load the main dataset and metadata
-        main_data = pd.read_excel(self.data_path, sheet_name='Data')
-        country_metadata = pd.read_excel(self.data_path, sheet_name='Country - Metadata')
-
-        # Merge the datasets to include income groups
-        merged_data = pd.merge(
-            main_data,
-            country_metadata,
-            left_on='Country Name',
-            right_on='Table Name',
-            how='left'
-        )
+        # Load the main dataset merged with the metadata to include income groups
+        merged_data = workbook()
 
         # Reshape the data for boxplot creation
         filtered_data = merged_data.melt(
@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices.country_index import load_country_index
+from foodprices.figures import ORDERED_COUNTRIES, affordability_chart_data
+from foodprices.fixtures import workbook, workbook_sheets
+from foodprices.loader import merge_metadata
+
+
+class TestCountryIndex(unittest.TestCase):
+    """
+    Unit tests for the persistent integer country index.
+    """
+
+    def setUp(self):
+        """
+        Build the index in a temporary cache directory and load the merged data.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.cache_dir = tempfile.mkdtemp()
+        self.index = load_country_index(self.data_path, self.cache_dir)
+        self.merged_data = workbook()
+
+    def tearDown(self):
+        """
+        Remove the temporary cache directory.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_aggregates_are_flagged(self):
+        """
+        Test to verify that regional, income-group and world aggregates are
+        flagged and countries are not.
+        """
+        codes = self.index.codes(['WORLD', 'High-income', 'East Asia & Pacific', 'Albania', 'Atlantis'])
+
+        self.assertEqual(codes[-1], -1)
+        np.testing.assert_array_equal(self.index.is_aggregate(codes), [True, True, True, False, False])
+
+    def test_join_matches_left_merge(self):
+        """
+        Test to verify that joining through the index gives the same income
+        groups and regions as the pd.merge on country names.
+        """
+        joined = self.index.join(self.merged_data[['Country Name']])
+
+        for column in ['Income Group', 'Region']:
+            pd.testing.assert_series_equal(joined[column].astype(object), self.merged_data[column].astype(object))
+
+    def test_rows_replace_isin_and_reindex(self):
+        """
+        Test to verify that selecting rows by code gives the same bar chart
+        rows as filtering with isin and reordering with reindex, and that a
+        saved index loads back unchanged.
+        """
+        codes = self.index.codes(self.merged_data['Country Name'])
+        rows = self.index.rows(codes, ORDERED_COUNTRIES)
+        expected = affordability_chart_data(self.merged_data)
+
+        selected = self.merged_data['Percent of the population who cannot afford a healthy diet'].to_numpy()[rows]
+        selected[rows < 0] = np.nan
+        np.testing.assert_array_equal(selected, expected['Healthy Diet'].to_numpy())
+
+        reloaded = load_country_index(self.data_path, self.cache_dir)
+        np.testing.assert_array_equal(reloaded.names, self.index.names)
+        np.testing.assert_array_equal(reloaded.aggregate, self.index.aggregate)
+
+    def test_loader_and_bar_chart_use_index(self):
+        """
+        Test to verify that the metadata merge through the index equals
+        pd.merge on the names, and that the bar chart rows of a two-year
+        frame are those of the later year.
+        """
+        main_data, country_metadata = workbook_sheets()
+        expected = pd.merge(main_data, country_metadata, left_on='Country Name', right_on='Table Name', how='left')
+        pd.testing.assert_frame_equal(merge_metadata(main_data, country_metadata), expected)
+
+        later = self.merged_data.assign(Time=self.merged_data['Time'] + 1)
+        later['Percent of the population who cannot afford a healthy diet'] += 1
+        chart_data = affordability_chart_data(pd.concat([self.merged_data, later], ignore_index=True))
+        pd.testing.assert_frame_equal(chart_data, affordability_chart_data(later))
+        self.assertEqual(list(chart_data.index), ORDERED_COUNTRIES)
+
+
+if __name__ == '__main__':
+    unittest.main()
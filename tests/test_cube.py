@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices.cube import ALL, AggregateCube, load_cube
+from foodprices.fixtures import workbook
+from foodprices.synthetic import synthetic_merged_data
+
+
+class TestAggregateCube(unittest.TestCase):
+    """
+    Unit tests for the materialised aggregate cube.
+    """
+
+    def setUp(self):
+        """
+        Load the merged data and create a temporary cache directory.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.merged_data = workbook()
+        self.countries = self.merged_data[self.merged_data['Income Group'].notna()]
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary cache directory.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_cells_match_describe(self):
+        """
+        Test to verify that the overall cell and the income group slice of the
+        cost of a healthy diet equal pandas' describe() and groupby describe(),
+        and that a food group cell of one region equals its rows' statistics.
+        """
+        cube = AggregateCube.from_merged_data(self.merged_data)
+
+        pd.testing.assert_series_equal(cube.describe(), self.countries['Cost of a healthy diet'].describe(),
+                                       check_names=False)
+        pd.testing.assert_frame_equal(
+            cube.slice('Income Group'),
+            self.countries.groupby('Income Group')['Cost of a healthy diet'].describe(), check_names=False)
+
+        rows = self.countries.loc[self.countries['Region'] == 'South Asia (FPN)', 'Cost of fruits'].dropna()
+        cell = cube.cell(region='South Asia (FPN)', food_group='Fruits')
+        self.assertEqual(cell['count'], len(rows))
+        np.testing.assert_allclose([cell['sum'], cell['sumsq'], cell['min'], cell['max'], cell['std']],
+                                   [rows.sum(), (rows ** 2).sum(), rows.min(), rows.max(), rows.std()])
+
+    def test_rollups_and_unknown_cells(self):
+        """
+        Test to verify that every rollup cell counts the values of the cells
+        it covers, that only countries are counted and that unknown members
+        raise KeyError.
+        """
+        cube = AggregateCube.from_merged_data(synthetic_merged_data(5000, seed=2))
+
+        # Every country has a region in the synthetic data, so each 'All' member is the sum over the others
+        np.testing.assert_array_equal(cube.count[-1, :, :], cube.count[:-1, :, :].sum(axis=0))
+        np.testing.assert_array_equal(cube.count[:, -1, :], cube.count[:, :-1, :].sum(axis=1))
+        np.testing.assert_allclose(cube.sum[-1, -1, :], cube.sum[:-1, :-1, :].sum(axis=(0, 1)))
+        self.assertNotIn('Aggregates', cube.regions)
+        self.assertEqual(cube.income_groups[-1], ALL)
+        with self.assertRaises(KeyError):
+            cube.cell(diet_type='Energy sufficient diet', food_group='Fruits')
+
+    def test_large_cells_within_sketch_error(self):
+        """
+        Test to verify that the quartiles of cells too large to keep exactly
+        stay within the sketch's rank error of the exact quantiles.
+        """
+        merged_data = synthetic_merged_data(20000, seed=4)
+        cube = AggregateCube.from_merged_data(merged_data, k=100)
+
+        values = np.sort(merged_data.loc[merged_data['Income Group'].notna(), 'Cost of a healthy diet'].dropna())
+        self.assertEqual(cube.cell()['count'], len(values))
+        estimates = cube.quantiles([0.25, 0.5, 0.75])
+        ranks = np.searchsorted(values, estimates) / len(values)
+        np.testing.assert_allclose(ranks, [0.25, 0.5, 0.75], atol=0.05)
+
+    def test_built_once_per_workbook(self):
+        """
+        Test to verify that the cube is cached on the workbook's content hash
+        and that the cached cube answers like a fresh one.
+        """
+        cube = load_cube(self.data_path, self.cache_dir)
+        cached = [name for name in os.listdir(self.cache_dir) if name.startswith('aggregate-cube-')]
+        self.assertEqual(len(cached), 1)
+
+        pd.testing.assert_frame_equal(load_cube(self.data_path, self.cache_dir).table(), cube.table())
+
+
+if __name__ == '__main__':
+    unittest.main()
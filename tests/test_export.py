@@ -0,0 +1,156 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from foodprices.export import (EXPORT_COLUMNS, RESULT_TABLES, export_results, long_format, read_export,
+                               result_tables)
+from foodprices.fixtures import workbook
+from foodprices.pipeline import Pipeline
+
+
+def _parquet_available():
+    """
+    Return True when pyarrow is installed.
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class TestExport(unittest.TestCase):
+    """
+    Unit tests for the long-format export of the summary tables.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Compute every summary table of the workbook once.
+        """
+        cls.tables = result_tables(workbook())
+
+    def setUp(self):
+        """
+        Create a temporary results directory.
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def assert_same_export(self, actual, expected):
+        """
+        Assert that two long-format frames hold the same rows, however their missing text is represented.
+        """
+        self.assertEqual(list(actual.columns), EXPORT_COLUMNS)
+        text = EXPORT_COLUMNS[:-1]
+        pd.testing.assert_frame_equal(actual[text].astype(object).fillna(''), expected[text].astype(object).fillna(''))
+        pd.testing.assert_series_equal(actual['value'], expected['value'], check_dtype=False)
+
+    def test_every_value_in_long_format(self):
+        """
+        Test to verify that every table is stacked into one row per value,
+        including the MultiIndex columns of the income group summary.
+        """
+        long = long_format(self.tables)
+
+        self.assertEqual(list(long.columns), EXPORT_COLUMNS)
+        self.assertEqual(list(long['table_name'].unique()), list(RESULT_TABLES))
+        cells = sum(table.shape[0] * (table.shape[1] if table.ndim == 2 else 1) for table in self.tables.values())
+        # The names and the method of the correlation tables become id columns
+        cells -= len(self.tables['correlation_matrix']) * 3
+        cells -= len(self.tables['healthy_diet_cost_income_group_differences']) * 2
+        self.assertEqual(len(long), cells)
+
+        indicator = 'Percent of the population who cannot afford a healthy diet'
+        by_group = self.tables['affordability_summary_by_income_group']
+        row = long[(long['table_name'] == 'affordability_summary_by_income_group')
+                   & (long['group_name'] == 'Low-income') & (long['indicator'] == indicator)
+                   & (long['statistic'] == '75%')]
+        self.assertAlmostEqual(row['value'].item(), by_group.loc['Low-income', (indicator, '75%')])
+
+        row = long[(long['table_name'] == 'diet_cost_summary') & (long['statistic'] == 'mean')
+                   & (long['indicator'] == 'Cost of a healthy diet')]
+        self.assertEqual(row['group_name'].item(), 'All')
+        self.assertAlmostEqual(row['value'].item(),
+                               self.tables['diet_cost_summary'].loc['mean', 'Cost of a healthy diet'])
+
+        with self.assertRaises(ValueError):
+            long_format({'unknown_table': self.tables['diet_cost_summary']})
+
+    def test_sqlite_written_in_one_transaction(self):
+        """
+        Test to verify that the SQLite export holds every row in one indexed
+        table, and that a failed export leaves the previous file untouched.
+        """
+        path = export_results(self.tables, self.temp_dir)
+        self.assertEqual(os.path.basename(path), 'results.sqlite')
+        self.assert_same_export(read_export(path), long_format(self.tables))
+
+        connection = sqlite3.connect(path)
+        try:
+            indexes = connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'").fetchall()
+        finally:
+            connection.close()
+        self.assertEqual(indexes, [('results_by_table',)])
+
+        # A row without a table name fails the NOT NULL constraint after the other rows were inserted
+        broken = long_format(self.tables)
+        broken.loc[len(broken) - 1, 'table_name'] = None
+        with mock.patch('foodprices.export.long_format', return_value=broken):
+            with self.assertRaises(sqlite3.IntegrityError):
+                export_results(self.tables, self.temp_dir)
+        self.assertEqual(os.listdir(self.temp_dir), ['results.sqlite'])
+        self.assertEqual(len(read_export(path)), len(long_format(self.tables)))
+
+    def test_csv_and_parquet_formats(self):
+        """
+        Test to verify that the CSV export round-trips, that the Parquet export
+        is partitioned by table when pyarrow is installed and that unknown
+        formats are rejected.
+        """
+        path = export_results(self.tables, self.temp_dir, 'csv')
+        self.assert_same_export(read_export(path), long_format(self.tables))
+
+        if _parquet_available():
+            path = export_results(self.tables, self.temp_dir, 'parquet')
+            self.assertEqual(len(os.listdir(path)), len(RESULT_TABLES))
+            self.assert_same_export(read_export(path).sort_values(EXPORT_COLUMNS[:-1], ignore_index=True),
+                                    long_format(self.tables).sort_values(EXPORT_COLUMNS[:-1], ignore_index=True))
+        else:
+            with self.assertRaises(ImportError):
+                export_results(self.tables, self.temp_dir, 'parquet')
+
+        with self.assertRaises(ValueError):
+            export_results(self.tables, self.temp_dir, 'xlsx')
+
+    def test_pipeline_export_stage(self):
+        """
+        Test to verify that the pipeline's export stage writes every table of
+        the statistics stages to one file and is skipped when unchanged.
+        """
+        results_dir = os.path.join(self.temp_dir, 'results')
+        state_path = os.path.join(self.temp_dir, 'state.json')
+
+        def pipeline():
+            return Pipeline(results_dir=results_dir, figures_dir=os.path.join(self.temp_dir, 'figures'),
+                            state_path=state_path, export_format='csv')
+
+        self.assertEqual(pipeline().run(only=['export']), {'export': 'ran'})
+        exported = read_export(os.path.join(results_dir, 'results.csv'))
+        self.assertEqual(list(exported['table_name'].unique()), list(RESULT_TABLES))
+        self.assertEqual(pipeline().run(only=['export']), {'export': 'skipped'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import filecmp
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+
+from foodprices.figure_cache import FigureCache, save_affordability_bar_chart, save_boxplot, save_food_group_pie_chart
+from foodprices.figures import FOOD_GROUP_CONTRIBUTIONS, FOOD_GROUPS
+from foodprices.fixtures import workbook
+from foodprices.render import use_headless
+from foodprices.store import ingest, open_store, upcast
+
+
+class TestFigureCache(unittest.TestCase):
+    """
+    Unit tests for the on-disk figure cache.
+    """
+
+    def setUp(self):
+        """
+        Load the dataset and create a cache in a temporary directory.
+        """
+        use_headless()
+        self.merged_data = workbook()
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = FigureCache(os.path.join(self.temp_dir, 'cache'))
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_unchanged_figure_served_from_cache(self):
+        """
+        Test to verify that a figure is rendered once and then copied from
+        the cache, giving an identical file, including the fixed-data pie
+        chart, whose groups and contributions may also be arrays or Series.
+        """
+        first = os.path.join(self.temp_dir, 'first.png')
+        second = os.path.join(self.temp_dir, 'second.png')
+
+        self.assertTrue(save_food_group_pie_chart(first, cache=self.cache))
+        self.assertFalse(save_food_group_pie_chart(second, cache=self.cache))
+        self.assertTrue(filecmp.cmp(first, second, shallow=False))
+        self.assertTrue(save_food_group_pie_chart(first, contributions=[20, 15, 20, 30, 10, 5], cache=self.cache))
+
+        # Arrays and Series are accepted as well as lists
+        self.assertFalse(save_food_group_pie_chart(second, pd.Series(FOOD_GROUPS).to_numpy(),
+                                                   pd.Series(FOOD_GROUP_CONTRIBUTIONS), cache=self.cache))
+
+    def test_only_plotted_data_invalidates(self):
+        """
+        Test to verify that editing a column the boxplot does not show keeps
+        the cached image, while editing a plotted value renders it again.
+        """
+        output_path = os.path.join(self.temp_dir, 'boxplot.png')
+        self.assertTrue(save_boxplot(self.merged_data, output_path, cache=self.cache))
+
+        unrelated = self.merged_data.copy()
+        unrelated['Population'] = 0
+        self.assertFalse(save_boxplot(unrelated, output_path, cache=self.cache))
+
+        plotted = self.merged_data.copy()
+        plotted.loc[0, 'Cost of a healthy diet'] += 1
+        self.assertTrue(save_boxplot(plotted, output_path, cache=self.cache))
+
+    def test_store_and_workbook_share_entries(self):
+        """
+        Test to verify that figures drawn from the float32 columnar store, with
+        or without upcasting, hit the entries rendered from the workbook frame.
+        """
+        store = open_store(ingest('./data/Food_Prices_For_Nutrition.xlsx', os.path.join(self.temp_dir, 'store')))
+        boxplot_path = os.path.join(self.temp_dir, 'boxplot.png')
+        bar_chart_path = os.path.join(self.temp_dir, 'bar_chart.png')
+
+        self.assertTrue(save_boxplot(self.merged_data, boxplot_path, cache=self.cache))
+        self.assertTrue(save_affordability_bar_chart(self.merged_data, bar_chart_path, cache=self.cache))
+        for frame in (store, upcast(store)):
+            self.assertFalse(save_boxplot(frame, boxplot_path, cache=self.cache))
+            self.assertFalse(save_affordability_bar_chart(frame, bar_chart_path, cache=self.cache))
+
+    def test_least_recently_used_evicted(self):
+        """
+        Test to verify that the cache stays within its size bound by evicting
+        the least recently used figures first.
+        """
+        cache = FigureCache(os.path.join(self.temp_dir, 'small'), max_bytes=2500)
+        source = os.path.join(self.temp_dir, 'figure.png')
+        with open(source, 'wb') as handle:
+            handle.write(b'x' * 1000)
+
+        for key in ['a', 'b']:
+            cache.put(key, source)
+            time.sleep(0.01)
+        cache.get('a')
+        time.sleep(0.01)
+        cache.put('c', source)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+
+if __name__ == '__main__':
+    unittest.main()
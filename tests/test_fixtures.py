@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+from foodprices import fixtures
+from foodprices.fixtures import synthetic_merged, synthetic_sheets, workbook
+from foodprices.loader import load_merged_data
+
+
+class TestFixtures(unittest.TestCase):
+    """
+    Unit tests for the shared test datasets.
+    """
+
+    def test_workbook_loaded_once(self):
+        """
+        Test to verify that the workbook is loaded once per process and that
+        every caller gets its own copy.
+        """
+        fixtures._LOADED.clear()
+        with mock.patch('foodprices.loader.load_merged_data', wraps=load_merged_data) as load:
+            first = workbook()
+            second = workbook()
+        self.assertEqual(load.call_count, 1)
+
+        first.loc[0, 'Cost of a healthy diet'] = -1.0
+        self.assertNotEqual(second.loc[0, 'Cost of a healthy diet'], -1.0)
+        self.assertNotEqual(workbook().loc[0, 'Cost of a healthy diet'], -1.0)
+
+    def test_synthetic_datasets(self):
+        """
+        Test to verify that the synthetic sheets and merged frame have the
+        requested size, are reproducible and are copied for each caller.
+        """
+        main_data, country_metadata = synthetic_sheets(500, seed=3)
+        self.assertEqual(len(main_data), 500)
+        self.assertIn('Income Group', country_metadata)
+
+        merged_data = synthetic_merged(500, seed=3)
+        self.assertEqual(len(merged_data), 500)
+        self.assertIsNot(merged_data, synthetic_merged(500, seed=3))
+        self.assertTrue(merged_data.equals(synthetic_merged(500, seed=3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from foodprices.figures import FOOD_GROUP_CONTRIBUTIONS, FOOD_GROUPS
+from foodprices.food_groups import FOOD_GROUP_COLUMNS, average_shares, country_shares, group_shares, load_share_tables
+from foodprices.fixtures import workbook
+
+
+class TestFoodGroups(unittest.TestCase):
+    """
+    Unit tests for the food group decomposition of the cost of a healthy diet.
+    """
+
+    def setUp(self):
+        """
+        Load the merged data and create a temporary cache directory.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.merged_data = workbook()
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary cache directory.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_country_shares_sum_to_100(self):
+        """
+        Test to verify that each complete row of country shares sums to 100%
+        and that rows missing a food group cost have no shares.
+        """
+        shares = country_shares(self.merged_data)
+        complete = self.merged_data[list(FOOD_GROUP_COLUMNS)].notna().all(axis=1).to_numpy()
+
+        np.testing.assert_allclose(shares[complete].sum(axis=1), 100)
+        self.assertTrue(shares[~complete].isna().all().all())
+
+    def test_group_shares_are_population_weighted(self):
+        """
+        Test to verify that the income group shares are the population-weighted
+        means of the country shares, and the plain means without weights or population.
+        """
+        shares = country_shares(self.merged_data).reset_index(drop=True)
+        rows = (self.merged_data['Income Group'] == 'Low-income').to_numpy() & shares.notna().all(axis=1).to_numpy()
+        population = self.merged_data['Population'].to_numpy()[rows]
+
+        weighted = group_shares(self.merged_data)
+        np.testing.assert_allclose(weighted.loc['Low-income'], np.average(shares[rows], axis=0, weights=population))
+        unweighted = group_shares(self.merged_data, weights=None)
+        np.testing.assert_allclose(unweighted.loc['Low-income'], shares[rows].mean())
+
+        no_population = self.merged_data.assign(Population=np.nan)
+        np.testing.assert_allclose(group_shares(no_population), unweighted)
+        self.assertNotIn('Aggregates', group_shares(self.merged_data, by='Region').index)
+
+    def test_average_shares_feed_pie_chart(self):
+        """
+        Test to verify that the pie chart's average shares sum to 100%, are
+        labelled like the published food groups and stay within half a point
+        of the published contributions.
+        """
+        shares = average_shares(self.merged_data)
+
+        self.assertEqual(list(shares.index), FOOD_GROUPS)
+        self.assertAlmostEqual(shares.sum(), 100.0)
+        np.testing.assert_allclose(shares.to_numpy(), FOOD_GROUP_CONTRIBUTIONS, atol=0.5)
+
+    def test_share_tables_cached(self):
+        """
+        Test to verify that the share tables are cached on the workbook hash
+        and read back unchanged.
+        """
+        tables = load_share_tables(self.data_path, self.cache_dir)
+        self.assertEqual(len([name for name in os.listdir(self.cache_dir) if name.startswith('food-group-shares-')]), 1)
+
+        cached = load_share_tables(self.data_path, self.cache_dir)
+        for name, table in tables.items():
+            self.assertTrue(table.equals(cached[name]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices import summary
+from foodprices.incremental import ColumnStats, IncrementalStatistics, update_summary_files
+from foodprices.fixtures import workbook
+from foodprices.sketch import KLLSketch
+from foodprices.synthetic import synthetic_merged_data
+
+
+class TestIncrementalStatistics(unittest.TestCase):
+    """
+    Unit tests for the incremental summary statistics mode.
+    """
+
+    def setUp(self):
+        """
+        Load the dataset and create a temporary directory for state and outputs.
+        """
+        self.merged_data = workbook()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def assert_matches_describe(self, statistics, merged_data):
+        """
+        Assert that the incremental tables match a full recomputation with describe().
+        """
+        pd.testing.assert_frame_equal(
+            statistics.summary(summary.DIET_COST_COLUMNS), summary.diet_cost_summary(merged_data))
+        pd.testing.assert_frame_equal(
+            statistics.summary(summary.COST_RATIO_COLUMNS), summary.cost_ratio_summary(merged_data))
+        pd.testing.assert_frame_equal(
+            statistics.summary_by_group(summary.AFFORDABILITY_COLUMNS),
+            summary.affordability_summary_by_income_group(merged_data), check_names=False)
+
+    def assert_within_sketch_error(self, statistics, merged_data):
+        """
+        Assert that the incremental tables have the exact count, mean, standard
+        deviation and extremes of describe(), and quartiles within the rank
+        error of the sketches.
+        """
+        merged_data = summary.add_cost_ratios(merged_data)
+        for columns in [summary.DIET_COST_COLUMNS, summary.COST_RATIO_COLUMNS]:
+            table = statistics.summary(columns)
+            expected = merged_data[columns].describe()
+            moments = ['count', 'mean', 'std', 'min', 'max']
+            np.testing.assert_allclose(table.loc[moments].to_numpy(), expected.loc[moments].to_numpy())
+            for column in columns:
+                values = np.sort(merged_data[column].dropna().to_numpy())
+                for q, statistic in zip([0.25, 0.5, 0.75], ['25%', '50%', '75%']):
+                    low = np.searchsorted(values, table.loc[statistic, column], side='left') / (len(values) - 1)
+                    high = (np.searchsorted(values, table.loc[statistic, column], side='right') - 1) / (len(values) - 1)
+                    self.assertLessEqual(max(low - q, q - high, 0), 1.7 / 200, (column, statistic))
+
+    def test_column_stats_merge(self):
+        """
+        Test to verify that merging the statistics of two halves of a column
+        gives the same count, mean, standard deviation and extremes as the whole.
+        """
+        values = np.random.default_rng(0).normal(3, 1, 101)
+        merged = ColumnStats().update(values[:40]).merge(ColumnStats().update(values[40:]))
+        expected = pd.Series(values).describe()
+
+        np.testing.assert_allclose(merged.describe().to_numpy(), expected.to_numpy())
+
+    def test_sketch_rank_error(self):
+        """
+        Test to verify that merged KLL sketches stay small and estimate
+        quantiles of a large skewed sample within the expected rank error.
+        """
+        values = np.random.default_rng(1).lognormal(size=200000)
+        sketch = KLLSketch().update(values[:100000]).merge(KLLSketch(seed=1).update(values[100000:]))
+        ordered = np.sort(values)
+
+        self.assertEqual(len(sketch), len(values))
+        self.assertLess(sum(len(level) for level in sketch.levels), 2000)
+        for q, estimate in zip([0.1, 0.25, 0.5, 0.75, 0.9], sketch.quantiles([0.1, 0.25, 0.5, 0.75, 0.9])):
+            rank = np.searchsorted(ordered, estimate) / len(values)
+            self.assertLess(abs(rank - q), 0.02)
+
+    def test_first_update_matches_describe(self):
+        """
+        Test to verify that building the statistics from scratch reproduces the
+        describe() tables of the summary statistics script.
+        """
+        statistics = IncrementalStatistics()
+        counts = statistics.update(self.merged_data)
+
+        self.assertEqual(counts, {'added': len(self.merged_data), 'changed': 0, 'removed': 0})
+        self.assert_matches_describe(statistics, self.merged_data)
+
+    def test_revised_rows_update_incrementally(self):
+        """
+        Test to verify that after rows are added, revised and removed, the
+        updated statistics match a full recomputation on the new data.
+        """
+        original = self.merged_data.iloc[:120]
+        statistics = IncrementalStatistics()
+        statistics.update(original)
+
+        revised = self.merged_data.iloc[5:].copy()
+        revised.loc[revised.index[:10], 'Cost of a healthy diet'] += 0.5
+        revised.loc[revised.index[10], 'Income Group'] = 'Low-income'
+        counts = statistics.update(revised)
+
+        self.assertEqual(counts, {'added': 37, 'changed': 11, 'removed': 5})
+        self.assert_matches_describe(statistics, revised)
+
+    def test_multi_year_rows_and_changed_rows_only(self):
+        """
+        Test to verify that every (country, year) row is kept over several
+        years, and that updating with only the revised and new rows gives the
+        describe() tables of the full revised data, with quartiles within the
+        sketch's rank error once a column outgrows its sketch.
+        """
+        merged_data = synthetic_merged_data(2000)
+        statistics = IncrementalStatistics()
+        statistics.update(merged_data.iloc[:1500])
+
+        revised = merged_data.copy()
+        revised.loc[revised.index[100:160], 'Cost of a healthy diet'] *= 1.1
+        revised.loc[revised.index[200:203], 'Percent of the population who cannot afford a healthy diet'] = np.nan
+        changed_rows = revised.iloc[np.r_[100:160, 200:203, 1500:2000]]
+        counts = statistics.update(changed_rows, complete=False)
+
+        self.assertEqual(counts, {'added': 500, 'changed': 63, 'removed': 0})
+        self.assertEqual(len(statistics.snapshot), len(merged_data))
+        self.assert_within_sketch_error(statistics, revised)
+
+    def test_state_persists_and_files_are_written(self):
+        """
+        Test to verify that the statistics are saved between runs and that the
+        summary CSVs are written in the same layout as the script's outputs.
+        """
+        state_path = os.path.join(self.temp_dir, 'state.pkl')
+        update_summary_files(self.merged_data.iloc[:100], self.temp_dir, state_path)
+        counts = update_summary_files(self.merged_data, self.temp_dir, state_path)
+        self.assertEqual(counts, {'added': 57, 'changed': 0, 'removed': 0})
+
+        for filename in ['diet_cost_summary.csv', 'cost_ratios_summary.csv']:
+            expected = pd.read_csv(os.path.join('./summary_stats_results', filename), index_col=0)
+            actual = pd.read_csv(os.path.join(self.temp_dir, filename), index_col=0)
+            pd.testing.assert_frame_equal(actual, expected)
+
+        expected = pd.read_csv('./summary_stats_results/affordability_summary_by_income_group.csv', header=[0, 1], index_col=0)
+        actual = pd.read_csv(os.path.join(self.temp_dir, 'affordability_summary_by_income_group.csv'), header=[0, 1], index_col=0)
+        pd.testing.assert_frame_equal(actual, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
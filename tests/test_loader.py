@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from foodprices import loader
+
+
+class TestLoader(unittest.TestCase):
+    """
+    Unit tests for the shared cached data-loading layer.
+    """
+
+    def setUp(self):
+        """
+        Set up the dataset path and a temporary cache directory for each test.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary cache directory.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_cached_frame_matches_fresh_merge(self):
+        """
+        Test to verify that the merged frame is written to the cache on the first
+        load and that the cached copy is identical to a fresh parse and merge of
+        the workbook.
+        """
+        fresh = loader.load_merged_data(self.data_path, use_cache=False)
+        first = loader.load_merged_data(self.data_path, cache_dir=self.cache_dir)
+
+        # Exactly one cache entry should have been written, named after the content hash
+        entries = os.listdir(self.cache_dir)
+        self.assertEqual(len(entries), 1)
+        self.assertIn(loader.cache_key(self.data_path), entries[0])
+
+        second = loader.load_merged_data(self.data_path, cache_dir=self.cache_dir)
+        pd.testing.assert_frame_equal(fresh, first)
+        pd.testing.assert_frame_equal(fresh, second)
+
+    def test_cache_key_follows_file_content(self):
+        """
+        Test to verify that the cache key changes when the bytes of the workbook
+        change, so a revised workbook is never served from a stale cache entry.
+        """
+        copy_path = os.path.join(self.cache_dir, 'copy.xlsx')
+        shutil.copyfile(self.data_path, copy_path)
+        self.assertEqual(loader.cache_key(copy_path), loader.cache_key(self.data_path))
+
+        with open(copy_path, 'ab') as handle:
+            handle.write(b'\0')
+        self.assertNotEqual(loader.cache_key(copy_path), loader.cache_key(self.data_path))
+
+    def test_merge_keeps_every_data_row(self):
+        """
+        Test to verify that the metadata merge is a left merge that keeps one
+        row per row of the 'Data' sheet.
+        """
+        main_data, country_metadata = loader.read_workbook(self.data_path)
+        merged_data = loader.merge_metadata(main_data, country_metadata)
+
+        self.assertEqual(len(merged_data), len(main_data))
+        self.assertIn('Income Group', merged_data.columns)
+        self.assertIn('Region', merged_data.columns)
+
+
+if __name__ == '__main__':
+    unittest.main()
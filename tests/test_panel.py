@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+
+from foodprices.figures import affordability_title, plot_cost_affordability_density, plot_cost_by_income_boxplot
+from foodprices.panel import Panel
+from foodprices.render import use_headless
+from foodprices.synthetic import synthetic_merged_data
+
+
+class TestPanel(unittest.TestCase):
+    """
+    Unit tests for the multi-vintage panel and its year-over-year changes.
+    """
+
+    def setUp(self):
+        """
+        Build two vintages of three years each that overlap in 2023.
+        """
+        merged_data = synthetic_merged_data(1000, seed=1)
+        self.older = merged_data[merged_data['Time'] <= 2023]
+        self.newer = merged_data[merged_data['Time'] >= 2023].copy()
+        self.newer['Cost of a healthy diet'] += 1.0
+        self.panel = Panel([self.older, self.newer])
+
+    def test_vintages_aligned_on_country_index(self):
+        """
+        Test to verify that the vintages are loaded only on first use, that
+        each country keeps one code across years and that the newer vintage
+        wins where both report a year.
+        """
+        panel = Panel([self.older, self.newer])
+        self.assertIsNone(panel._data)
+
+        data = panel.data
+        self.assertEqual(panel.years(), [2021, 2022, 2023, 2024, 2025])
+        self.assertFalse(data.index.duplicated().any())
+        self.assertTrue((data.groupby(level='Country Code')['Country Name'].nunique() == 1).all())
+
+        country = self.newer['Country Name'].iloc[0]
+        code = panel.index.codes([country])[0]
+        expected = self.newer.set_index(['Country Name', 'Time']).loc[(country, 2023), 'Cost of a healthy diet']
+        self.assertEqual(data.loc[(code, 2023), 'Cost of a healthy diet'], expected)
+
+    def test_changes_match_python_loop(self):
+        """
+        Test to verify that the vectorised changes and growth rates equal a
+        loop over the consecutive years of each country.
+        """
+        column = 'Percent of the population who cannot afford a healthy diet'
+        changes = self.panel.changes([column])
+
+        for (code, year), row in self.panel.data.iloc[:60].iterrows():
+            if year == 2021:
+                self.assertTrue(np.isnan(changes.loc[(code, year), ('Change', column)]))
+                continue
+            before, after = self.panel.data.loc[(code, year - 1), column], row[column]
+            np.testing.assert_allclose(changes.loc[(code, year), ('Change', column)], after - before)
+            growth = after / before - 1 if before > 0 else np.nan
+            np.testing.assert_allclose(changes.loc[(code, year), ('CAGR', column)], growth)
+
+        between = self.panel.change_between(2021, 2025, [column])
+        first = self.panel.data.xs(2021, level='Time')[column]
+        last = self.panel.data.xs(2025, level='Time')[column]
+        np.testing.assert_allclose(between[('CAGR', column)], (last / first) ** 0.25 - 1)
+
+    def test_year_slices_feed_figures(self):
+        """
+        Test to verify that one year of the panel has the merged data layout
+        and that the bar chart title and the cost axes of the boxplot and
+        density scatter name that year.
+        """
+        import matplotlib.pyplot as plt
+
+        year = self.panel.year(2024)
+
+        self.assertTrue({'Country Name', 'Income Group', 'Time'} <= set(year.columns))
+        self.assertEqual(affordability_title(year),
+                         'Share of Population Unable to Afford Different Diet Standards, 2024')
+        use_headless()
+        self.assertEqual(plot_cost_by_income_boxplot(year).axes[0].get_ylabel(), 'Cost (USD, 2024)')
+        self.assertEqual(plot_cost_affordability_density(year).axes[0].get_xlabel(),
+                         'Cost of a Healthy Diet (USD, 2024)')
+        plt.close('all')
+        by_group = self.panel.changes_by_income_group()
+        self.assertEqual(set(by_group.index.get_level_values('Income Group')),
+                         set(self.panel.data['Income Group'].dropna().astype(object)))
+
+
+if __name__ == '__main__':
+    unittest.main()
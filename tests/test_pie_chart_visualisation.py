@@ -1,7 +1,8 @@
-import pandas as pd
 import os
 import unittest
 
+from foodprices.fixtures import workbook
+
 class TestPieChart(unittest.TestCase):
     """
     Unit tests for the pie chart visualisation of food group contributions to 
@@ -25,7 +26,7 @@ class TestPieChart(unittest.TestCase):
         percentage adds up to 100%, indicating a valid pie chart representation.
         """
         # Load the dataset
-        df = pd.read_excel(self.data_path, sheet_name='Data')
+        df = workbook()
 
         # Extract relevant columns for food group costs
         pie_chart_data = df[['Cost of fruits', 'Cost of starchy staples', 
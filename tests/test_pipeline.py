@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from foodprices.pipeline import Pipeline, Stage, topological_order
+
+
+class TestPipeline(unittest.TestCase):
+    """
+    Unit tests for the single-pass pipeline runner.
+    """
+
+    def setUp(self):
+        """
+        Set up temporary output directories and pipeline state for each test.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.temp_dir = tempfile.mkdtemp()
+        self.results_dir = os.path.join(self.temp_dir, 'results')
+        self.figures_dir = os.path.join(self.temp_dir, 'figures')
+        self.state_path = os.path.join(self.temp_dir, 'state.json')
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_pipeline(self, stages=None):
+        """
+        Return a pipeline writing into the temporary directories.
+        """
+        return Pipeline(self.data_path, self.results_dir, self.figures_dir, self.state_path, stages=stages)
+
+    def test_summary_outputs_match_scripts(self):
+        """
+        Test to verify that the pipeline writes the same summary CSVs as the
+        summary statistics script saved in summary_stats_results/.
+        """
+        self.make_pipeline().run(only=['summary_statistics', 'income_group_aggregates'])
+
+        for filename in ['diet_cost_summary.csv', 'affordability_summary.csv', 'cost_ratios_summary.csv',
+                         'healthy_diet_cost_by_income_group.csv']:
+            expected = pd.read_csv(os.path.join('./summary_stats_results', filename), index_col=0)
+            actual = pd.read_csv(os.path.join(self.results_dir, filename), index_col=0)
+            pd.testing.assert_frame_equal(actual, expected)
+
+    def test_unchanged_stages_are_skipped(self):
+        """
+        Test to verify that a second run skips every stage whose inputs and code
+        are unchanged, that force=True reruns them, and that a stage whose
+        output was deleted runs again.
+        """
+        pipeline = self.make_pipeline()
+        first = pipeline.run(only=['summary_statistics', 'pie_chart'])
+        self.assertEqual(first, {'summary_statistics': 'ran', 'pie_chart': 'ran'})
+        self.assertTrue(os.path.exists(os.path.join(self.figures_dir, 'food_group_pie_chart.png')))
+
+        second = self.make_pipeline().run(only=['summary_statistics', 'pie_chart'])
+        self.assertEqual(second, {'summary_statistics': 'skipped', 'pie_chart': 'skipped'})
+
+        os.remove(os.path.join(self.results_dir, 'diet_cost_summary.csv'))
+        third = self.make_pipeline().run(only=['summary_statistics', 'pie_chart'])
+        self.assertEqual(third, {'summary_statistics': 'ran', 'pie_chart': 'skipped'})
+
+        forced = self.make_pipeline().run(only=['pie_chart'], force=True)
+        self.assertEqual(forced, {'pie_chart': 'ran'})
+
+    def test_shared_frame_is_loaded_once(self):
+        """
+        Test to verify that every stage receives the same in-memory frame from
+        a single run of the load stage.
+        """
+        calls = []
+        received = []
+
+        def load(pipeline):
+            calls.append(1)
+            return object()
+
+        def consume(pipeline, frame):
+            received.append(frame)
+            with open(pipeline.output_path('results', f"out{len(received)}.txt"), 'w') as handle:
+                handle.write('done')
+
+        stages = [
+            Stage('load', load),
+            Stage('first', consume, deps=['load'], outputs=[('results', 'out1.txt')]),
+            Stage('second', consume, deps=['load'], outputs=[('results', 'out2.txt')]),
+        ]
+        self.make_pipeline(stages).run()
+
+        self.assertEqual(len(calls), 1)
+        self.assertIs(received[0], received[1])
+
+    def test_topological_order_rejects_cycles(self):
+        """
+        Test to verify that stages are ordered after their dependencies and
+        that dependency cycles are reported.
+        """
+        def noop(pipeline, *args):
+            return None
+
+        order = topological_order([Stage('b', noop, deps=['a']), Stage('a', noop)])
+        self.assertEqual(order, ['a', 'b'])
+
+        with self.assertRaises(ValueError):
+            topological_order([Stage('a', noop, deps=['b']), Stage('b', noop, deps=['a'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices.figure_cache import FigureCache, save_boxplot
+from foodprices.figures import (INCOME_ORDER, plot_affordability_bar_chart, plot_cost_affordability_density,
+                                plot_cost_by_income_boxplot)
+from foodprices.fixtures import synthetic_merged, workbook
+from foodprices.preaggregate import MAX_FLIERS, density_grid, grouped_box_stats, use_aggregated
+from foodprices.render import use_headless
+
+
+class TestPreaggregate(unittest.TestCase):
+    """
+    Unit tests for drawing figures from pre-aggregated data.
+    """
+
+    def setUp(self):
+        """
+        Select the headless backend and create a temporary directory.
+        """
+        use_headless()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Close every figure and remove the temporary directory.
+        """
+        import matplotlib.pyplot as plt
+
+        plt.close('all')
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_box_stats_match_matplotlib(self):
+        """
+        Test to verify that the box statistics of every group equal those of
+        matplotlib.cbook.boxplot_stats, and that thinned outliers keep the
+        most extreme values.
+        """
+        from matplotlib import cbook
+
+        rng = np.random.default_rng(0)
+        values = np.concatenate([rng.lognormal(size=3000), [np.nan] * 10])
+        codes = rng.integers(-1, 3, size=len(values))
+
+        stats = grouped_box_stats(values, codes, ['a', 'b', 'c'], max_fliers=len(values))
+        for code, box in enumerate(stats):
+            group = values[(codes == code) & np.isfinite(values)]
+            expected = cbook.boxplot_stats(group)[0]
+            for name in ['q1', 'med', 'q3', 'whislo', 'whishi', 'mean']:
+                self.assertAlmostEqual(box[name], expected[name], places=12)
+            np.testing.assert_allclose(box['fliers'], np.sort(expected['fliers']))
+
+        heavy = rng.standard_cauchy(100000)
+        thinned = grouped_box_stats(heavy, np.zeros(len(heavy), dtype=int), ['a'])[0]['fliers']
+        self.assertEqual(len(thinned), MAX_FLIERS)
+        self.assertEqual((thinned[0], thinned[-1]), (heavy.min(), heavy.max()))
+
+    def test_density_grid_counts_every_point(self):
+        """
+        Test to verify that the density grid counts every finite pair once and
+        that the density scatter is drawn as a single mesh.
+        """
+        merged_data = synthetic_merged(5000, seed=1)
+        x = merged_data['Cost of a healthy diet'].to_numpy()
+        y = merged_data['Percent of the population who cannot afford a healthy diet'].to_numpy()
+
+        counts, x_edges, y_edges = density_grid(x, y, bins=20)
+        self.assertEqual(counts.shape, (20, 20))
+        self.assertEqual(counts.sum(), (np.isfinite(x) & np.isfinite(y)).sum())
+
+        ax = plot_cost_affordability_density(merged_data).axes[0]
+        self.assertEqual(len(ax.collections), 1)
+
+    def test_artists_independent_of_rows(self):
+        """
+        Test to verify that the pre-aggregated boxplot draws the same number
+        of artists for ten times the rows, with the income groups in order,
+        and that the bar chart draws its bars and labels as one collection
+        per diet type instead of one artist per bar.
+        """
+        def artists(figure):
+            ax = figure.axes[0]
+            return len(ax.lines) + len(ax.patches) + len(ax.collections)
+
+        small = plot_cost_by_income_boxplot(synthetic_merged(5000, seed=2), aggregated=True)
+        large = plot_cost_by_income_boxplot(synthetic_merged(50000, seed=2), aggregated=True)
+        self.assertEqual(artists(small), artists(large))
+        self.assertEqual(len(small.axes[0].get_xticklabels()), len(INCOME_ORDER))
+
+        figure = plot_affordability_bar_chart(workbook(), aggregated=True)
+        for ax in figure.axes:
+            self.assertEqual(len(ax.patches), 0)
+            self.assertEqual(len(ax.texts), 0)
+            self.assertEqual(len(ax.collections), 2)
+
+    def test_mode_chosen_by_size_and_cached_apart(self):
+        """
+        Test to verify that the mode switches on at the threshold unless
+        forced, and that both modes of a figure are cached separately.
+        """
+        self.assertFalse(use_aggregated(10, 100))
+        self.assertTrue(use_aggregated(100, 100))
+        self.assertTrue(use_aggregated(10, 100, aggregated=True))
+
+        cache = FigureCache(os.path.join(self.temp_dir, 'cache'))
+        merged_data = workbook()
+        output_path = os.path.join(self.temp_dir, 'boxplot.png')
+        self.assertTrue(save_boxplot(merged_data, output_path, cache=cache))
+        self.assertTrue(save_boxplot(merged_data, output_path, cache=cache, aggregated=True))
+        self.assertFalse(save_boxplot(merged_data, output_path, cache=cache, aggregated=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import pstats
+import shutil
+import tempfile
+import time
+import unittest
+
+from foodprices.profiling import Tracer
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Unit tests for the step instrumentation layer.
+    """
+
+    def setUp(self):
+        """
+        Create a tracer that writes cProfile dumps to a temporary directory.
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.tracer = Tracer(profile_dir=os.path.join(self.temp_dir, 'profiles'))
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_step_measurements(self):
+        """
+        Test to verify that a step records its wall time, CPU time, peak
+        memory and row count, and that nested steps record their depth.
+        """
+        with self.tracer.step('Step 1: Load') as span:
+            span.rows = 157
+            with self.tracer.step('Step 1a: Parse'):
+                time.sleep(0.05)
+
+        summary = self.tracer.summary()
+        self.assertEqual(summary['name'].tolist(), ['Step 1: Load', 'Step 1a: Parse'])
+        self.assertEqual(summary['depth'].tolist(), [0, 1])
+        self.assertEqual(summary['rows'].iloc[0], 157)
+        self.assertGreaterEqual(summary['wall_s'].iloc[0], summary['wall_s'].iloc[1])
+        self.assertGreaterEqual(summary['wall_s'].iloc[1], 0.05)
+        self.assertLess(summary['cpu_s'].iloc[1], 0.05)
+
+    def test_errors_are_recorded(self):
+        """
+        Test to verify that an exception inside a step is recorded on the
+        step and still raised.
+        """
+        with self.assertRaises(KeyError):
+            with self.tracer.step('Step 2: Merge'):
+                raise KeyError('Table Name')
+
+        self.assertEqual(self.tracer.spans[0].error, "KeyError: 'Table Name'")
+
+    def test_chrome_trace_and_profiles(self):
+        """
+        Test to verify that the steps are written as complete Chrome trace
+        events and that each top-level step gets a readable cProfile dump.
+        """
+        for name in ['Step 1: Load', 'Step 2: Statistics']:
+            with self.tracer.step(name):
+                sum(range(10000))
+
+        trace = self.tracer.chrome_trace()
+        self.assertEqual([event['ph'] for event in trace['traceEvents']], ['X', 'X'])
+        self.assertTrue(all(event['dur'] > 0 for event in trace['traceEvents']))
+
+        profiles = sorted(os.listdir(os.path.join(self.temp_dir, 'profiles')))
+        self.assertEqual(profiles, ['000_step_1_load.prof', '001_step_2_statistics.prof'])
+        pstats.Stats(os.path.join(self.temp_dir, 'profiles', profiles[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
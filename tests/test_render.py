@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import matplotlib
+
+from foodprices.render import headless_requested, render_variants, use_headless
+from foodprices.store import load_store, upcast
+
+
+class TestRender(unittest.TestCase):
+    """
+    Unit tests for headless and parallel figure rendering.
+    """
+
+    def setUp(self):
+        """
+        Load the dataset and create a temporary output directory.
+        """
+        self.merged_data = upcast(load_store('./data/Food_Prices_For_Nutrition.xlsx'))
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary output directory.
+        """
+        shutil.rmtree(self.output_dir, ignore_errors=True)
+
+    def test_headless_mode(self):
+        """
+        Test to verify that headless mode is requested by the --headless flag and
+        that it switches matplotlib to the non-interactive Agg backend.
+        """
+        self.assertTrue(headless_requested(['--headless']))
+        use_headless()
+        self.assertEqual(matplotlib.get_backend().lower(), 'agg')
+
+    def test_variants_rendered_in_process_pool(self):
+        """
+        Test to verify that one figure per income group is rendered and saved
+        when the variants are spread over worker processes.
+        """
+        paths = render_variants(self.merged_data, ['boxplot'], 'Income Group', self.output_dir, processes=2)
+
+        self.assertEqual(len(paths), self.merged_data['Income Group'].nunique())
+        for path in paths:
+            self.assertTrue(os.path.getsize(path) > 0, f"Figure not saved at {path}")
+
+    def test_aggregate_rows_are_skipped(self):
+        """
+        Test to verify that no variant is rendered for the 'Aggregates' region.
+        """
+        paths = render_variants(self.merged_data, ['affordability_bar_chart'], 'Region', self.output_dir, processes=1)
+
+        self.assertFalse(any('aggregates' in os.path.basename(path) for path in paths))
+        self.assertEqual(len(paths), len(set(self.merged_data['Region'].dropna()) - {'Aggregates'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
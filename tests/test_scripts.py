@@ -0,0 +1,86 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from foodprices.figure_cache import FigureCache
+from foodprices.fixtures import load_script, synthetic_merged
+from foodprices.food_groups import share_tables
+from foodprices.render import use_headless
+
+
+class TestScripts(unittest.TestCase):
+    """
+    Unit tests running the steps of the analysis scripts on an in-memory frame.
+    """
+
+    def setUp(self):
+        """
+        Create a synthetic merged frame, a temporary output directory and a figure cache.
+        """
+        use_headless()
+        self.merged_data = synthetic_merged(2000, seed=1)
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = FigureCache(os.path.join(self.temp_dir, 'cache'))
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def output(self, name):
+        """
+        Return the path of `name` in the temporary directory.
+        """
+        return os.path.join(self.temp_dir, name)
+
+    def test_analysis_runs_without_workbook(self):
+        """
+        Test to verify that every step of the summary statistics script runs
+        on a given frame and saves its tables, without reading the workbook.
+        """
+        script = load_script('summary_statistics_analysis')
+        printed = io.StringIO()
+        with mock.patch('foodprices.loader.read_workbook', side_effect=AssertionError('workbook read')), \
+                contextlib.redirect_stdout(printed):
+            script.run_analysis(self.merged_data, self.temp_dir)
+
+        self.assertNotIn('Error calculating', printed.getvalue())
+        for name in ['diet_cost_summary.csv', 'affordability_summary.csv', 'cost_ratios_summary.csv',
+                     'healthy_diet_cost_by_income_group.csv', 'affordability_summary_by_income_group.csv',
+                     'results.sqlite']:
+            self.assertTrue(os.path.exists(self.output(name)), name)
+
+    def test_figures_run_without_workbook(self):
+        """
+        Test to verify that the figure scripts save their figures and tables
+        for a given frame without reading the workbook.
+        """
+        boxplot = load_script('create_cost_by_income_boxplot')
+        bar_chart = load_script('create_affordability_bar_chart')
+        pie_chart = load_script('create_pie_chart_visualisation')
+        share_grid = load_script('create_food_group_share_grid')
+        sensitivity = load_script('create_affordability_sensitivity_chart')
+
+        with mock.patch('foodprices.loader.read_workbook', side_effect=AssertionError('workbook read')), \
+                contextlib.redirect_stdout(io.StringIO()):
+            boxplot.create_boxplot(self.merged_data, self.output('boxplot.png'), cache=self.cache)
+            bar_chart.create_bar_chart(self.merged_data, self.output('bar_chart.png'), cache=self.cache)
+            pie_chart.create_pie_chart(*pie_chart.food_group_shares(self.merged_data), self.output('pie_chart.png'),
+                                       cache=self.cache)
+            share_grid.create_share_grids(share_tables(self.merged_data), self.temp_dir, self.temp_dir,
+                                          cache=self.cache)
+            sensitivity.create_sensitivity_chart(self.merged_data, self.temp_dir, self.output('sensitivity.png'))
+
+        for name in ['boxplot.png', 'bar_chart.png', 'pie_chart.png', 'food_group_shares_by_region.png',
+                     'food_group_shares_by_income_group.csv', 'affordability_sensitivity_by_income_group.csv',
+                     'sensitivity.png']:
+            self.assertTrue(os.path.exists(self.output(name)), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
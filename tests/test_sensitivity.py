@@ -0,0 +1,76 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from foodprices.fixtures import workbook
+from foodprices.sensitivity import (BASELINE_SHARE, DIETS, affordability_sweep, fit_income_distribution,
+                                    sweep_by_income_group)
+
+
+class TestSensitivity(unittest.TestCase):
+    """
+    Unit tests for the affordability threshold sweep.
+    """
+
+    def setUp(self):
+        """
+        Build countries with known lognormal incomes and load the merged data.
+        """
+        self.mu = np.array([1.0, 2.0, 3.0])
+        self.sigma = np.array([0.5, 1.0, 1.5])
+        costs = np.array([[1.0, 2.5, 3.5], [0.8, 2.0, 3.0], [1.2, 3.0, 4.5]])
+        percents = 100 * ndtr((np.log(costs / BASELINE_SHARE) - self.mu[:, None]) / self.sigma[:, None])
+
+        self.synthetic = pd.DataFrame({'Country Name': ['A', 'B', 'C'], 'Income Group': ['Low-income'] * 2 + [np.nan]})
+        for i, (cost, percent) in enumerate(DIETS.values()):
+            self.synthetic[cost] = costs[:, i]
+            self.synthetic[percent] = percents[:, i]
+        self.merged_data = workbook()
+
+    def test_fit_recovers_income_distribution(self):
+        """
+        Test to verify that the fit recovers the lognormal parameters that
+        generated the headcounts, and that too few diets leave them missing.
+        """
+        fit = fit_income_distribution(self.synthetic)
+        np.testing.assert_allclose(fit['mu'], self.mu)
+        np.testing.assert_allclose(fit['sigma'], self.sigma)
+
+        partial = self.synthetic.copy()
+        partial.loc[0, ['Cost of an energy sufficient diet', 'Cost of a healthy diet']] = np.nan
+        self.assertTrue(np.isnan(fit_income_distribution(partial).loc[0, 'mu']))
+
+    def test_sweep_broadcasts_over_countries_and_thresholds(self):
+        """
+        Test to verify that the sweep returns one row per country and one
+        column per threshold, falls as the share of income rises, and
+        reproduces the workbook headcounts at the workbook threshold.
+        """
+        sweep = affordability_sweep(self.merged_data, shares=[0.3, BASELINE_SHARE, 0.8])
+
+        self.assertEqual(sweep.shape, (len(self.merged_data), 3))
+        self.assertTrue((sweep.diff(axis=1).iloc[:, 1:] <= 0).all().all())
+        baseline = self.merged_data['Percent of the population who cannot afford a healthy diet'].to_numpy()
+        self.assertLess(np.nanmean(np.abs(sweep[BASELINE_SHARE].to_numpy() - baseline)), 1.0)
+
+        # Doubling the cost is the same as halving the share of income
+        doubled = affordability_sweep(self.synthetic, shares=[0.8], cost_scale=2.0)
+        halved = affordability_sweep(self.synthetic, shares=[0.4])
+        np.testing.assert_allclose(doubled.to_numpy(), halved.to_numpy())
+
+    def test_income_group_curves(self):
+        """
+        Test to verify that the income group curves are the means of the
+        country rows and leave out the aggregates.
+        """
+        sweep = affordability_sweep(self.synthetic, shares=[0.4, 0.6])
+        curves = sweep_by_income_group(self.synthetic, sweep)
+
+        self.assertEqual(list(curves.index), ['Low-income'])
+        np.testing.assert_allclose(curves.loc['Low-income'].to_numpy(), sweep.iloc[:2].mean().to_numpy())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import shutil
+import tempfile
+import unittest
+
+from foodprices.fixtures import workbook
+from foodprices.server import ReportModel, ReportServer
+from foodprices.synthetic import synthetic_merged_data
+
+
+async def _get(port, path):
+    """
+    Send one GET request to the server and return (status, content type, body).
+    """
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    lines = head.decode().split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers['Content-Type'], body
+
+
+class TestServer(unittest.TestCase):
+    """
+    Unit tests for the report server.
+    """
+
+    def setUp(self):
+        """
+        Load the data into a report model and create a temporary render directory.
+        """
+        self.merged_data = workbook()
+        self.model = ReportModel(self.merged_data)
+        self.render_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary render directory.
+        """
+        shutil.rmtree(self.render_dir, ignore_errors=True)
+
+    def _run(self, scenario, model=None):
+        """
+        Start a server on a free port, run `scenario(server)` against it and stop it.
+        """
+        async def main():
+            server = ReportServer(model or self.model, port=0, processes=1, render_dir=self.render_dir)
+            await server.start()
+            try:
+                return await scenario(server)
+            finally:
+                await server.close()
+
+        return asyncio.run(main())
+
+    def test_statistics_answered_from_memory(self):
+        """
+        Test to verify that statistics match the income group summary, that
+        group names are matched loosely, that unknown groups and paths are
+        404s, and that a non-numeric indicator, or any indicator on a render, is a 400.
+        """
+        async def scenario(server):
+            return (await _get(server.port, '/stats?indicator=Cost%20of%20a%20healthy%20diet&income_group=Low%20income'),
+                    await _get(server.port, '/stats?region=sub-saharan%20africa'),
+                    await _get(server.port, '/stats?income_group=Middle%20earth'),
+                    await _get(server.port, '/nothing'),
+                    await _get(server.port, '/stats?indicator=Country%20Name'),
+                    await _get(server.port, '/render/boxplot?region=South%20Asia&indicator=Cost%20of%20fruits'))
+
+        low, region, unknown, missing, text, render = self._run(scenario)
+
+        self.assertEqual(low[:2], (200, 'application/json'))
+        expected = self.merged_data.loc[self.merged_data['Income Group'] == 'Low-income', 'Cost of a healthy diet']
+        self.assertAlmostEqual(json.loads(low[2])['statistics']['mean'], expected.mean())
+        self.assertEqual(json.loads(region[2])['statistics']['count'],
+                         (self.merged_data['Region'] == 'Sub-Saharan Africa (FPN)').sum())
+        self.assertEqual(unknown[0], 404)
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(text[0], 400)
+        self.assertEqual(render[0], 400)
+
+    def test_identical_requests_coalesced(self):
+        """
+        Test to verify that identical concurrent requests are computed once
+        and that repeated requests, however the group is spelled, are served
+        from the response cache.
+        """
+        async def scenario(server):
+            path = '/stats?income_group=High%20income'
+            responses = await asyncio.gather(*[_get(server.port, path) for _ in range(20)])
+            for spelling in ['High%20income', 'high-income', 'HIGH%20INCOME']:
+                responses.append(await _get(server.port, f"/stats?income_group={spelling}"))
+            return server.computed, responses
+
+        computed, responses = self._run(scenario)
+
+        self.assertEqual(computed, 1)
+        self.assertEqual(len({body for _, _, body in responses}), 1)
+
+    def test_country_statistics_cover_every_year(self):
+        """
+        Test to verify that country statistics cover every year of multi-year data.
+        """
+        merged_data = synthetic_merged_data(600, seed=2)
+        country = merged_data.loc[merged_data['Income Group'].notna(), 'Country Name'].iloc[0]
+
+        async def scenario(server):
+            return await _get(server.port, f"/stats?country={country.replace(' ', '%20')}")
+
+        status, _, body = self._run(scenario, ReportModel(merged_data))
+
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['statistics']['count'],
+                         merged_data.loc[merged_data['Country Name'] == country, 'Cost of a healthy diet'].count())
+
+    def test_render_offloaded_to_pool(self):
+        """
+        Test to verify that a render request returns a PNG drawn in the worker
+        pool, once for concurrent identical requests.
+        """
+        async def scenario(server):
+            path = '/render/boxplot?region=South%20Asia'
+            responses = await asyncio.gather(*[_get(server.port, path) for _ in range(3)])
+            return server.computed, responses
+
+        computed, responses = self._run(scenario)
+
+        self.assertEqual(computed, 1)
+        for status, content_type, body in responses:
+            self.assertEqual((status, content_type), (200, 'image/png'))
+            self.assertTrue(body.startswith(b'\x89PNG'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from foodprices.figure_cache import FigureCache, save_food_group_pie_chart
+from foodprices.render import use_headless
+
+# Libraries that only the commands needing them may import
+HEAVY_MODULES = {'pandas', 'numpy', 'matplotlib', 'seaborn', 'scipy'}
+
+# Largest cumulative import time of the CLI, in microseconds; well above the
+# ~25 ms it takes today, far below the second the scripts used to take
+CLI_IMPORT_BUDGET_US = 300000
+
+
+def import_times(*args):
+    """
+    Run the interpreter with -X importtime and return {module: cumulative
+    import time in microseconds} for every module it imported.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', *args], capture_output=True, text=True,
+                            check=True, cwd=os.getcwd())
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+(\S.*)$', line)
+        if match:
+            times[match.group(2).strip()] = int(match.group(1))
+    return times
+
+
+def top_level(modules):
+    """
+    Return the top-level package names of `modules`.
+    """
+    return {name.split('.')[0] for name in modules}
+
+
+class TestStartup(unittest.TestCase):
+    """
+    Startup budget checks: the CLI and the analysis modules must not import
+    the plotting and statistics libraries before they are needed.
+    """
+
+    def test_cli_help_is_fast(self):
+        """
+        Test to verify that `python -m foodprices --help` imports none of
+        pandas, numpy, matplotlib, seaborn or scipy and that importing the
+        CLI stays within its time budget.
+        """
+        times = import_times('-m', 'foodprices', '--help')
+
+        self.assertFalse(top_level(times) & HEAVY_MODULES)
+        self.assertLess(times['foodprices.cli'], CLI_IMPORT_BUDGET_US)
+
+    def test_analysis_modules_do_not_import_plotting(self):
+        """
+        Test to verify that importing the pipeline, the summary statistics and
+        the figure modules imports neither matplotlib, seaborn nor scipy.
+        """
+        times = import_times('-c', 'import foodprices.pipeline, foodprices.summary, foodprices.correlation, '
+                                   'foodprices.figures, foodprices.figure_cache, foodprices.render')
+
+        self.assertIn('pandas', times)
+        self.assertFalse(top_level(times) & {'matplotlib', 'seaborn', 'scipy'})
+
+    def test_cached_figure_skips_matplotlib(self):
+        """
+        Test to verify that saving a figure found in the figure cache copies
+        it without importing matplotlib.
+        """
+        use_headless()
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        cache_dir = os.path.join(temp_dir, 'cache')
+        self.assertTrue(save_food_group_pie_chart(os.path.join(temp_dir, 'first.png'), cache=FigureCache(cache_dir)))
+
+        times = import_times('-c', 'from foodprices.figure_cache import FigureCache, save_food_group_pie_chart; '
+                                   f"assert not save_food_group_pie_chart({os.path.join(temp_dir, 'second.png')!r}, "
+                                   f"cache=FigureCache({cache_dir!r}))")
+
+        self.assertTrue(os.path.exists(os.path.join(temp_dir, 'second.png')))
+        self.assertNotIn('matplotlib', top_level(times))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from foodprices.fixtures import workbook
+from foodprices.store import ingest, open_store, to_float64, upcast
+
+
+class TestColumnarStore(unittest.TestCase):
+    """
+    Unit tests for the convert-once columnar store.
+    """
+
+    def setUp(self):
+        """
+        Ingest the workbook into a temporary store directory.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.store_dir = tempfile.mkdtemp()
+        self.path = ingest(self.data_path, self.store_dir)
+
+    def tearDown(self):
+        """
+        Remove the temporary store directory.
+        """
+        shutil.rmtree(self.store_dir, ignore_errors=True)
+
+    def test_column_types(self):
+        """
+        Test to verify that indicators are stored as float32 and that the income
+        group and region classifications are returned as categoricals.
+        """
+        store = open_store(self.path)
+
+        self.assertEqual(store['Cost of a healthy diet'].dtype, np.float32)
+        self.assertEqual(store['Percent of the population who cannot afford a healthy diet'].dtype, np.float32)
+        self.assertIsInstance(store['Income Group'].dtype, pd.CategoricalDtype)
+        self.assertIsInstance(store['Region'].dtype, pd.CategoricalDtype)
+
+    def test_store_matches_workbook(self):
+        """
+        Test to verify that the store holds the same rows and values as the
+        merged workbook, with float32 values upcast back to exactly the
+        published values and missing values preserved.
+        """
+        merged_data = workbook()
+        store = open_store(self.path)
+
+        self.assertEqual(list(store.columns), list(merged_data.columns))
+        self.assertEqual(store['Country Name'].tolist(), merged_data['Country Name'].tolist())
+        pd.testing.assert_frame_equal(
+            upcast(store).select_dtypes('number').copy(),
+            merged_data.select_dtypes('number'),
+            check_dtype=False
+        )
+        pd.testing.assert_series_equal(
+            store['Income Group'].astype(object).isna(),
+            merged_data['Income Group'].isna()
+        )
+
+    def test_upcast_matches_decimal_form(self):
+        """
+        Test to verify that to_float64 gives the same float64 as parsing the
+        shortest decimal form of each float32, for arbitrary bit patterns
+        including zeros, subnormals, infinities and the largest magnitudes.
+        """
+        rng = np.random.default_rng(0)
+        values = rng.integers(0, 2 ** 32, 199997, dtype=np.uint64).astype(np.uint32).view(np.float32)
+        values = np.concatenate([values, np.array([0, -0.0, 1e-45, 3.4028235e38, np.inf, 0.3, 1000], np.float32)])
+        with np.errstate(invalid='ignore'):
+            expected = values.astype(str).astype(np.float64)
+
+        np.testing.assert_array_equal(to_float64(values), expected)
+        np.testing.assert_array_equal(to_float64(values.reshape(-1, 7)), expected.reshape(-1, 7))
+
+    def test_columns_are_memory_mapped(self):
+        """
+        Test to verify that numeric columns are read-only memory maps of the
+        files in the store, so opening the store copies no indicator data.
+        """
+        store = open_store(self.path)
+        values = store['Cost of a healthy diet'].to_numpy()
+
+        self.assertFalse(values.flags.writeable)
+
+        # Walk the chain of array bases down to the memory map of the column file
+        bases = []
+        while values is not None:
+            bases.append(values)
+            values = getattr(values, 'base', None)
+        self.assertTrue(any(isinstance(base, np.memmap) for base in bases))
+
+    def test_wide_values_stay_float64(self):
+        """
+        Test to verify that a column whose values need more digits than float32
+        holds, such as 'Population', is kept as float64.
+        """
+        store = open_store(self.path)
+        self.assertEqual(store['Population'].dtype, np.float64)
+
+    def test_ingest_is_idempotent(self):
+        """
+        Test to verify that ingesting the same workbook twice reuses the existing store.
+        """
+        self.assertEqual(ingest(self.data_path, self.store_dir), self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
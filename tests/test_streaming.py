@@ -0,0 +1,92 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from foodprices import summary
+from foodprices.fixtures import workbook, workbook_sheets
+from foodprices.streaming import iter_merged_chunks, iter_sheet_chunks, stream_summary
+
+
+class TestStreamingIngestion(unittest.TestCase):
+    """
+    Unit tests for the chunked streaming ingestion path.
+    """
+
+    def setUp(self):
+        """
+        Set the paths to the workbook and create a temporary directory for CSV exports.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.merged_data = workbook()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chunks_are_bounded(self):
+        """
+        Test to verify that the data sheet is read in chunks of at most the
+        requested size which together hold every row of the sheet.
+        """
+        sizes = [len(chunk) for chunk in iter_sheet_chunks(self.data_path, chunk_size=50)]
+
+        self.assertTrue(all(size <= 50 for size in sizes))
+        self.assertEqual(sum(sizes), len(self.merged_data))
+
+    def test_chunks_match_left_merge(self):
+        """
+        Test to verify that joining each chunk against the metadata lookup
+        gives the same income groups and regions as the full left merge.
+        """
+        streamed = pd.concat(iter_merged_chunks(self.data_path, chunk_size=40), ignore_index=True)
+
+        for column in ['Country Name', 'Income Group', 'Region', 'Cost of a healthy diet']:
+            pd.testing.assert_series_equal(streamed[column].astype(object), self.merged_data[column].astype(object))
+
+    def test_streamed_summary_matches_describe(self):
+        """
+        Test to verify that statistics accumulated chunk by chunk match the
+        describe() tables computed on the whole frame.
+        """
+        statistics = stream_summary(self.data_path, chunk_size=25)
+
+        self.assertEqual(statistics.rows, len(self.merged_data))
+        pd.testing.assert_frame_equal(statistics.summary(summary.DIET_COST_COLUMNS),
+                                      summary.diet_cost_summary(self.merged_data))
+        pd.testing.assert_frame_equal(statistics.summary(summary.COST_RATIO_COLUMNS),
+                                      summary.cost_ratio_summary(self.merged_data))
+        pd.testing.assert_frame_equal(statistics.summary_by_group(summary.AFFORDABILITY_COLUMNS),
+                                      summary.affordability_summary_by_income_group(self.merged_data),
+                                      check_names=False)
+
+    def test_csv_export_with_placeholders(self):
+        """
+        Test to verify that CSV exports are streamed with a separate metadata
+        file, that '..' placeholders become missing values, and that a CSV
+        without metadata is rejected.
+        """
+        main_data, country_metadata = workbook_sheets()
+        main_data = main_data.astype({'Cost of a healthy diet': object})
+        main_data.loc[:9, 'Cost of a healthy diet'] = '..'
+        data_csv = os.path.join(self.temp_dir, 'data.csv')
+        metadata_csv = os.path.join(self.temp_dir, 'metadata.csv')
+        main_data.to_csv(data_csv, index=False)
+        country_metadata.to_csv(metadata_csv, index=False)
+
+        statistics = stream_summary(data_csv, metadata_csv, chunk_size=30)
+        expected = self.merged_data['Cost of a healthy diet'].iloc[10:].describe()
+
+        self.assertEqual(statistics.overall['Cost of a healthy diet'].count, expected['count'])
+        self.assertAlmostEqual(statistics.overall['Cost of a healthy diet'].mean, expected['mean'])
+        with self.assertRaises(ValueError):
+            next(iter_merged_chunks(data_csv))
+
+
+if __name__ == '__main__':
+    unittest.main()
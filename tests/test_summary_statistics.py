@@ -2,6 +2,8 @@ import pandas as pd
 import os
 import unittest
 
+from foodprices.fixtures import workbook
+
 class TestSummaryStatistics(unittest.TestCase):
     """
     Unit tests for summary statistics calculations and related file outputs.
@@ -22,8 +24,8 @@ class TestSummaryStatistics(unittest.TestCase):
         """
         Test if the required columns for summary statistics exist in the dataset.
         """
-        # Load the main data sheet
-        main_data = pd.read_excel(self.data_path, sheet_name='Data')
+        # Load the main data sheet merged with the metadata
+        main_data = workbook()
 
         # Define the required columns
         required_columns = [
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from foodprices.fixtures import workbook
+from foodprices.store import ingest
+from foodprices.summary import add_cost_ratios
+from foodprices.synthetic import write_synthetic_workbook
+from foodprices.validation import (Column, SchemaError, check_workbook, validate, validate_workbook,
+                                   validation_path)
+
+
+class TestValidation(unittest.TestCase):
+    """
+    Unit tests for the schema and data-quality checks.
+    """
+
+    def setUp(self):
+        """
+        Load the merged data and create a temporary directory.
+        """
+        self.data_path = './data/Food_Prices_For_Nutrition.xlsx'
+        self.merged_data = workbook()
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        Remove the temporary directory.
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_workbook_is_valid(self):
+        """
+        Test to verify that the workbook passes every check, including the
+        presence of the columns the summary statistics need.
+        """
+        issues = validate(self.merged_data)
+        self.assertTrue(issues.empty, issues['Message'].tolist())
+
+    def test_every_check_reports(self):
+        """
+        Test to verify that a missing column, a wrong dtype, out-of-range
+        costs and percentages, unmatched names and duplicate rows are each
+        reported, with the unmatched names only as a warning.
+        """
+        broken = self.merged_data.drop(columns=['Cost of oils and fats'])
+        broken['Time'] = broken['Time'].astype(float)
+        broken.loc[0, 'Cost of an energy sufficient diet'] = 0.0
+        broken.loc[1, 'Percent of the population who cannot afford a healthy diet'] = 101.0
+        broken.loc[2, 'Table Name'] = None
+        broken = pd.concat([broken, broken.iloc[[3]]], ignore_index=True)
+
+        issues = validate(broken).set_index('Check')
+
+        self.assertEqual(issues.loc['presence', 'Column'], 'Cost of oils and fats')
+        self.assertEqual(issues.loc['dtype', 'Column'], 'Time')
+        ranges = issues.loc[['range']].set_index('Column')['Rows']
+        self.assertEqual(ranges.to_dict(), {'Cost of an energy sufficient diet': 1,
+                                            'Percent of the population who cannot afford a healthy diet': 1})
+        self.assertEqual(issues.loc['join', 'Severity'], 'warning')
+        self.assertEqual(issues.loc['duplicates', 'Rows'], 2)
+
+    def test_zero_cost_gives_missing_ratio(self):
+        """
+        Test to verify that a zero or missing energy sufficient cost gives a
+        missing cost ratio instead of an infinite one.
+        """
+        data = self.merged_data.head(3).copy()
+        data['Cost of an energy sufficient diet'] = [0.0, np.nan, 2.0]
+
+        ratios = add_cost_ratios(data)['Healthy vs Energy Sufficient']
+
+        self.assertTrue(ratios.iloc[:2].isna().all())
+        self.assertAlmostEqual(ratios.iloc[2], data['Cost of a healthy diet'].iloc[2] / 2.0)
+
+    def test_validated_once_at_ingest(self):
+        """
+        Test to verify that the result is cached per workbook hash and
+        version of the schema, and that ingesting a workbook failing validation raises SchemaError without
+        writing a store.
+        """
+        self.assertTrue(check_workbook(self.data_path, self.temp_dir).empty)
+        cached = [name for name in os.listdir(self.temp_dir) if name.startswith('validation-')]
+        self.assertEqual(len(cached), 1)
+
+        # A cached result is returned without checking the workbook again
+        with mock.patch('foodprices.validation.validate', side_effect=AssertionError('validated twice')):
+            self.assertTrue(validate_workbook(self.data_path, self.temp_dir).empty)
+
+        # Editing the schema invalidates the cached result
+        with mock.patch.dict('foodprices.validation.SCHEMA', {'Time': Column('number')}):
+            self.assertNotEqual(validation_path(self.data_path, self.temp_dir),
+                                os.path.join(self.temp_dir, cached[0]))
+
+        path = write_synthetic_workbook(os.path.join(self.temp_dir, 'broken.xlsx'), 300, seed=5)
+        sheets = pd.read_excel(path, sheet_name=None)
+        sheets['Data'].loc[0, 'Cost of a healthy diet'] = -1.0
+        with pd.ExcelWriter(path) as writer:
+            for name, sheet in sheets.items():
+                sheet.to_excel(writer, sheet_name=name, index=False)
+
+        store_dir = os.path.join(self.temp_dir, 'store')
+        with self.assertRaises(SchemaError) as raised:
+            ingest(path, store_dir)
+        self.assertIn('Cost of a healthy diet', str(raised.exception))
+        self.assertFalse(os.path.exists(store_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()